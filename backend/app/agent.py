@@ -1,80 +1,170 @@
 # backend/app/agent.py
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
 from pydantic import BaseModel
+import asyncio
 import os
 import logging
-from groq import Groq, GroqError
 from sqlalchemy import text
-from typing import List, Dict, Any
+from starlette.concurrency import run_in_threadpool
+from typing import List, Dict, Any, Optional, Tuple
 
 from .auth import get_current_user
 from .db import ENGINE
+from . import llm, retrieval, conversations, intents, metrics, profiling
+from .sse import sse_event, sse_response
 
-router = APIRouter(prefix="/agent", tags=["agent"])
+router = APIRouter(prefix="/agent", tags=["agent"], route_class=profiling.ProfiledRoute)
 
 class ChatRequest(BaseModel):
     message: str
+    # omit to start a new conversation; the response returns the id to send next time
+    session_id: Optional[str] = None
 
-client = None
-try:
-    GROQ_API_KEY = os.getenv("GROQ_API_KEY")
-    if not GROQ_API_KEY:
-        raise ValueError("GROQ_API_KEY not set in environment")
-    client = Groq(api_key=GROQ_API_KEY)
-except Exception as e:
-    print(f"⚠️ Groq client initialization failed: {e}")
+GROQ_API_KEY = llm.GROQ_API_KEY
+client = llm.groq_client
+if not client:
+    print("⚠️ Groq client initialization failed: GROQ_API_KEY not set in environment")
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# How much of the user's library the agent may put in the prompt
+AGENT_CONTEXT_TOP_K = int(os.getenv("AGENT_CONTEXT_TOP_K", "5"))
+AGENT_CONTEXT_TOKENS = int(os.getenv("AGENT_CONTEXT_TOKENS", "800"))
+
+def _fetch_recent_items(user_id: str) -> List[Dict[str, Any]]:
+    """Blocking DB read; run it through run_in_threadpool from async code."""
+    with ENGINE.begin() as conn:
+        result = conn.execute(
+            text("""
+                SELECT id, title, content, created_at, mode
+                FROM items
+                WHERE user_id = CAST(:user_id AS UUID)
+                ORDER BY created_at DESC
+                LIMIT 5
+            """),
+            {"user_id": user_id}
+        ).mappings().all()
+    return [dict(row) for row in result]
+
+def _select_context_items(user_id: str, message: str):
+    """
+    Items most relevant to the message (retrieval index), falling back to
+    the most recent ones when nothing matches. Returns (items, relevant).
+    Blocking; run through run_in_threadpool.
+    """
+    hits = retrieval.search(user_id, message, AGENT_CONTEXT_TOP_K)
+    if hits:
+        return hits, True
+    return _fetch_recent_items(user_id), False
+
 @router.options("/chat")
 async def options_chat():
     return {"ok": True}
 
-@router.post("/chat")
-async def chat_with_agent(
-    request: ChatRequest,
-    user: dict = Depends(get_current_user)
-):
-    if not client:
-        raise HTTPException(status_code=500, detail="AI service not configured")
+FINAL_MARKER = "✅ Final Answer:"
+
+def _split_answer(raw: str):
+    """Split a full completion into (thinking, final_answer) on FINAL_MARKER."""
+    if FINAL_MARKER in raw:
+        thinking, final_answer = raw.split(FINAL_MARKER, 1)
+        return thinking.strip(), final_answer.strip()
+    return raw, ""
+
+class AnswerStreamParser:
+    """
+    Incremental version of _split_answer for streamed completions.
+    feed() returns (channel, text) pieces: text before FINAL_MARKER goes to
+    `channel` ("thinking"), everything after it to "final_answer". A tail
+    that could be the start of a marker split across chunks is held back
+    until the next chunk decides it.
+    """
+
+    def __init__(self, channel: str = "thinking", marker: str = FINAL_MARKER):
+        self.channel = channel
+        self.marker = marker
+        self._buf = ""
+        self._seen = False
+        self._lead = True  # strip whitespace right after the marker
+
+    def _answer(self, text: str) -> List[Tuple[str, str]]:
+        if self._lead:
+            text = text.lstrip()
+            self._lead = not text
+        return [("final_answer", text)] if text else []
 
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        if self._seen:
+            return self._answer(text)
+        self._buf += text
+        idx = self._buf.find(self.marker)
+        if idx >= 0:
+            before, after = self._buf[:idx], self._buf[idx + len(self.marker):]
+            self._buf, self._seen = "", True
+            return ([(self.channel, before)] if before else []) + self._answer(after)
+        keep = next(
+            (k for k in range(min(len(self.marker) - 1, len(self._buf)), 0, -1)
+             if self._buf.endswith(self.marker[:k])),
+            0,
+        )
+        emit, self._buf = self._buf[:len(self._buf) - keep], self._buf[len(self._buf) - keep:]
+        return [(self.channel, emit)] if emit else []
+
+    def flush(self) -> List[Tuple[str, str]]:
+        rest, self._buf = self._buf, ""
+        return [(self.channel, rest)] if rest else []
+
+async def _prepare_chat(request: ChatRequest, user: dict) -> Dict[str, Any]:
+    """
+    Shared front half of /chat and /chat/stream: open the session, try the
+    local intent router, then build the LLM call. Returns
+    {"session_id", "routed"} or {"session_id", "params"}.
+    """
     user_id = user["user_id"]
     logger.info(f"Agent called by user: {user_id}")
 
-    msg_lower = request.message.strip().lower()
-    is_greeting = msg_lower in ["hi", "hello", "hey", "yo", "hola", "bonjour", "greetings"]
+    session = await run_in_threadpool(conversations.open_session, user_id, request.session_id)
+    session_id = session["id"]
+
+    # greetings, counts and "show my last post" are answered from the DB, no LLM call
+    routed = await run_in_threadpool(intents.route, user_id, request.message)
+    if routed:
+        await _record_turn(session_id, request.message, routed["thinking"], routed["final_answer"])
+        return {"session_id": session_id, "routed": routed}
+
+    if not client:
+        raise HTTPException(status_code=500, detail="AI service not configured")
+
+    history = await run_in_threadpool(conversations.load_history, session_id)
 
     items = []
+    relevant = False
     thinking_steps = []
 
-    if not is_greeting:
-        try:
-            with ENGINE.begin() as conn:
-                result = conn.execute(
-                    text("""
-                        SELECT id, title, content, created_at, mode
-                        FROM items
-                        WHERE user_id = CAST(:user_id AS UUID)
-                        ORDER BY created_at DESC
-                        LIMIT 5
-                    """),
-                    {"user_id": user_id}
-                ).mappings().all()
-                items = [dict(row) for row in result]
-                logger.info(f"Fetched {len(items)} items for user {user_id}")
-                thinking_steps.append(f"✅ Found {len(items)} recent item(s)")
-        except Exception as e:
-            logger.error(f"DB error fetching items: {e}")
-            thinking_steps.append("⚠️ Could not load your content history")
+    try:
+        items, relevant = await run_in_threadpool(_select_context_items, user_id, request.message)
+        logger.info(f"Fetched {len(items)} items for user {user_id} (relevant={relevant})")
+        thinking_steps.append(f"✅ Found {len(items)} {'relevant' if relevant else 'recent'} item(s)")
+    except Exception as e:
+        logger.error(f"DB error fetching items: {e}")
+        thinking_steps.append("⚠️ Could not load your content history")
 
     content_context = ""
     if items:
-        content_context = "📝 Here's what you've written recently:\n\n"
+        content_context = (
+            "📝 Here are your posts most related to this question:\n\n" if relevant
+            else "📝 Here's what you've written recently:\n\n"
+        )
+        budget = AGENT_CONTEXT_TOKENS
         for i, item in enumerate(items, 1):
+            if budget <= 0:
+                break
             kind = "Blog" if item['mode'] == 'blog' else "Social Post"
             title = item.get('title') or 'Untitled'
-            preview = item['content'][:200].replace('\n', ' ').replace('"', '').replace("'", "")
+            # spend the token budget on the best matches first (~4 chars/token)
+            preview_chars = max(80, min(600, budget * 4 - len(title) - 60))
+            preview = item['content'][:preview_chars].replace('\n', ' ').replace('"', '').replace("'", "")
+            budget -= llm.estimate_tokens(title + preview) + 15
             content_context += (
                 f"{i}. **{title}**\n"
                 f"   - Type: {kind}\n"
@@ -96,49 +186,141 @@ async def chat_with_agent(
         "🤔 [Your internal thought]\n"
         "🔍 [Any action taken]\n"
         "✅ Final Answer: [Your helpful response]\n\n"
+        f"Use this context:\n{content_context}"
     )
+    if session["summary"]:
+        system_msg += f"\n\nSummary of the earlier conversation:\n{session['summary']}"
 
-    if is_greeting:
-        system_msg += "This is a greeting. Respond briefly and warmly. Do not mention content."
-    else:
-        system_msg += f"Use this context:\n{content_context}"
-
-    try:
-        completion = client.chat.completions.create(
-            model=os.getenv("DEFAULT_MODEL", "llama-3.1-8b-instant"),
-            messages=[
-                {"role": "system", "content": system_msg},
-                {"role": "user", "content": request.message}
-            ],
-            temperature=0.7,
-            max_tokens=1024,
-            timeout=30,
-        )
+    params = dict(
+        model=os.getenv("DEFAULT_MODEL", "llama-3.1-8b-instant"),
+        messages=[
+            {"role": "system", "content": system_msg},
+            *history,
+            {"role": "user", "content": request.message}
+        ],
+        temperature=0.7,
+        max_tokens=1024,
+        timeout=30,
+    )
+    return {"session_id": session_id, "params": params}
 
-        raw = completion.choices[0].message.content.strip()
+async def _record_turn(session_id: str, message: str, thinking: str, final_answer: str):
+    # only the answer goes into the history; the reasoning is not replayed
+    await run_in_threadpool(conversations.append_turns, session_id, [
+        ("user", message),
+        ("assistant", final_answer or thinking),
+    ])
 
-        if is_greeting:
-            # Extract final answer if present
-            if "✅ Final Answer:" in raw:
-                final_answer = raw.split("✅ Final Answer:", 1)[1].strip()
-            else:
-                final_answer = raw
-            return {"thinking": "", "final_answer": final_answer}
-
-        else:
-            if "✅ Final Answer:" in raw:
-                parts = raw.split("✅ Final Answer:", 1)
-                thinking = parts[0].strip()
-                final_answer = parts[1].strip()
-            else:
-                thinking = raw
-                final_answer = ""
-
-            return {
-                "thinking": thinking,
-                "final_answer": final_answer
-            }
+@router.post("/chat")
+async def chat_with_agent(
+    request: ChatRequest,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user)
+):
+    prep = await _prepare_chat(request, user)
+    session_id = prep["session_id"]
+    if "routed" in prep:
+        return {**prep["routed"], "session_id": session_id}
 
+    try:
+        async with metrics.track_llm("groq", prep["params"]["model"]) as call:
+            completion = await client.chat.completions.create(**prep["params"])
+            call.usage(completion.usage)
+        raw = completion.choices[0].message.content.strip()
+        thinking, final_answer = _split_answer(raw)
     except Exception as e:
         logger.error(f"Agent LLM error: {e}")
-        raise HTTPException(status_code=500, detail="Agent failed")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Agent failed")
+
+    await _record_turn(session_id, request.message, thinking, final_answer)
+    background_tasks.add_task(conversations.compact_if_needed, session_id)
+    return {
+        "thinking": thinking,
+        "final_answer": final_answer,
+        "session_id": session_id,
+    }
+
+@router.post("/chat/stream")
+async def chat_with_agent_stream(
+    request: ChatRequest,
+    http_request: Request,
+    background_tasks: BackgroundTasks,
+    user: dict = Depends(get_current_user)
+):
+    """
+    Streaming variant of /chat as Server-Sent Events:
+      event: thinking      data: {"text": "..."}   (reasoning, as it arrives)
+      event: final_answer  data: {"text": "..."}   (answer, after the marker)
+      event: done          data: {"thinking", "final_answer", "session_id"}
+      event: error         data: {"detail": "..."}
+    `done` carries the complete split, identical to what /chat returns.
+    Routed (non-LLM) answers are sent as one event of each kind.
+    """
+    prep = await _prepare_chat(request, user)
+    session_id = prep["session_id"]
+
+    async def replay(routed):
+        if routed["thinking"]:
+            yield sse_event("thinking", {"text": routed["thinking"]})
+        yield sse_event("final_answer", {"text": routed["final_answer"]})
+        yield sse_event("done", {**routed, "session_id": session_id})
+
+    async def events():
+        stream = None
+        parts: List[str] = []
+        parser = AnswerStreamParser()
+        completed = False
+        try:
+            async with metrics.track_llm("groq", prep["params"]["model"]) as call:
+                stream = await client.chat.completions.create(**prep["params"], stream=True)
+                async for chunk in stream:
+                    if await http_request.is_disconnected():
+                        break
+                    call.stream_chunk(chunk)
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        for channel, piece in parser.feed(delta):
+                            yield sse_event(channel, {"text": piece})
+                else:
+                    completed = True
+            if completed:
+                for channel, piece in parser.flush():
+                    yield sse_event(channel, {"text": piece})
+                thinking, final_answer = _split_answer("".join(parts).strip())
+                # only complete answers are recorded in the conversation
+                await _record_turn(session_id, request.message, thinking, final_answer)
+                background_tasks.add_task(conversations.compact_if_needed, session_id)
+                yield sse_event("done", {
+                    "thinking": thinking,
+                    "final_answer": final_answer,
+                    "session_id": session_id,
+                })
+        except asyncio.CancelledError:
+            # client disconnected: fall through to close the upstream call
+            raise
+        except Exception as e:
+            logger.error(f"Agent LLM stream error: {e}")
+            yield sse_event("error", {"detail": "Agent failed"})
+        finally:
+            if stream is not None:
+                await stream.close()
+
+    return sse_response(replay(prep["routed"]) if "routed" in prep else events())
+
+@router.get("/router/stats")
+async def intent_router_stats():
+    return intents.stats()
+
+@router.get("/sessions")
+async def list_agent_sessions(user: dict = Depends(get_current_user)):
+    return {"sessions": await run_in_threadpool(conversations.list_sessions, user["user_id"])}
+
+@router.get("/sessions/{session_id}")
+async def get_agent_session(session_id: str, user: dict = Depends(get_current_user)):
+    return await run_in_threadpool(conversations.get_session, user["user_id"], session_id)
+
+@router.delete("/sessions/{session_id}")
+async def delete_agent_session(session_id: str, user: dict = Depends(get_current_user)):
+    await run_in_threadpool(conversations.delete_session, user["user_id"], session_id)
+    return {"ok": True}
\ No newline at end of file
@@ -0,0 +1,185 @@
+# backend/app/conversations.py
+"""
+Server-side conversation sessions for /api/agent/chat.
+
+Clients send only a session_id and the new message; earlier turns are
+loaded from agent_turns. When the live turns of a session exceed
+AGENT_SESSION_TOKEN_BUDGET, the oldest ones (all but the last
+AGENT_SESSION_KEEP_TURNS) are folded into the session's running summary
+by a short LLM call, so the prompt stays bounded however long the chat
+runs. Compaction runs after the response is sent.
+
+Env (optional):
+  AGENT_SESSION_TOKEN_BUDGET=1500
+  AGENT_SESSION_KEEP_TURNS=4
+  AGENT_SUMMARY_MODEL=llama-3.1-8b-instant
+  AGENT_SUMMARY_MAX_TOKENS=300
+"""
+
+import logging
+import os
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from . import llm, metrics
+from .db import ENGINE
+
+AGENT_SESSION_TOKEN_BUDGET = int(os.getenv("AGENT_SESSION_TOKEN_BUDGET", "1500"))
+AGENT_SESSION_KEEP_TURNS = int(os.getenv("AGENT_SESSION_KEEP_TURNS", "4"))
+AGENT_SUMMARY_MODEL = os.getenv("AGENT_SUMMARY_MODEL", os.getenv("DEFAULT_MODEL", "llama-3.1-8b-instant"))
+AGENT_SUMMARY_MAX_TOKENS = int(os.getenv("AGENT_SUMMARY_MAX_TOKENS", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+# ---------- blocking DB helpers (call through run_in_threadpool) ----------
+
+def open_session(user_id: str, session_id: Optional[str]) -> Dict[str, Any]:
+    """Return {id, summary} for the user's session, creating one when session_id is None."""
+    if session_id:
+        try:
+            uuid.UUID(session_id)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Session not found")
+    with ENGINE.begin() as c:
+        if session_id:
+            row = c.execute(text("""
+                SELECT id::text AS id, summary FROM agent_sessions
+                WHERE id = CAST(:sid AS UUID) AND user_id = CAST(:uid AS UUID)
+            """), {"sid": session_id, "uid": user_id}).mappings().first()
+            if not row:
+                raise HTTPException(status_code=404, detail="Session not found")
+        else:
+            row = c.execute(text("""
+                INSERT INTO agent_sessions (user_id) VALUES (CAST(:uid AS UUID))
+                RETURNING id::text AS id, summary
+            """), {"uid": user_id}).mappings().first()
+    return dict(row)
+
+
+def load_history(session_id: str) -> List[Dict[str, str]]:
+    """
+    Live turns as chat messages, newest last, trimmed to the token budget
+    (normally compaction keeps them under it; this is the hard cap).
+    """
+    with ENGINE.begin() as c:
+        rows = c.execute(text("""
+            SELECT role, content, tokens FROM agent_turns
+            WHERE session_id = CAST(:sid AS UUID) AND NOT compacted
+            ORDER BY id DESC
+        """), {"sid": session_id}).mappings().all()
+    history, used = [], 0
+    for r in rows:
+        if used + r["tokens"] > AGENT_SESSION_TOKEN_BUDGET and history:
+            break
+        used += r["tokens"]
+        history.append({"role": r["role"], "content": r["content"]})
+    history.reverse()
+    return history
+
+
+def append_turns(session_id: str, turns: List[Tuple[str, str]]) -> None:
+    with ENGINE.begin() as c:
+        c.execute(text("""
+            INSERT INTO agent_turns (session_id, role, content, tokens)
+            VALUES (CAST(:sid AS UUID), :role, :content, :tokens)
+        """), [
+            {"sid": session_id, "role": role, "content": content, "tokens": llm.estimate_tokens(content)}
+            for role, content in turns
+        ])
+        c.execute(text("UPDATE agent_sessions SET updated_at = now() WHERE id = CAST(:sid AS UUID)"),
+                  {"sid": session_id})
+
+
+def _compaction_candidates(session_id: str) -> Tuple[str, List[Dict[str, Any]]]:
+    """(summary, turns to fold) or ("", []) when the session is within budget."""
+    with ENGINE.begin() as c:
+        summary = c.execute(text("SELECT summary FROM agent_sessions WHERE id = CAST(:sid AS UUID)"),
+                            {"sid": session_id}).scalar() or ""
+        rows = c.execute(text("""
+            SELECT id, role, content, tokens FROM agent_turns
+            WHERE session_id = CAST(:sid AS UUID) AND NOT compacted
+            ORDER BY id
+        """), {"sid": session_id}).mappings().all()
+    if sum(r["tokens"] for r in rows) <= AGENT_SESSION_TOKEN_BUDGET:
+        return summary, []
+    return summary, [dict(r) for r in rows[:-AGENT_SESSION_KEEP_TURNS or None]]
+
+
+def _apply_compaction(session_id: str, summary: str, turn_ids: List[int]) -> None:
+    with ENGINE.begin() as c:
+        c.execute(text("UPDATE agent_sessions SET summary = :s, updated_at = now() WHERE id = CAST(:sid AS UUID)"),
+                  {"s": summary, "sid": session_id})
+        c.execute(text("UPDATE agent_turns SET compacted = TRUE WHERE id = ANY(:ids)"), {"ids": turn_ids})
+
+
+def get_session(user_id: str, session_id: str) -> Dict[str, Any]:
+    with ENGINE.begin() as c:
+        sess = c.execute(text("""
+            SELECT id::text AS id, summary, created_at, updated_at FROM agent_sessions
+            WHERE id = CAST(:sid AS UUID) AND user_id = CAST(:uid AS UUID)
+        """), {"sid": session_id, "uid": user_id}).mappings().first()
+        if not sess:
+            raise HTTPException(status_code=404, detail="Session not found")
+        turns = c.execute(text("""
+            SELECT role, content, compacted, created_at FROM agent_turns
+            WHERE session_id = CAST(:sid AS UUID) ORDER BY id
+        """), {"sid": session_id}).mappings().all()
+    return {**sess, "turns": [dict(t) for t in turns]}
+
+
+def list_sessions(user_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+    with ENGINE.begin() as c:
+        rows = c.execute(text("""
+            SELECT id::text AS id, summary, created_at, updated_at FROM agent_sessions
+            WHERE user_id = CAST(:uid AS UUID)
+            ORDER BY updated_at DESC LIMIT :lim
+        """), {"uid": user_id, "lim": limit}).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def delete_session(user_id: str, session_id: str) -> None:
+    with ENGINE.begin() as c:
+        res = c.execute(text("""
+            DELETE FROM agent_sessions WHERE id = CAST(:sid AS UUID) AND user_id = CAST(:uid AS UUID)
+        """), {"sid": session_id, "uid": user_id})
+    if res.rowcount == 0:
+        raise HTTPException(status_code=404, detail="Session not found")
+
+
+# ---------- compaction ----------
+
+async def compact_if_needed(session_id: str) -> None:
+    """Fold the oldest live turns into the running summary when over budget."""
+    if not llm.groq_client:
+        return
+    try:
+        summary, turns = await run_in_threadpool(_compaction_candidates, session_id)
+        if not turns:
+            return
+        transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+        async with metrics.track_llm("groq", AGENT_SUMMARY_MODEL) as call:
+            completion = await llm.groq_client.chat.completions.create(
+                model=AGENT_SUMMARY_MODEL,
+                messages=[
+                    {"role": "system", "content": (
+                        "You maintain a running summary of a conversation between a user and their "
+                        "content-writing assistant. Merge the previous summary and the new turns into one "
+                        "concise summary (max ~150 words). Keep facts, decisions, names, and open questions."
+                    )},
+                    {"role": "user", "content": f"Previous summary:\n{summary or '(none)'}\n\nNew turns:\n{transcript}"},
+                ],
+                temperature=0.2,
+                max_tokens=AGENT_SUMMARY_MAX_TOKENS,
+            )
+            call.usage(completion.usage)
+        new_summary = completion.choices[0].message.content.strip()
+        await run_in_threadpool(_apply_compaction, session_id, new_summary, [t["id"] for t in turns])
+        logger.info(f"Compacted {len(turns)} turns of session {session_id}")
+    except Exception as e:
+        # the hard cap in load_history still bounds the prompt
+        logger.error(f"Session compaction failed for {session_id}: {e}")
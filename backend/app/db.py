@@ -1,8 +1,11 @@
 # backend/app/db.py
 import os
-from sqlalchemy import create_engine, text
+import time
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
+from . import metrics
 from sqlalchemy.orm import sessionmaker, declarative_base  # ✅ Add declarative_base
 Base = declarative_base()  # ✅ Define Base here
 # Load .env from backend/app/.env
@@ -12,58 +15,33 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL missing in backend/app/.env")
 
+class TimedQueuePool(QueuePool):
+    """QueuePool that reports how long each checkout waited (metrics.DB_POOL_WAIT)."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            metrics.DB_POOL_WAIT.observe(time.perf_counter() - start)
+
 # Global engine and sessionmaker (pooling enabled by default)
-ENGINE = create_engine(DATABASE_URL, future=True, pool_pre_ping=True)
+ENGINE = create_engine(DATABASE_URL, future=True, pool_pre_ping=True, poolclass=TimedQueuePool)
+metrics.register_pool(ENGINE)
 SessionLocal = sessionmaker(bind=ENGINE, autocommit=False, autoflush=False)
 
 def init_db() -> None:
-    """Create required extensions/tables if they don't exist."""
-    with ENGINE.begin() as c:
-        # PostgreSQL UUID support
-        c.execute(text("CREATE EXTENSION IF NOT EXISTS pgcrypto;"))
-        
-        # Users table for JWT auth
-        c.execute(text("""
-        CREATE TABLE IF NOT EXISTS users (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            username TEXT UNIQUE NOT NULL,
-            hashed_password TEXT NOT NULL,
-            created_at TIMESTAMPTZ NOT NULL DEFAULT now()
-        );
-        """))
-        
-        # Items table for Library page
-        c.execute(text("""
-        CREATE TABLE IF NOT EXISTS items (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            title TEXT,
-            content TEXT NOT NULL,
-            platform TEXT NOT NULL,
-            tone TEXT NOT NULL,
-            mode TEXT NOT NULL,
-            words INT NOT NULL,
-            model TEXT,
-            tags TEXT[] NOT NULL DEFAULT '{}',
-            pinned BOOLEAN NOT NULL DEFAULT FALSE,
-            user_id UUID NOT NULL,
-            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-            FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
-        );
-        """))
-        
-        # Images table for vision analysis attached to posts
-        c.execute(text("""
-        CREATE TABLE IF NOT EXISTS images (
-            id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
-            item_id UUID NOT NULL,
-            url TEXT,
-            caption TEXT NOT NULL,
-            tags TEXT[] NOT NULL DEFAULT '{}',
-            model TEXT,
-            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
-            FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
-        );
-        """))
+    """Apply pending schema migrations (see migrate.py)."""
+    from .migrate import migrate
+    migrate(ENGINE)
+
+def check_db() -> None:
+    """Startup hook: verify the schema version, migrating only if DB_AUTO_MIGRATE=1."""
+    from .migrate import check
+    if os.getenv("DB_AUTO_MIGRATE", "").lower() in ("1", "true", "yes"):
+        init_db()
+    else:
+        check(ENGINE)
 
 # ✅ get_db() is at the TOP LEVEL (no extra indentation!)
 def get_db():
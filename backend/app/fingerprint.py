@@ -0,0 +1,168 @@
+# backend/app/fingerprint.py
+"""
+Near-duplicate fingerprints for Library items.
+
+Each item gets a 64-bit SimHash of its title + content (words weighted
+by count; shingles were too brittle for short social posts), stored in
+items.simhash. The hash is also split into SIMHASH_BANDS bands of 8
+bits, each encoded as band_no << 16 | bits, in items.simhash_bands
+(GIN-indexed). Two texts within SIMHASH_MAX_DISTANCE
+differing bits (< SIMHASH_BANDS) must share at least one band exactly,
+so an `&&` overlap on the bands finds every candidate. The exact Hamming
+distance, computed in SQL, then filters and ranks them.
+
+Rows saved before fingerprints existed are filled in batches:
+    python -m backend.app.fingerprint backfill [--batch-size 500]
+
+Env (optional):
+  SIMHASH_MAX_DISTANCE=7   # at most SIMHASH_BANDS - 1
+"""
+
+import argparse
+import hashlib
+import os
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8
+_BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+SIMHASH_MAX_DISTANCE = min(int(os.getenv("SIMHASH_MAX_DISTANCE", "7")), SIMHASH_BANDS - 1)
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def _features(value: str) -> Counter:
+    return Counter(_WORD_RE.findall(value.lower()))
+
+
+# Bit-sliced accumulation: a feature hash is "spread" into 64 lanes of
+# _LANE bits (lane i holds bit i), so one big-int add updates every bit
+# counter at once instead of 64 Python-level additions. Spreads are cached
+# per word since vocabularies repeat heavily across a library.
+_LANE = 32
+_LANE_MASK = (1 << _LANE) - 1
+_SPREAD = [
+    [sum(1 << ((byte * 8 + bit) * _LANE) for bit in range(8) if v >> bit & 1) for v in range(256)]
+    for byte in range(8)
+]
+
+
+@lru_cache(maxsize=16384)
+def _spread(feature: str) -> int:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    return sum(_SPREAD[i][b] for i, b in enumerate(reversed(digest)))
+
+
+def simhash(title: Optional[str], content: str) -> int:
+    """64-bit SimHash as a signed integer (fits a BIGINT column)."""
+    ones = total = 0
+    for feature, count in _features(f"{title or ''} {content}").items():
+        ones += count * _spread(feature)
+        total += count
+    # bit set when the features with that bit outweigh those without it
+    value = 0
+    for bit in range(SIMHASH_BITS):
+        if 2 * (ones >> (bit * _LANE) & _LANE_MASK) > total:
+            value |= 1 << bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def bands(value: int) -> List[int]:
+    unsigned = value & 0xFFFFFFFFFFFFFFFF
+    mask = (1 << _BAND_BITS) - 1
+    return [(i << 16) | (unsigned >> (i * _BAND_BITS) & mask) for i in range(SIMHASH_BANDS)]
+
+
+def distance(a: int, b: int) -> int:
+    return bin((a ^ b) & 0xFFFFFFFFFFFFFFFF).count("1")
+
+
+def fingerprint(title: Optional[str], content: str) -> Dict[str, Any]:
+    """Column values for items.simhash / items.simhash_bands."""
+    h = simhash(title, content)
+    return {"simhash": h, "simhash_bands": bands(h)}
+
+
+def find_similar(
+    conn: Connection,
+    user_id: str,
+    fp: Dict[str, Any],
+    exclude_id: Optional[str] = None,
+    limit: int = 10,
+    max_distance: int = SIMHASH_MAX_DISTANCE,
+) -> List[Dict[str, Any]]:
+    """
+    The user's items within max_distance bits of fp, closest first, each
+    with a `distance` key. Rows that were never fingerprinted are not seen.
+
+    Band candidates are ranked by Hamming distance in SQL (popcount of
+    the XOR as BIT(64), which needs no extension or PG14 bit_count) and
+    only the top `limit` rows are read in full.
+    """
+    rows = conn.execute(text("""
+        WITH hits AS (
+            SELECT id, distance FROM (
+                SELECT id, created_at,
+                       length(replace(CAST(simhash # CAST(:h AS BIGINT) AS BIT(64))::text, '0', '')) AS distance
+                FROM items
+                WHERE user_id = CAST(:uid AS UUID)
+                  AND simhash_bands && CAST(:bands AS INT[])
+                  AND (CAST(:exclude AS UUID) IS NULL OR id <> CAST(:exclude AS UUID))
+            ) c
+            WHERE distance <= :max_distance
+            ORDER BY distance, created_at DESC
+            LIMIT :lim
+        )
+        SELECT i.id::text AS id, i.title, i.content, i.platform, i.tone, i.mode, i.words, i.model, i.tags,
+               i.pinned, i.user_id::text AS user_id, i.created_at, h.distance
+        FROM hits h JOIN items i ON i.id = h.id
+        ORDER BY h.distance, i.created_at DESC
+    """), {
+        "uid": user_id, "h": fp["simhash"], "bands": fp["simhash_bands"], "exclude": exclude_id,
+        "max_distance": max_distance, "lim": limit,
+    }).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def backfill(engine, batch_size: int = 500) -> int:
+    """Fingerprint rows with a NULL simhash, one transaction per batch."""
+    total = 0
+    while True:
+        with engine.begin() as c:
+            rows = c.execute(text("""
+                SELECT id, title, content FROM items
+                WHERE simhash IS NULL
+                ORDER BY id
+                LIMIT :n
+                FOR UPDATE SKIP LOCKED
+            """), {"n": batch_size}).all()
+            if not rows:
+                return total
+            c.execute(
+                text("UPDATE items SET simhash = :simhash, simhash_bands = :simhash_bands WHERE id = :id"),
+                [{"id": r.id, **fingerprint(r.title, r.content)} for r in rows],
+            )
+        total += len(rows)
+        print(f"fingerprinted {total} item(s)")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="InspireAI item fingerprints")
+    ap.add_argument("command", choices=["backfill"])
+    ap.add_argument("--batch-size", type=int, default=500)
+    args = ap.parse_args()
+
+    from .db import ENGINE
+
+    n = backfill(ENGINE, args.batch_size)
+    print(f"done: {n} item(s) fingerprinted")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# backend/app/gencache.py
+"""
+In-process cache for /api/generate results.
+
+Entries are keyed on a hash of the final completion request (system +
+formatted PLAT_TEMPLATES prompt, model, temperature, max_tokens), so two
+requests only share an entry when Groq would have seen the exact same
+input. The clamped word count is part of the formatted prompt.
+
+- LRU eviction once the stored text exceeds GENCACHE_MAX_BYTES
+- entries expire GENCACHE_TTL seconds after they were first written
+- when temperature > 0 an entry holds up to GENCACHE_VARIANTS different
+  texts; lookups only count as hits once all slots are filled, and hits
+  rotate through the variants so "regenerate" still changes the text
+
+Env (optional):
+  GENCACHE_MAX_BYTES=33554432
+  GENCACHE_TTL=86400
+  GENCACHE_VARIANTS=3
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+GENCACHE_MAX_BYTES = int(os.getenv("GENCACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+GENCACHE_TTL = float(os.getenv("GENCACHE_TTL", "86400"))
+GENCACHE_VARIANTS = int(os.getenv("GENCACHE_VARIANTS", "3"))
+
+
+def cache_key(params: Dict[str, Any]) -> str:
+    """Stable content hash of the completion kwargs."""
+    blob = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+class _Entry:
+    __slots__ = ("variants", "next", "expires", "size", "slots")
+
+    def __init__(self, slots: int, expires: float):
+        self.variants: List[str] = []
+        self.next = 0
+        self.expires = expires
+        self.size = 0
+        self.slots = slots
+
+
+class GenerationCache:
+    def __init__(self, max_bytes: int, ttl: float, variants: int):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.variants = max(1, variants)
+        self._data: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _slots_for(self, temperature: float) -> int:
+        return self.variants if temperature > 0 else 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._data.pop(key)
+        self._bytes -= entry.size
+
+    def _live(self, key: str) -> Optional[_Entry]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry.expires <= time.monotonic():
+            self._drop(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def get(self, key: str, partial: bool = False) -> Optional[str]:
+        """
+        Return a cached text or None.
+        With partial=False an entry whose variant slots are not all filled
+        is a miss (the caller should generate another variant).
+        """
+        with self._lock:
+            entry = self._live(key)
+            if entry is None or not entry.variants or (not partial and len(entry.variants) < entry.slots):
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            text = entry.variants[entry.next % len(entry.variants)]
+            entry.next += 1
+            self.hits += 1
+            return text
+
+    def put(self, key: str, text: str, temperature: float) -> None:
+        size = len(text.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            entry = self._live(key)
+            if entry is None:
+                entry = _Entry(self._slots_for(temperature), time.monotonic() + self.ttl)
+                self._data[key] = entry
+            if text in entry.variants:
+                return
+            if len(entry.variants) >= entry.slots:
+                # replace the oldest variant
+                old = entry.variants.pop(0)
+                entry.size -= len(old.encode("utf-8"))
+                self._bytes -= len(old.encode("utf-8"))
+            entry.variants.append(text)
+            entry.size += size
+            self._bytes += size
+            self._data.move_to_end(key)
+            while self._bytes > self.max_bytes and self._data:
+                oldest = next(iter(self._data))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / lookups) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+GENERATION_CACHE = GenerationCache(GENCACHE_MAX_BYTES, GENCACHE_TTL, GENCACHE_VARIANTS)
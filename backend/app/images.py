@@ -2,36 +2,86 @@
 """
 Image endpoints for Inspire AI:
 - Vision analysis via OpenRouter:  POST /api/images/analyze
+- Batch vision analysis:           POST /api/images/analyze-batch
 - Attach analysis to a post (DB):  POST /api/images/attach/{item_id}
 - List images for a post (DB):     GET  /api/images/by-item/{item_id}
 
+Uploads are stored as uploads/<sha256>.<ext>, and vision results are cached
+in image_analyses by (sha256, model): re-uploading the same bytes keeps no
+second copy and makes no OpenRouter call.
+
+Uploads are never read into memory whole: Starlette spools the body to a
+temporary file (on disk past 1 MB), which is copied in chunks into
+uploads/ and hashed in the same pass; PIL works from that file, and only
+the small preprocessed copy is base64-encoded. UploadLimitMiddleware
+enforces the size limit while the body arrives: an oversized
+Content-Length gets 413 before anything is read, and a body that grows
+past the limit is cut off there instead of being spooled in full.
+
 Env required:
   OPENROUTER_API_KEY=or-xxxxxxxx
 Optional:
   OPENROUTER_VISION_MODEL=qwen/qwen2.5-vl-72b-instruct:free
   OPENROUTER_REFERER=https://inspire-ai.local    
   OPENROUTER_APP_TITLE=Inspire AI
+  VISION_MAX_EDGE=1024      # longest edge sent to the vision model
+  VISION_FORMAT=jpeg        # jpeg | webp
+  VISION_QUALITY=85
+  IMAGE_WORKERS=4           # threads for PIL/hash/file work
+  VISION_BATCH_CONCURRENCY=4  # vision calls in flight per batch request
+  VISION_BATCH_MAX_FILES=12
+
+OpenRouter calls go through the shared pooled client in llm.py; PIL,
+hashing and file copies run on a dedicated thread pool so the event loop
+stays free while an image is processed.
 """
 
 from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, Field
-from typing import List, Optional
-from PIL import Image, UnidentifiedImageError
+from typing import Dict, List, Optional
+from PIL import Image, ImageOps, UnidentifiedImageError
 from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+from concurrent.futures import ThreadPoolExecutor
 from .db import ENGINE
+from . import llm, metrics, profiling
 
+import asyncio
+import contextlib
+import contextvars
 import io
 import os
 import base64
+import hashlib
+import httpx
 import imghdr
 import json
-import requests
+import logging
+import tempfile
 
-router = APIRouter(prefix="/api/images", tags=["images"])
+router = APIRouter(prefix="/api/images", tags=["images"], route_class=profiling.ProfiledRoute)
+logger = logging.getLogger(__name__)
 
 # Create uploads directory if it doesn't exist
 os.makedirs("uploads", exist_ok=True)
 
+UPLOAD_MAX_BYTES = 12 * 1024 * 1024  # 12MB limit
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+VISION_MAX_EDGE = int(os.getenv("VISION_MAX_EDGE", "1024"))
+VISION_FORMAT = os.getenv("VISION_FORMAT", "jpeg").lower()
+VISION_QUALITY = int(os.getenv("VISION_QUALITY", "85"))
+
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", "4"))
+_image_pool = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix="image")
+
+VISION_BATCH_CONCURRENCY = int(os.getenv("VISION_BATCH_CONCURRENCY", "4"))
+VISION_BATCH_MAX_FILES = int(os.getenv("VISION_BATCH_MAX_FILES", "12"))
+
+# PIL format -> file extension for content-addressed uploads
+_EXT_BY_FORMAT = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp", "BMP": "bmp", "TIFF": "tiff"}
+
 # ---------- Models ----------
 
 class AnalysisResp(BaseModel):
@@ -40,6 +90,20 @@ class AnalysisResp(BaseModel):
     model: str = Field(..., description="Vision model used")
     url: str = Field("", description="File path of saved image")  # ← Add this line
 
+class BatchAnalysisItem(BaseModel):
+    index: int
+    filename: str = ""
+    result: Optional[AnalysisResp] = None
+    error: Optional[str] = None
+    status: int = 200
+
+class BatchAnalysisResp(BaseModel):
+    results: List[BatchAnalysisItem]
+    # ready to pass to GenerateIn.image_captions / image_tags (successful files only)
+    image_captions: List[str] = Field(default_factory=list)
+    image_tags: List[List[str]] = Field(default_factory=list)
+    merged_tags: List[str] = Field(default_factory=list, description="Deduped tags across the set, most common first")
+
 # DB payloads
 class ImageIn(BaseModel):
     url: Optional[str] = None     # This will be the saved file path
@@ -60,34 +124,200 @@ def _require_env(name: str) -> str:
         raise HTTPException(status_code=500, detail=f"Missing environment variable: {name}")
     return v
 
-def _validate_and_open_image(raw: bytes) -> None:
-    """Validate the image quickly (format + basic decode)."""
-    kind = imghdr.what(None, raw)
+async def _in_pool(fn, *args):
+    """Run blocking image work (PIL, hashing, file I/O) on the image thread pool."""
+    # carry contextvars over (run_in_executor does not), e.g. the request profile
+    ctx = contextvars.copy_context()
+    return await asyncio.get_running_loop().run_in_executor(_image_pool, ctx.run, fn, *args)
+
+# ---------- Upload size limit ----------
+
+# room for the multipart boundaries and part headers around each file
+_MULTIPART_OVERHEAD = 64 * 1024
+_BODY_LIMITS = {
+    "/api/images/analyze": UPLOAD_MAX_BYTES + _MULTIPART_OVERHEAD,
+    "/api/images/analyze-batch": (UPLOAD_MAX_BYTES + _MULTIPART_OVERHEAD) * VISION_BATCH_MAX_FILES,
+}
+
+def _too_large() -> HTTPException:
+    return HTTPException(status_code=413, detail="Upload too large (limit 12 MB per image).")
+
+class UploadLimitMiddleware:
+    """
+    Caps the request body of the upload routes as it is received. A
+    Content-Length over the limit is answered with 413 without reading the
+    body; otherwise the byte count is checked on every received chunk and
+    the request fails with 413 as soon as it passes the limit, so no more
+    than the limit is ever spooled. Per-file limits are still checked in
+    _store_upload.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = _BODY_LIMITS.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            return await self.app(scope, receive, send)
+
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                if value.isdigit() and int(value) > limit:
+                    return await _error_response(_too_large())(scope, receive, send)
+                break
+
+        received = 0
+        started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPException from body parsing as-is
+                    raise _too_large()
+            return message
+
+        async def send_wrapper(message):
+            nonlocal started
+            if message["type"] == "http.response.start":
+                started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, send_wrapper)
+        except HTTPException as e:
+            # raised outside the app's exception handlers (e.g. while a
+            # middleware read the body): answer here if nothing was sent
+            if started or e.status_code != 413:
+                raise
+            await _error_response(e)(scope, receive, send)
+
+def _error_response(e: HTTPException) -> JSONResponse:
+    return JSONResponse({"detail": e.detail}, status_code=e.status_code)
+
+def _store_upload(src, declared_size: Optional[int], dirpath: str = "uploads") -> tuple[str, str]:
+    """
+    Copy the spooled upload in chunks to a temp file in dirpath, hashing it
+    in the same loop. Enforces UPLOAD_MAX_BYTES per file (the middleware
+    above only bounds the whole request body). Returns (sha256, temp path);
+    the caller renames the temp file into place or removes it.
+    """
+    if declared_size is not None and declared_size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Image too large (limit 12 MB).")
+    h = hashlib.sha256()
+    size = 0
+    src.seek(0)
+    fd, tmp_path = tempfile.mkstemp(dir=dirpath, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while chunk := src.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > UPLOAD_MAX_BYTES:
+                    raise HTTPException(status_code=413, detail="Image too large (limit 12 MB).")
+                h.update(chunk)
+                out.write(chunk)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    metrics.UPLOAD_BYTES.labels("image").observe(size)
+    return h.hexdigest(), tmp_path
+
+def _discard(path: str) -> None:
+    with contextlib.suppress(FileNotFoundError):
+        os.unlink(path)
+
+def _with_file(fn, path: str):
+    """Run fn on the stored upload opened for reading."""
+    with open(path, "rb") as f:
+        return fn(f)
+
+def _validate_and_open_image(src) -> str:
+    """Validate the image quickly (format + basic decode). Returns the PIL format."""
+    src.seek(0)
+    kind = imghdr.what(src)
     if kind not in {"png", "jpeg", "gif", "bmp", "tiff", "webp"}:
         # allow some types even if imghdr fails; PIL will decide
         pass
     try:
-        Image.open(io.BytesIO(raw)).verify()
+        img = Image.open(src)
+        fmt = img.format or ""
+        img.verify()
+        return fmt
     except UnidentifiedImageError:
         raise HTTPException(status_code=400, detail="Unsupported or corrupted image.")
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Invalid image: {e}")
 
-def _to_data_url(image_bytes: bytes, filename: str | None) -> str:
-    ext = (filename or "image.png").split(".")[-1].lower()
-    kind = imghdr.what(None, image_bytes) or ext or "png"
-    if kind in ("jpg", "jpeg"):
-        kind = "jpeg"
+def _prepare_for_vision(src) -> tuple[bytes, str]:
+    """
+    Shrink an upload to what the vision model needs: apply EXIF orientation,
+    downscale to VISION_MAX_EDGE, drop metadata and re-encode as JPEG/WebP.
+    Returns (encoded_bytes, kind). The original file on disk is untouched.
+    """
+    src.seek(0)
+    img = Image.open(src)
+    # let the JPEG decoder downsample while decoding (much cheaper than a full
+    # decode); draft() keeps both edges >= the requested size, so ask for the
+    # thumbnail's size, not a VISION_MAX_EDGE square
+    w, h = img.size
+    scale = min(1.0, VISION_MAX_EDGE / max(w, h))
+    img.draft("RGB", (max(1, round(w * scale)), max(1, round(h * scale))))
+    # shrink before rotating: the bound is square, and rotating the small
+    # copy avoids a full-size one
+    img.thumbnail((VISION_MAX_EDGE, VISION_MAX_EDGE), Image.LANCZOS)
+    img = ImageOps.exif_transpose(img)
+
+    kind = "webp" if VISION_FORMAT == "webp" else "jpeg"
+    if kind == "jpeg" and img.mode != "RGB":
+        if img.mode in ("RGBA", "LA", "P"):
+            img = img.convert("RGBA")
+            bg = Image.new("RGB", img.size, (255, 255, 255))
+            bg.paste(img, mask=img.getchannel("A"))
+            img = bg
+        else:
+            img = img.convert("RGB")
+    elif kind == "webp" and img.mode not in ("RGB", "RGBA"):
+        img = img.convert("RGBA")
+
+    out = io.BytesIO()
+    # no exif/icc arguments -> metadata is stripped
+    img.save(out, format=kind.upper(), quality=VISION_QUALITY)
+    return out.getvalue(), kind
+
+def _to_data_url(image_bytes: bytes, kind: str) -> str:
     b64 = base64.b64encode(image_bytes).decode("utf-8")
     return f"data:image/{kind};base64,{b64}"
 
-def _call_openrouter_vision(data_url: str) -> dict:
+def _vision_model() -> str:
+    return os.getenv("OPENROUTER_VISION_MODEL", "qwen/qwen2.5-vl-72b-instruct:free")
+
+def _get_cached_analysis(sha256: str, model: str) -> Optional[dict]:
+    with ENGINE.begin() as c:
+        row = c.execute(text("""
+            SELECT caption, tags, model, url FROM image_analyses
+            WHERE sha256 = :sha AND model = :model
+        """), {"sha": sha256, "model": model}).mappings().first()
+    if not row:
+        return None
+    return {"caption": row["caption"], "tags": list(row["tags"] or []), "model": row["model"], "url": row["url"]}
+
+def _store_analysis(sha256: str, result: dict, url: str) -> None:
+    with ENGINE.begin() as c:
+        c.execute(text("""
+            INSERT INTO image_analyses (sha256, model, caption, tags, url)
+            VALUES (:sha, :model, :caption, :tags, :url)
+            ON CONFLICT (sha256, model) DO UPDATE
+              SET caption = EXCLUDED.caption, tags = EXCLUDED.tags, url = EXCLUDED.url, created_at = now()
+        """), {"sha": sha256, "model": result["model"], "caption": result["caption"], "tags": result["tags"], "url": url})
+
+async def _call_openrouter_vision(data_url: str) -> dict:
     api_key = _require_env("OPENROUTER_API_KEY")
-    model = os.getenv("OPENROUTER_VISION_MODEL", "qwen/qwen2.5-vl-72b-instruct:free")
+    model = _vision_model()
     referer = os.getenv("OPENROUTER_REFERER", "https://inspire-ai.local")
     app_title = os.getenv("OPENROUTER_APP_TITLE", "Inspire AI")
 
-    url = "https://openrouter.ai/api/v1/chat/completions"
     headers = {
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json",
@@ -117,14 +347,19 @@ def _call_openrouter_vision(data_url: str) -> dict:
     }
 
     try:
-        resp = requests.post(url, headers=headers, data=json.dumps(body), timeout=60)
-    except requests.RequestException as e:
+        async with metrics.track_llm("openrouter", body["model"]) as call:
+            resp = await llm.post_with_retries(
+                llm.openrouter_client, "/chat/completions", headers=headers, content=json.dumps(body)
+            )
+    except httpx.HTTPError as e:
         raise HTTPException(status_code=502, detail=f"OpenRouter network error: {e}")
 
     if resp.status_code != 200:
+        call.error(f"http_{resp.status_code}")
         raise HTTPException(status_code=502, detail=f"OpenRouter error: {resp.text}")
 
     data = resp.json()
+    call.usage(data.get("usage"))
     try:
         content = data["choices"][0]["message"]["content"]
     except Exception:
@@ -163,30 +398,35 @@ def _call_openrouter_vision(data_url: str) -> dict:
 
 # ---------- Routes: Vision ----------
 
-@router.post("/analyze", response_model=AnalysisResp)
-async def analyze_image(file: UploadFile = File(...)):
-    """
-    Upload one image (form-data 'file') and get a caption + tags from a Vision model.
-    Returns: { caption, tags[], model, url }
-    """
+async def _analyze_upload(file: UploadFile, vision_sem: Optional[asyncio.Semaphore] = None) -> AnalysisResp:
     if not file.content_type or not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="Only image files are allowed.")
 
-    raw = await file.read()
-    if len(raw) > 12 * 1024 * 1024:  # 12MB limit
-        raise HTTPException(status_code=413, detail="Image too large (limit 12 MB).")
-
-    _validate_and_open_image(raw)
-    data_url = _to_data_url(raw, file.filename)
-    vision_result = _call_openrouter_vision(data_url)
+    sha256, tmp_path = await _in_pool(_store_upload, file.file, file.size)
+    try:
+        vision_result = await run_in_threadpool(_get_cached_analysis, sha256, _vision_model())
 
-    # Save the actual file
-    ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-    filename = f"{os.urandom(8).hex()}.{ext}"
-    filepath = os.path.join("uploads", filename)
-    
-    with open(filepath, "wb") as f:
-        f.write(raw)
+        if vision_result and os.path.exists(os.path.join("uploads", vision_result["url"])):
+            # same bytes seen before: no validation, no OpenRouter call, nothing kept
+            filename = vision_result["url"]
+        else:
+            with profiling.span("pil"):
+                fmt = await _in_pool(_with_file, _validate_and_open_image, tmp_path)
+            ext = _EXT_BY_FORMAT.get(fmt) or (file.filename.split(".")[-1].lower() if "." in file.filename else "jpg")
+            filename = f"{sha256}.{ext}"
+            if vision_result is None:
+                with profiling.span("pil"):
+                    prepared, kind = await _in_pool(_with_file, _prepare_for_vision, tmp_path)
+                async with (vision_sem or contextlib.nullcontext()):
+                    vision_result = await _call_openrouter_vision(_to_data_url(prepared, kind))
+                await run_in_threadpool(_store_analysis, sha256, vision_result, filename)
+
+            # Keep the file under its content hash (unless already there)
+            filepath = os.path.join("uploads", filename)
+            if not os.path.exists(filepath):
+                os.replace(tmp_path, filepath)
+    finally:
+        await _in_pool(_discard, tmp_path)
 
     # Return analysis + file path
     return AnalysisResp(
@@ -196,12 +436,54 @@ async def analyze_image(file: UploadFile = File(...)):
         url=filename  # ← Add this line!
     )
 
+def _merge_tags(tag_lists: List[List[str]]) -> List[str]:
+    """Dedupe tags across images: most frequent first, ties by first appearance."""
+    counts: Dict[str, int] = {}
+    for tags in tag_lists:
+        for t in dict.fromkeys(t.strip().lower() for t in tags if t and t.strip()):
+            counts[t] = counts.get(t, 0) + 1
+    return sorted(counts, key=lambda t: -counts[t])
 
-# ---------- Routes: DB (attach/list) ----------
-import json
-import logging
+@router.post("/analyze", response_model=AnalysisResp)
+async def analyze_image(file: UploadFile = File(...)):
+    """
+    Upload one image (form-data 'file') and get a caption + tags from a Vision model.
+    Returns: { caption, tags[], model, url }
+    """
+    return await _analyze_upload(file)
 
-logger = logging.getLogger(__name__)
+@router.post("/analyze-batch", response_model=BatchAnalysisResp)
+async def analyze_images_batch(files: List[UploadFile] = File(...)):
+    """
+    Upload several images (repeated form-data 'files') in one request.
+    Hashing/validation/preprocessing run in parallel; at most
+    VISION_BATCH_CONCURRENCY vision calls are in flight. Results keep the
+    upload order and carry a per-file error instead of failing the batch.
+    """
+    if len(files) > VISION_BATCH_MAX_FILES:
+        raise HTTPException(status_code=400, detail=f"Too many files (limit {VISION_BATCH_MAX_FILES}).")
+    sem = asyncio.Semaphore(VISION_BATCH_CONCURRENCY)
+
+    async def one(i: int, f: UploadFile) -> BatchAnalysisItem:
+        try:
+            return BatchAnalysisItem(index=i, filename=f.filename or "", result=await _analyze_upload(f, sem))
+        except HTTPException as e:
+            return BatchAnalysisItem(index=i, filename=f.filename or "", error=str(e.detail), status=e.status_code)
+        except Exception as e:
+            logger.exception("Batch analysis failed for %s", f.filename)
+            return BatchAnalysisItem(index=i, filename=f.filename or "", error=f"Analysis failed: {e}", status=500)
+
+    results = await asyncio.gather(*[one(i, f) for i, f in enumerate(files)])
+    ok = [r.result for r in results if r.result]
+    return BatchAnalysisResp(
+        results=results,
+        image_captions=[r.caption for r in ok],
+        image_tags=[r.tags for r in ok],
+        merged_tags=_merge_tags([r.tags for r in ok]),
+    )
+
+
+# ---------- Routes: DB (attach/list) ----------
 
 @router.post("/attach/{item_id}", response_model=ImageOut)
 def attach_image_to_item(item_id: str, body: ImageIn):
@@ -0,0 +1,242 @@
+# backend/app/importer.py
+"""
+Bulk import of Library items from NDJSON or CSV.
+
+Rows are read and validated one at a time against ItemIn, with tags
+normalized the same way as create_item. Valid rows are fingerprinted
+(see fingerprint.py) and written to the COPY buffer, which is flushed
+through COPY ... FROM STDIN every IMPORT_BATCH_SIZE rows. Invalid rows
+are skipped and reported by row number (1-based data rows; the CSV
+header is not counted). The first IMPORT_MAX_ERRORS errors are listed.
+
+The whole import is one transaction. With an idempotency key, the key
+is claimed in item_imports in that same transaction and the result is
+stored with it. A retry with the same key returns the stored result
+(replayed=true) and inserts nothing. A concurrent retry waits on the
+key until the first import commits or rolls back.
+
+CLI (from the repo root):
+    python -m backend.app.importer posts.ndjson --user alice [--key K] [--format csv]
+
+Env (optional):
+  IMPORT_BATCH_SIZE=5000
+  IMPORT_MAX_ERRORS=100
+"""
+
+import argparse
+import codecs
+import csv
+import io
+import json
+import os
+from typing import IO, Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import text
+
+from . import fingerprint, retrieval
+from .db import ENGINE
+from .schemas import ItemIn, normalize_tags
+
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "5000"))
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "100"))
+
+_COPY_SQL = (
+    "COPY items (title, content, platform, tone, mode, words, model, tags, pinned, user_id,"
+    " simhash, simhash_bands) FROM STDIN WITH (FORMAT csv, NULL '\\N')"
+)
+
+
+def _lines(src: IO[bytes], bad: set) -> Iterator[str]:
+    """
+    Decoded lines of src, split on b"\n" only (binary readline), so
+    U+2028, \x0c and the other str.splitlines() breaks stay inside a
+    field and exported content round-trips. Numbers of lines that are
+    not valid UTF-8 are added to `bad`; they are decoded with
+    replacement so the CSV parser can keep going.
+    """
+    for i, raw in enumerate(src, 1):
+        if i == 1 and raw.startswith(codecs.BOM_UTF8):
+            raw = raw[len(codecs.BOM_UTF8):]
+        try:
+            yield raw.decode("utf-8")
+        except UnicodeDecodeError:
+            bad.add(i)
+            yield raw.decode("utf-8", "replace")
+
+
+def _records(src: IO[bytes], fmt: str) -> Iterator[Tuple[int, Any]]:
+    """(row number, dict or exception) for each data row, streamed."""
+    bad: set = set()
+    lines = _lines(src, bad)
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        n = 0
+        while True:
+            start = reader.line_num
+            try:
+                row = next(reader)
+            except StopIteration:
+                return
+            except csv.Error as e:
+                # oversized field, NUL byte, ...: report it, the reader resumes on the next line
+                n += 1
+                yield n, e
+                continue
+            n += 1
+            if bad.intersection(range(start + 1, reader.line_num + 1)):
+                yield n, ValueError("row is not valid UTF-8")
+                continue
+            # empty CSV cells mean "not set"
+            yield n, {k: v for k, v in row.items() if k and v not in ("", None)}
+    n = 0
+    for i, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        n += 1
+        if i in bad:
+            yield n, ValueError("row is not valid UTF-8")
+            continue
+        try:
+            yield n, json.loads(line)
+        except ValueError as e:
+            yield n, e
+
+
+def _validate(record: Any) -> ItemIn:
+    if not isinstance(record, dict):
+        raise ValueError("row is not an object")
+    if any(isinstance(v, str) and "\x00" in v for v in record.values()):
+        # PostgreSQL text can't hold NUL; fail the row, not the COPY
+        raise ValueError("row contains a NUL character")
+    if "tags" in record:
+        record = {**record, "tags": normalize_tags(record["tags"])}
+    return ItemIn.model_validate(record)
+
+
+def _copy_value(value: Any) -> str:
+    """One field in COPY's CSV format; NULL is an unquoted \\N."""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, int):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _array_literal(values: List[Any]) -> str:
+    """PostgreSQL array literal, e.g. {"a","b"} for TEXT[] or {1,2} for INT[]."""
+    parts = []
+    for v in values:
+        if isinstance(v, int):
+            parts.append(str(v))
+        else:
+            parts.append('"' + str(v).replace("\\", "\\\\").replace('"', '\\"') + '"')
+    return "{" + ",".join(parts) + "}"
+
+
+def _copy_line(item: ItemIn, user_id: str) -> str:
+    fp = fingerprint.fingerprint(item.title, item.content)
+    return ",".join([
+        _copy_value(item.title),
+        _copy_value(item.content),
+        _copy_value(item.platform),
+        _copy_value(item.tone),
+        _copy_value(item.mode),
+        _copy_value(item.words),
+        _copy_value(item.model),
+        _copy_value(_array_literal(item.tags)),
+        _copy_value(item.pinned),
+        _copy_value(user_id),
+        _copy_value(fp["simhash"]),
+        _copy_value(_array_literal(fp["simhash_bands"])),
+    ]) + "\n"
+
+
+def import_items(
+    src: IO[bytes],
+    fmt: str,
+    user_id: str,
+    idempotency_key: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Load items for one user from a binary NDJSON/CSV stream.
+    Returns {"imported", "failed", "errors", "replayed"}. Blocking.
+    """
+    with ENGINE.begin() as c:
+        if idempotency_key:
+            claimed = c.execute(text("""
+                INSERT INTO item_imports (user_id, idempotency_key)
+                VALUES (CAST(:uid AS UUID), :key)
+                ON CONFLICT DO NOTHING
+                RETURNING 1
+            """), {"uid": user_id, "key": idempotency_key}).first()
+            if not claimed:
+                result = c.execute(text("""
+                    SELECT result FROM item_imports
+                    WHERE user_id = CAST(:uid AS UUID) AND idempotency_key = :key
+                """), {"uid": user_id, "key": idempotency_key}).scalar()
+                return {**(result or {}), "replayed": True}
+
+        cur = c.connection.cursor()
+        buf = io.StringIO()
+        pending = imported = failed = 0
+        errors: List[Dict[str, Any]] = []
+        for n, record in _records(src, fmt):
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                buf.write(_copy_line(_validate(record), user_id))
+            except (ValueError, ValidationError, csv.Error) as e:
+                failed += 1
+                if len(errors) < IMPORT_MAX_ERRORS:
+                    errors.append({"row": n, "error": str(e)})
+                continue
+            pending += 1
+            if pending >= IMPORT_BATCH_SIZE:
+                buf.seek(0)
+                cur.copy_expert(_COPY_SQL, buf)
+                imported += pending
+                pending = 0
+                buf = io.StringIO()
+        if pending:
+            buf.seek(0)
+            cur.copy_expert(_COPY_SQL, buf)
+            imported += pending
+
+        result = {"imported": imported, "failed": failed, "errors": errors}
+        if idempotency_key:
+            c.execute(text("""
+                UPDATE item_imports SET result = CAST(:result AS JSONB)
+                WHERE user_id = CAST(:uid AS UUID) AND idempotency_key = :key
+            """), {"uid": user_id, "key": idempotency_key, "result": json.dumps(result)})
+
+    if imported:
+        retrieval.invalidate(user_id)
+    return {**result, "replayed": False}
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Import Library items from NDJSON or CSV")
+    ap.add_argument("path")
+    ap.add_argument("--user", required=True, help="username or user id to import for")
+    ap.add_argument("--format", choices=["ndjson", "csv"], help="default: from the file extension")
+    ap.add_argument("--key", help="idempotency key; re-running with the same key is a no-op")
+    args = ap.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "ndjson")
+    with ENGINE.begin() as c:
+        user_id = c.execute(text("""
+            SELECT id::text FROM users WHERE username = :u OR id::text = :u
+        """), {"u": args.user}).scalar()
+    if not user_id:
+        raise SystemExit(f"unknown user: {args.user}")
+
+    with open(args.path, "rb") as f:
+        result = import_items(f, fmt, user_id, args.key)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
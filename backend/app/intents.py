@@ -0,0 +1,248 @@
+# backend/app/intents.py
+"""
+Local intent router in front of the agent LLM.
+
+Simple questions ("hi", "how many posts did I write this week",
+"show my last LinkedIn post", "list my 5 latest blogs") are matched by a
+small rule/keyword classifier and answered straight from the items
+table, in the same {thinking, final_answer} shape as the LLM path.
+Anything no rule matches falls through to the LLM.
+
+Handlers register with @intent(name, *patterns) and receive the regex
+match (m.string is the normalized message); the first matching pattern
+wins, in registration order. Patterns are anchored at both ends, so a
+question with extra wording ("... about marketing", "... should I
+publish per week") goes to the LLM instead of being half-answered.
+Counters in stats() show the share of requests answered without an LLM
+call.
+
+Env (optional):
+  AGENT_ROUTER=1      # set to 0 to send everything to the LLM
+"""
+
+import logging
+import os
+import re
+import threading
+from typing import Any, Callable, Dict, List, Match, Optional, Pattern, Tuple
+
+from sqlalchemy import text
+
+from .db import ENGINE
+
+AGENT_ROUTER = os.getenv("AGENT_ROUTER", "1").lower() not in ("0", "false", "no")
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[str, Match[str]], Dict[str, str]]
+_INTENTS: List[Tuple[str, List[Pattern[str]], Handler]] = []
+
+_stats_lock = threading.Lock()
+_stats: Dict[str, Any] = {"total": 0, "handled": 0, "fallthrough": 0, "errors": 0, "by_intent": {}}
+
+
+def intent(name: str, *patterns: str):
+    """Register a handler for messages matching any of the regex patterns."""
+    compiled = [re.compile(p) for p in patterns]
+
+    def deco(fn: Handler) -> Handler:
+        _INTENTS.append((name, compiled, fn))
+        return fn
+    return deco
+
+
+def _normalize(message: str) -> str:
+    return re.sub(r"[\s?!.]+$", "", message.strip().lower())
+
+
+def _count(key: str) -> None:
+    with _stats_lock:
+        _stats[key] += 1
+
+
+def route(user_id: str, message: str) -> Optional[Dict[str, str]]:
+    """
+    Answer locally or return None to fall through to the LLM.
+    Blocking (SQL); call through run_in_threadpool.
+    """
+    _count("total")
+    if not AGENT_ROUTER:
+        _count("fallthrough")
+        return None
+    msg = _normalize(message)
+    for name, patterns, handler in _INTENTS:
+        for p in patterns:
+            m = p.search(msg)
+            if not m:
+                continue
+            try:
+                answer = handler(user_id, m)
+            except Exception as e:
+                logger.error(f"Intent {name} failed, falling back to LLM: {e}")
+                _count("errors")
+                _count("fallthrough")
+                return None
+            with _stats_lock:
+                _stats["handled"] += 1
+                _stats["by_intent"][name] = _stats["by_intent"].get(name, 0) + 1
+            return answer
+    _count("fallthrough")
+    return None
+
+
+def stats() -> Dict[str, Any]:
+    with _stats_lock:
+        total = _stats["total"]
+        return {
+            **_stats,
+            "by_intent": dict(_stats["by_intent"]),
+            "local_share": (_stats["handled"] / total) if total else 0.0,
+        }
+
+
+# ---------- shared parsing ----------
+
+_PLATFORM_RE = re.compile(r"\b(linkedin|instagram|insta|ig|facebook|fb|blogs?)\b")
+_PLATFORM_ALIASES = {"insta": "instagram", "ig": "instagram", "fb": "facebook", "blogs": "blog"}
+_PERIOD_RE = re.compile(
+    r"\b(today|yesterday|(?:this|last) (?:week|month|year)|(?:in the )?(?:last|past) (\d{1,3}) days)\b"
+)
+# (lower bound, upper bound or None)
+_PERIOD_SQL = {
+    "today": ("date_trunc('day', now())", None),
+    "yesterday": ("date_trunc('day', now()) - interval '1 day'", "date_trunc('day', now())"),
+    "this week": ("date_trunc('week', now())", None),
+    "last week": ("date_trunc('week', now()) - interval '1 week'", "date_trunc('week', now())"),
+    "this month": ("date_trunc('month', now())", None),
+    "last month": ("date_trunc('month', now()) - interval '1 month'", "date_trunc('month', now())"),
+    "this year": ("date_trunc('year', now())", None),
+    "last year": ("date_trunc('year', now()) - interval '1 year'", "date_trunc('year', now())"),
+}
+# pattern pieces for the optional "on LinkedIn" / "last week" qualifiers
+_PLATFORM_WORD = r"(?:linkedin|instagram|insta|ig|facebook|fb|blog)"
+_ON_PLATFORM = r"(?: (?:on|for) " + _PLATFORM_WORD + r")?"
+_IN_PERIOD = (
+    r"(?: (?:from |in |during )?(?:today|yesterday|(?:this|last) (?:week|month|year)"
+    r"|(?:the )?(?:last|past) \d{1,3} days))?"
+)
+_PLATFORM_LABEL = {"linkedin": "LinkedIn", "instagram": "Instagram", "facebook": "Facebook", "blog": "blog"}
+
+
+def _platform(msg: str) -> Optional[str]:
+    m = _PLATFORM_RE.search(msg)
+    return _PLATFORM_ALIASES.get(m.group(1), m.group(1)) if m else None
+
+
+def _filters(user_id: str, msg: str) -> Tuple[List[str], Dict[str, Any]]:
+    """WHERE clauses for the platform and time range mentioned in the message."""
+    where, params = ["user_id = CAST(:uid AS UUID)"], {"uid": user_id}
+    platform = _platform(msg)
+    if platform:
+        where.append("platform = :platform")
+        params["platform"] = platform
+    period = _PERIOD_RE.search(msg)
+    if period:
+        if period.group(2):
+            where.append("created_at >= now() - make_interval(days => :days)")
+            params["days"] = int(period.group(2))
+        else:
+            start, end = _PERIOD_SQL[period.group(1)]
+            where.append(f"created_at >= {start}")
+            if end:
+                where.append(f"created_at < {end}")
+    return where, params
+
+
+def _label(msg: str, plural: bool = True) -> str:
+    platform = _platform(msg)
+    noun = "posts" if plural else "post"
+    return f"{_PLATFORM_LABEL[platform]} {noun}" if platform else noun
+
+
+def _preview(content: str, limit: int = 280) -> str:
+    content = " ".join(content.split())
+    return content if len(content) <= limit else content[:limit].rstrip() + "…"
+
+
+# ---------- intents ----------
+
+@intent("greeting", r"^(hi|hello|hey|yo|hola|bonjour|greetings|good (morning|afternoon|evening))( there)?$")
+def _greeting(user_id: str, m: Match[str]) -> Dict[str, str]:
+    return {
+        "thinking": "",
+        "final_answer": (
+            "Hi there! 👋 I can help you brainstorm, rewrite, or find things in your library. "
+            "Try “how many posts did I write this week?” or “show my last LinkedIn post”."
+        ),
+    }
+
+
+@intent(
+    "count",
+    r"^how many (" + _PLATFORM_WORD + r" )?(posts?|items?|blogs?|drafts?)" + _ON_PLATFORM
+    + r"( (do i have|have i (written|published|created|saved)|did i (write|publish|create|save)|i (have|wrote)))?"
+    + _ON_PLATFORM + _IN_PERIOD + r"$",
+)
+def _count_items(user_id: str, m: Match[str]) -> Dict[str, str]:
+    where, params = _filters(user_id, m.string)
+    with ENGINE.connect() as c:
+        n = c.execute(text(f"SELECT count(*) FROM items WHERE {' AND '.join(where)}"), params).scalar()
+    period = _PERIOD_RE.search(m.string)
+    when = f" {period.group(1)}" if period else ""
+    return {
+        "thinking": "🔍 Counted the matching items in your library.",
+        "final_answer": f"You have written {n} {_label(m.string, plural=n != 1)}{when}.",
+    }
+
+
+@intent(
+    "latest",
+    r"^(show( me)?|get|find|open|what('s| is| was)) my (last|latest|most recent|newest) "
+    r"(" + _PLATFORM_WORD + r" )?(post|blog|draft|item)" + _ON_PLATFORM + r"$",
+)
+def _latest_item(user_id: str, m: Match[str]) -> Dict[str, str]:
+    where, params = _filters(user_id, m.string)
+    with ENGINE.connect() as c:
+        row = c.execute(text(f"""
+            SELECT title, content, platform, created_at FROM items
+            WHERE {' AND '.join(where)}
+            ORDER BY created_at DESC LIMIT 1
+        """), params).mappings().first()
+    if not row:
+        return {"thinking": "🔍 Looked up your most recent item.",
+                "final_answer": f"You don't have any {_label(m.string)} yet."}
+    return {
+        "thinking": "🔍 Looked up your most recent item.",
+        "final_answer": (
+            f"Your last {_label(m.string, plural=False)} is **{row['title'] or 'Untitled'}** "
+            f"({row['platform']}, {row['created_at'].strftime('%b %d, %Y')}):\n\n{_preview(row['content'], 1200)}"
+        ),
+    }
+
+
+@intent(
+    "list",
+    r"^(list|show( me)?|what are)( all)? my (?P<n>\d{1,2} )?((last|latest|recent|most recent) )?(?P<n2>\d{1,2} )?"
+    r"(" + _PLATFORM_WORD + r" )?(posts|blogs|drafts|items)" + _ON_PLATFORM + _IN_PERIOD + r"$",
+)
+def _list_items(user_id: str, m: Match[str]) -> Dict[str, str]:
+    where, params = _filters(user_id, m.string)
+    params["lim"] = max(1, min(int(m.group("n") or m.group("n2") or 5), 20))
+    with ENGINE.connect() as c:
+        rows = c.execute(text(f"""
+            SELECT title, content, platform, created_at FROM items
+            WHERE {' AND '.join(where)}
+            ORDER BY created_at DESC LIMIT :lim
+        """), params).mappings().all()
+    if not rows:
+        return {"thinking": "🔍 Listed your recent items.",
+                "final_answer": f"You don't have any {_label(m.string)} yet."}
+    lines = [
+        f"{i}. **{r['title'] or 'Untitled'}** ({r['platform']}, {r['created_at'].strftime('%b %d, %Y')}) — "
+        f"{_preview(r['content'], 120)}"
+        for i, r in enumerate(rows, 1)
+    ]
+    return {
+        "thinking": "🔍 Listed your recent items.",
+        "final_answer": f"Here are your {len(rows)} most recent {_label(m.string)}:\n\n" + "\n".join(lines),
+    }
@@ -0,0 +1,129 @@
+# backend/app/llm.py
+"""
+Shared LLM clients for the whole process.
+
+A single AsyncGroq client sits on top of one keep-alive httpx connection
+pool, so concurrent requests reuse TLS connections instead of opening a
+new one per completion, and never block the event loop. OpenRouter
+(vision) gets its own pooled httpx client, using HTTP/2 when the optional
+`h2` package is installed, plus retries with jittered backoff.
+
+Env:
+  GROQ_API_KEY=gsk_xxx
+Optional:
+  GROQ_BASE_URL=http://127.0.0.1:9100   (e.g. a local stub server)
+  LLM_MAX_CONNECTIONS=100
+  LLM_MAX_KEEPALIVE=20
+  LLM_TIMEOUT=60
+  OPENROUTER_BASE_URL=https://openrouter.ai/api/v1
+  OPENROUTER_MAX_CONNECTIONS=50
+  OPENROUTER_MAX_KEEPALIVE=10
+  OPENROUTER_TIMEOUT=60
+  OPENROUTER_MAX_RETRIES=3
+  OPENROUTER_BACKOFF=0.5                (base delay in seconds)
+  OPENROUTER_MAX_RETRY_AFTER=10         (longer Retry-After: give up instead of waiting)
+"""
+
+import asyncio
+import os
+import random
+
+import httpx
+from dotenv import load_dotenv
+from groq import AsyncGroq
+
+load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
+
+GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL") or None
+
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+_http_client = httpx.AsyncClient(
+    limits=httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE,
+    ),
+    timeout=httpx.Timeout(LLM_TIMEOUT, connect=10.0),
+)
+
+groq_client = (
+    AsyncGroq(api_key=GROQ_API_KEY, base_url=GROQ_BASE_URL, http_client=_http_client)
+    if GROQ_API_KEY else None
+)
+
+OPENROUTER_BASE_URL = os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
+OPENROUTER_MAX_CONNECTIONS = int(os.getenv("OPENROUTER_MAX_CONNECTIONS", "50"))
+OPENROUTER_MAX_KEEPALIVE = int(os.getenv("OPENROUTER_MAX_KEEPALIVE", "10"))
+OPENROUTER_TIMEOUT = float(os.getenv("OPENROUTER_TIMEOUT", "60"))
+OPENROUTER_MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "3"))
+OPENROUTER_BACKOFF = float(os.getenv("OPENROUTER_BACKOFF", "0.5"))
+OPENROUTER_MAX_RETRY_AFTER = float(os.getenv("OPENROUTER_MAX_RETRY_AFTER", "10"))
+
+try:
+    import h2  # noqa: F401  (optional: enables HTTP/2 in httpx)
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+openrouter_client = httpx.AsyncClient(
+    base_url=OPENROUTER_BASE_URL,
+    http2=_HTTP2,
+    limits=httpx.Limits(
+        max_connections=OPENROUTER_MAX_CONNECTIONS,
+        max_keepalive_connections=OPENROUTER_MAX_KEEPALIVE,
+    ),
+    timeout=httpx.Timeout(OPENROUTER_TIMEOUT, connect=10.0),
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _retry_delay(attempt: int, resp: httpx.Response | None) -> float | None:
+    """
+    Full-jitter exponential backoff; honours a numeric Retry-After up to
+    OPENROUTER_MAX_RETRY_AFTER. None means the server asked for a longer
+    wait: don't retry.
+    """
+    if resp is not None:
+        retry_after = resp.headers.get("Retry-After", "")
+        if retry_after.isdigit():
+            delay = float(retry_after)
+            return delay if delay <= OPENROUTER_MAX_RETRY_AFTER else None
+    return random.uniform(0, OPENROUTER_BACKOFF * (2 ** attempt))
+
+
+async def post_with_retries(client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+    """
+    POST with up to OPENROUTER_MAX_RETRIES retries on 429/5xx and network
+    errors. Returns the last response (or the first whose Retry-After is
+    too long to wait for); re-raises the last network error.
+    """
+    for attempt in range(OPENROUTER_MAX_RETRIES + 1):
+        last = attempt == OPENROUTER_MAX_RETRIES
+        try:
+            resp = await client.post(url, **kwargs)
+        except httpx.TransportError:
+            if last:
+                raise
+            await asyncio.sleep(_retry_delay(attempt, None))
+            continue
+        if resp.status_code not in RETRY_STATUSES or last:
+            return resp
+        delay = _retry_delay(attempt, resp)
+        if delay is None:
+            return resp
+        await asyncio.sleep(delay)
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token) for prompt budgeting."""
+    return (len(text) + 3) // 4
+
+
+async def aclose() -> None:
+    """Close the shared connection pools (called on app shutdown)."""
+    await _http_client.aclose()
+    await openrouter_client.aclose()
@@ -1,6 +1,12 @@
 import os
-from fastapi import FastAPI, HTTPException, Depends, Security, Body
+import asyncio
+import base64
+import csv
+import io
+import uuid
+from fastapi import FastAPI, HTTPException, Depends, Security, Body, Request, Response, UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Literal
@@ -9,8 +15,8 @@ from sqlalchemy import text
 from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 from jose import jwt, JWTError
-from passlib.context import CryptContext
-from . import images
+from starlette.concurrency import run_in_threadpool
+from . import images, passwords, retrieval, fingerprint, importer, metrics, profiling
 import json
 from fastapi.staticfiles import StaticFiles
 from .agent import router as agent_router
@@ -23,23 +29,30 @@ from .auth import (
 )
 from sqlalchemy.orm import Session
 
-from .db import ENGINE, SessionLocal, init_db, get_db
-# --- Groq LLM client ---
-from groq import Groq
+from .db import ENGINE, SessionLocal, check_db, get_db
+from .sse import sse_event, sse_response
+from .gencache import GENERATION_CACHE, cache_key
+from .schemas import Item, ItemIn, normalize_tags
+# --- Groq LLM client (shared async pool) ---
+from . import llm
 
 # --- Environment ---
 load_dotenv(os.path.join(os.path.dirname(__file__), ".env"))
 SECRET_KEY = os.getenv("SECRET_KEY", "changeme")  # Set in backend/app/.env
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-app = FastAPI(title="InspireAI API", version="1.0.0")
+app = FastAPI(title="InspireAI API", version="1.0.0", default_response_class=profiling.ProfiledJSONResponse)
+app.router.route_class = profiling.ProfiledRoute
 
 app.include_router(agent_router, prefix="/api")
+app.include_router(profiling.router, prefix="/api")
 
 
 app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+# --- Upload size limit, enforced while the body arrives ---
+# Added first so it runs innermost: its 413s still go through CORS and metrics.
+app.add_middleware(images.UploadLimitMiddleware)
 # --- CORS ---
 app.add_middleware(
     CORSMiddleware,
@@ -49,17 +62,31 @@ app.add_middleware(
     allow_headers=["*"],  # Still fine, but let's also add...
     expose_headers=["*"],  # Optional: exposes all headers to frontend
 )
+# --- Prometheus metrics (GET /metrics) ---
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_route("/metrics", metrics.metrics_endpoint, include_in_schema=False)
+# --- Opt-in request profiling (X-Profile header / PROFILE_SAMPLE_RATE) ---
+app.add_middleware(profiling.ProfilingMiddleware)
+profiling.instrument_engine(ENGINE)
 
 # --- Groq config ---
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
+GENERATE_BATCH_CONCURRENCY = int(os.getenv("GENERATE_BATCH_CONCURRENCY", "4"))
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "1000"))
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "500"))
 DEFAULT_MODEL = os.getenv("DEFAULT_MODEL", "llama-3.1-8b-instant")
 BLOG_MODEL = os.getenv("BLOG_MODEL", "llama-3.1-8b-instant")
-client = Groq(api_key=GROQ_API_KEY) if GROQ_API_KEY else None
+client = llm.groq_client
 
-# --- Startup: ensure DB schema exists ---
+# --- Startup: verify DB schema version (migrations run out of band) ---
 @app.on_event("startup")
 def on_startup():
-    init_db()
+    check_db()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await llm.aclose()
+    passwords.shutdown()
 
 
 # --------- JWT User Dependency ---------
@@ -76,6 +103,26 @@ class GenerateIn(BaseModel):
     temperature: float = 0.7
     image_captions: Optional[List[str]] = None
     image_tags: Optional[List[List[str]]] = None
+    # "prefer": serve from the generation cache when possible
+    # "bypass": always call the LLM (the fresh result still refreshes the cache)
+    # "only":   never call the LLM, 404 on a cache miss
+    cache: Literal["bypass", "prefer", "only"] = "prefer"
+
+class GenerateTarget(BaseModel):
+    platform: Literal["linkedin", "instagram", "facebook", "blog"]
+    tone: Literal["professional", "friendly", "witty", "persuasive"] = "professional"
+    mode: Optional[Literal["social", "blog"]] = None  # defaults to "blog" for the blog platform
+    word_count: Optional[int] = None
+
+class GenerateBatchIn(BaseModel):
+    prompt: str = Field(..., description="User idea or topic")
+    targets: List[GenerateTarget] = Field(..., min_length=1, max_length=12)
+    audience: Optional[str] = "SMBs / startups"
+    word_count: int = 120
+    temperature: float = 0.7
+    image_captions: Optional[List[str]] = None
+    image_tags: Optional[List[List[str]]] = None
+    cache: Literal["bypass", "prefer", "only"] = "prefer"
 
 PLAT_TEMPLATES = {
     "linkedin": """Write a LinkedIn post ({wc} words) about: {topic}.
@@ -90,21 +137,17 @@ Audience: {audience}. Tone: {tone}. Use H2/H3 headings, short paragraphs, and a
 }
 SYSTEM = "You are a helpful content writer. Be clear, on-brand, and practical. No fluff. Be short and concise. And use creative hooks."
 
-class ItemIn(BaseModel):
-    title: Optional[str] = None
-    content: str
-    platform: Literal["linkedin", "instagram", "facebook", "blog"]
-    tone: Literal["professional", "friendly", "witty", "persuasive"]
-    mode: Literal["social", "blog"]
-    words: int
-    model: Optional[str] = None
-    tags: List[str] = []
-    pinned: bool = False
-
-class Item(ItemIn):
-    id: str
-    user_id: str
-    created_at: datetime
+class ItemFilter(BaseModel):
+    q: Optional[str] = None
+    platform: Optional[str] = None
+    tone: Optional[str] = None
+
+class BulkItemsIn(BaseModel):
+    action: Literal["delete", "pin", "unpin", "tag", "untag", "duplicate"]
+    # either explicit ids or a Library filter (same fields as GET /api/items)
+    ids: Optional[List[str]] = None
+    filter: Optional[ItemFilter] = None
+    tags: List[str] = []  # for tag / untag
 
 class UserLogin(BaseModel):
     username: str
@@ -128,23 +171,46 @@ def diag():
     k = GROQ_API_KEY or ""
     return {"has_key": bool(k), "prefix": k[:4] if k else None, "len": len(k)}
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
+def _get_user_by_username(username: str):
+    with ENGINE.begin() as c:
+        return c.execute(
+            text("SELECT id, username, hashed_password FROM users WHERE username = :u"),
+            {"u": username}
+        ).first()
+
+def _update_password_hash(user_id, hashed: str) -> None:
+    with ENGINE.begin() as c:
+        c.execute(text("UPDATE users SET hashed_password = :h WHERE id = :id"), {"h": hashed, "id": user_id})
+
+def _insert_user(username: str, hashed: str):
+    with ENGINE.begin() as c:
+        return c.execute(
+            text("""
+                INSERT INTO users (username, hashed_password)
+                VALUES (:u, :h)
+                RETURNING id, username, created_at
+            """),
+            {"u": username, "h": hashed}
+        ).first()
+
 @app.post("/api/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    result = db.execute(
-        text("SELECT id, username, hashed_password FROM users WHERE username = :u"),
-        {"u": user.username}
-    ).first()
-    if not result or not verify_password(user.password, result.hashed_password):
+async def login(user: UserLogin):
+    result = await run_in_threadpool(_get_user_by_username, user.username)
+    if not result:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    # bcrypt runs in the dedicated password pool, not the shared threadpool
+    ok, new_hash = await passwords.verify_password(user.password, result.hashed_password)
+    if not ok:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+    if new_hash:
+        # configured cost changed: store the upgraded hash
+        await run_in_threadpool(_update_password_hash, result.id, new_hash)
     token = create_access_token({"sub": result.username, "user_id": str(result.id)})
     return {"access_token": token, "token_type": "bearer", "user_id": str(result.id)}  # <-- includes user_id!
 
@@ -152,27 +218,21 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 import traceback
 
 @app.post("/api/register")
-def register(user: UserLogin, db: Session = Depends(get_db)):
-    hashed = pwd_context.hash(user.password)
+async def register(user: UserLogin):
+    hashed = await passwords.hash_password(user.password)
     try:
-        row = db.execute(
-            text("""
-                INSERT INTO users (username, hashed_password)
-                VALUES (:u, :h)
-                RETURNING id, username, created_at
-            """),
-            {"u": user.username, "h": hashed}
-        ).first()
-        db.commit()
+        row = await run_in_threadpool(_insert_user, user.username, hashed)
         return {"id": row.id, "username": row.username, "created_at": row.created_at}
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(status_code=400, detail=str(e))
 
-@app.post("/api/generate")
-def generate(data: GenerateIn):
-    if not client:
-        raise HTTPException(status_code=500, detail="GROQ_API_KEY not loaded")
+@app.get("/api/auth/password-pool")
+def password_pool_stats():
+    return passwords.stats()
+
+def _build_completion(data: GenerateIn) -> Dict[str, Any]:
+    """Turn a GenerateIn into the kwargs for chat.completions.create."""
     model = DEFAULT_MODEL if data.mode == "social" else BLOG_MODEL
     wc = max(60, min(data.word_count, 1200 if data.mode == "blog" else 220))
     base = PLAT_TEMPLATES["blog" if data.platform == "blog" else data.platform]
@@ -189,111 +249,419 @@ def generate(data: GenerateIn):
         tag_set = sorted({t.strip().lower() for t in flat_tags if t})
         if tag_set:
             topic += f"\n\nRelevant tags: {', '.join(tag_set)}"
-    print(">>> Received prompt:", data.prompt)
-    print(">>> Captions:", data.image_captions)
-    print(">>> Tags:", data.image_tags)
     user_prompt = base.format(
         wc=wc,
         topic=topic,
         audience=data.audience,
         tone=data.tone
     )
-    resp = client.chat.completions.create(
-        model=model,
-        temperature=data.temperature if data.mode == "social" else 0.6,
-        max_tokens=1400 if data.mode == "blog" else 500,
-        messages=[
+    return {
+        "model": model,
+        "temperature": data.temperature if data.mode == "social" else 0.6,
+        "max_tokens": 1400 if data.mode == "blog" else 500,
+        "messages": [
             {"role": "system", "content": SYSTEM},
             {"role": "user", "content": user_prompt},
         ],
-    )
+    }
+
+def _cache_lookup(data: GenerateIn, params: Dict[str, Any]):
+    """Return (key, cached_text_or_None) honouring data.cache."""
+    key = cache_key(params)
+    if data.cache == "bypass":
+        return key, None
+    cached = GENERATION_CACHE.get(key, partial=data.cache == "only")
+    if cached is None and data.cache == "only":
+        raise HTTPException(status_code=404, detail="No cached generation for this request")
+    return key, cached
+
+async def _generate_one(data: GenerateIn) -> Dict[str, Any]:
+    params = _build_completion(data)
+    key, cached = _cache_lookup(data, params)
+    if cached is not None:
+        result = cached
+    else:
+        async with metrics.track_llm("groq", params["model"]) as call:
+            resp = await client.chat.completions.create(**params)
+            call.usage(resp.usage)
+        result = resp.choices[0].message.content.strip()
+        GENERATION_CACHE.put(key, result, params["temperature"])
     return {
         "platform": data.platform,
         "mode": data.mode,
-        "result": resp.choices[0].message.content.strip(),
+        "result": result,
+        "cached": cached is not None,
     }
 
-@app.get("/api/items")
-def list_items(q: Optional[str] = None,
-               platform: Optional[str] = None,
-               tone: Optional[str] = None,
-               page: int = 1,
-               pageSize: int = 20,
-               user: dict = Depends(get_current_user)):
-    user_id = user["user_id"]
-    off = (page - 1) * pageSize
+@app.post("/api/generate")
+async def generate(data: GenerateIn):
+    if not client and data.cache != "only":
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not loaded")
+    return await _generate_one(data)
+
+def _batch_requests(data: GenerateBatchIn) -> List[GenerateIn]:
+    shared = data.model_dump(exclude={"targets", "word_count"})
+    return [
+        GenerateIn(
+            **shared,
+            platform=t.platform,
+            tone=t.tone,
+            mode=t.mode or ("blog" if t.platform == "blog" else "social"),
+            word_count=t.word_count or data.word_count,
+        )
+        for t in data.targets
+    ]
+
+async def _generate_batch_item(index: int, req: GenerateIn, sem: asyncio.Semaphore) -> Dict[str, Any]:
+    """Run one target; errors are reported in the result, never raised."""
+    async with sem:
+        try:
+            out = await _generate_one(req)
+        except HTTPException as e:
+            out = {"platform": req.platform, "mode": req.mode, "error": e.detail, "status": e.status_code}
+        except Exception as e:
+            out = {"platform": req.platform, "mode": req.mode, "error": f"Generation failed: {e}", "status": 502}
+    return {"index": index, "tone": req.tone, **out}
+
+@app.post("/api/generate/batch")
+async def generate_batch(data: GenerateBatchIn):
+    """
+    Generate one topic for several platform/tone targets concurrently
+    (at most GENERATE_BATCH_CONCURRENCY completions in flight).
+    Results come back in request order; failed targets carry "error".
+    """
+    if not client and data.cache != "only":
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not loaded")
+    sem = asyncio.Semaphore(GENERATE_BATCH_CONCURRENCY)
+    results = await asyncio.gather(*[
+        _generate_batch_item(i, req, sem) for i, req in enumerate(_batch_requests(data))
+    ])
+    return {"results": results}
+
+@app.post("/api/generate/batch/stream")
+async def generate_batch_stream(data: GenerateBatchIn):
+    """
+    Streaming variant of /api/generate/batch over SSE:
+      event: result  data: {"index", "platform", "tone", "mode", "result"|"error", ...}
+      event: done    data: {"count": n}
+    Each result is sent as soon as its completion finishes.
+    """
+    if not client and data.cache != "only":
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not loaded")
+    reqs = _batch_requests(data)
+
+    async def events():
+        sem = asyncio.Semaphore(GENERATE_BATCH_CONCURRENCY)
+        tasks = [asyncio.create_task(_generate_batch_item(i, req, sem)) for i, req in enumerate(reqs)]
+        try:
+            for fut in asyncio.as_completed(tasks):
+                yield sse_event("result", await fut)
+            yield sse_event("done", {"count": len(tasks)})
+        finally:
+            # client went away: stop whatever is still running
+            for t in tasks:
+                t.cancel()
+
+    return sse_response(events())
+
+@app.get("/api/generate/cache")
+def generate_cache_stats():
+    return GENERATION_CACHE.stats()
+
+@app.post("/api/generate/stream")
+async def generate_stream(data: GenerateIn, request: Request):
+    """
+    Same as /api/generate but streams tokens as Server-Sent Events:
+      event: token  data: {"text": "..."}      (one per chunk)
+      event: done   data: {"platform", "mode", "model", "cached"}
+      event: error  data: {"detail": "..."}
+    A cache hit is sent as a single token event.
+    The upstream Groq stream is closed as soon as the client goes away.
+    """
+    if not client and data.cache != "only":
+        raise HTTPException(status_code=500, detail="GROQ_API_KEY not loaded")
+    params = _build_completion(data)
+    key, cached = _cache_lookup(data, params)
+    done = {"platform": data.platform, "mode": data.mode, "model": params["model"], "cached": cached is not None}
+
+    async def replay():
+        yield sse_event("token", {"text": cached})
+        yield sse_event("done", done)
+
+    async def events():
+        stream = None
+        parts: List[str] = []
+        try:
+            async with metrics.track_llm("groq", params["model"]) as call:
+                stream = await client.chat.completions.create(**params, stream=True)
+                async for chunk in stream:
+                    if await request.is_disconnected():
+                        break
+                    call.stream_chunk(chunk)
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield sse_event("token", {"text": delta})
+                else:
+                    # only complete generations go into the cache
+                    GENERATION_CACHE.put(key, "".join(parts).strip(), params["temperature"])
+                    yield sse_event("done", done)
+        except asyncio.CancelledError:
+            # client disconnected: fall through to close the upstream call
+            raise
+        except Exception as e:
+            yield sse_event("error", {"detail": f"Generation failed: {e}"})
+        finally:
+            if stream is not None:
+                await stream.close()
+
+    return sse_response(replay() if cached is not None else events())
+
+def _encode_cursor(created_at: datetime, item_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), item_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(item_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+# Must match the expressions of items_search_trgm_idx / items_title_trgm_idx
+# to use the indexes
+_SEARCH_DOC = "(coalesce(i.title, '') || ' ' || i.content)"
+_SEARCH_TITLE = "coalesce(i.title, '')"
+_SEARCH_QUERY = "websearch_to_tsquery('english', :q)"
+# Content HTML-escaped before ts_headline, so the only markup in a snippet
+# is its own <mark>; the parser keeps &lt; etc. whole as entity tokens
+_SNIPPET_DOC = "replace(replace(replace(i.content, '&', '&amp;'), '<', '&lt;'), '>', '&gt;')"
+
+def _item_filters(user_id: str, q: Optional[str], platform: Optional[str], tone: Optional[str]):
+    """WHERE clauses + params shared by the Library listing and bulk/export paths."""
     where, params = ["i.user_id = :user_id"], {"user_id": user_id}
-    
     if q:
-        where.append("(i.title ILIKE :q OR i.content ILIKE :q)")
-        params["q"] = f"%{q}%"
+        # word match OR substring match anywhere OR fuzzy (typo-tolerant) match
+        # on the title; every branch is served by a GIN index (tsvector,
+        # title + content trigrams, title trigrams)
+        where.append(
+            f"(i.search_tsv @@ {_SEARCH_QUERY}"
+            f" OR {_SEARCH_DOC} ILIKE :q_like"
+            f" OR :q <% {_SEARCH_TITLE})"
+        )
+        params["q"] = q
+        params["q_like"] = "%" + q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
     if platform and platform != "all":
         where.append("i.platform = :platform")
         params["platform"] = platform
     if tone and tone != "all":
         where.append("i.tone = :tone")
         params["tone"] = tone
-    
-    sql = """
-      SELECT 
-        i.id::text AS id, 
-        i.title, 
-        i.content, 
-        i.platform, 
-        i.tone, 
-        i.mode, 
-        i.words, 
-        i.model, 
-        i.tags, 
-        i.pinned, 
-        i.user_id, 
+    return where, params
+
+# One row per item: images are aggregated per item in a LATERAL subquery,
+# so LIMIT counts items (not item x image rows) and the page size is exact.
+_ITEM_SELECT = """
+      SELECT
+        i.id::text AS id,
+        i.title,
+        i.content,
+        i.platform,
+        i.tone,
+        i.mode,
+        i.words,
+        i.model,
+        i.tags,
+        i.pinned,
+        i.user_id,
         i.created_at,
-        img.caption AS image_caption,
-        img.tags AS image_tags,
-        img.url AS image_url,
-        img.created_at AS image_created_at  -- ← Add this line
+        COALESCE(img.images, '[]'::json) AS images
+        {search_cols}
       FROM items i
-      LEFT JOIN images img ON i.id = img.item_id
+      LEFT JOIN LATERAL (
+        SELECT json_agg(json_build_object(
+                 'id', m.id::text,
+                 'url', m.url,
+                 'caption', m.caption,
+                 'tags', m.tags,
+                 'model', m.model,
+                 'created_at', m.created_at
+               ) ORDER BY m.created_at) AS images
+        FROM images m
+        WHERE m.item_id = i.id
+      ) img ON TRUE
     """
-    if where:
+
+@app.get("/api/items")
+def list_items(q: Optional[str] = None,
+               platform: Optional[str] = None,
+               tone: Optional[str] = None,
+               page: int = 1,
+               pageSize: int = 20,
+               cursor: Optional[str] = None,
+               sort: Literal["recent", "relevance"] = "recent",
+               user: dict = Depends(get_current_user)):
+    """
+    Library listing, newest first. Pass the returned `next_cursor` as
+    `cursor` for the next page (keyset pagination, flat cost at any depth);
+    `page` still works but gets slower the deeper it goes.
+
+    With `q`, items also get a highlighted `snippet` (HTML-escaped text
+    with <mark> around matches); `sort=relevance`
+    orders by search rank and pages with `page` only (no cursor).
+    """
+    user_id = user["user_id"]
+    by_relevance = sort == "relevance" and bool(q)
+    if by_relevance and cursor:
+        raise HTTPException(status_code=400, detail="cursor is not supported with sort=relevance; use page")
+    off = 0 if cursor else (page - 1) * pageSize
+    where, params = _item_filters(user_id, q, platform, tone)
+    if cursor:
+        c_ts, c_id = _decode_cursor(cursor)
+        where.append("(i.created_at, i.id) < (:c_ts, CAST(:c_id AS UUID))")
+        params.update({"c_ts": c_ts, "c_id": c_id})
+
+    # fetch one extra row to know whether there is a next page
+    if q:
+        # Matching ids come from the GIN indexes alone (materialized, so the
+        # planner can't walk items_user_created_idx testing every row instead);
+        # only the page is sorted out of them and joined back for full rows.
+        rank = (
+            f"ts_rank_cd(i.search_tsv, {_SEARCH_QUERY}, 32) + word_similarity(:q, {_SEARCH_TITLE})"
+            if by_relevance else "0"
+        )
+        sql = f"""
+          WITH matches AS MATERIALIZED (
+            SELECT i.id, i.created_at, {rank} AS rank
+            FROM items i
+            WHERE {" AND ".join(where)}
+          ), page AS (
+            SELECT id, created_at, rank FROM matches
+            ORDER BY rank DESC, created_at DESC, id DESC LIMIT :lim OFFSET :off
+          )
+        """ + _ITEM_SELECT.format(search_cols=f""",
+        ts_headline('english', {_SNIPPET_DOC}, {_SEARCH_QUERY},
+                    'StartSel=<mark>, StopSel=</mark>, MaxFragments=2, MaxWords=20, MinWords=8') AS snippet""")
+        sql += " JOIN page p ON p.id = i.id ORDER BY p.rank DESC, p.created_at DESC, p.id DESC"
+    else:
+        sql = _ITEM_SELECT.format(search_cols="")
         sql += " WHERE " + " AND ".join(where)
-    sql += " ORDER BY i.created_at DESC LIMIT :lim OFFSET :off"
-    
+        sql += " ORDER BY i.created_at DESC, i.id DESC LIMIT :lim OFFSET :off"
+
     try:
         with ENGINE.begin() as c:
-            rows = c.execute(text(sql), {**params, "lim": pageSize, "off": off}).mappings().all()
-        
-        # Group images by item_id to handle multiple images per item
-        items_dict = {}
+            rows = c.execute(text(sql), {**params, "lim": pageSize + 1, "off": off}).mappings().all()
+
+        has_more = len(rows) > pageSize
+        rows = rows[:pageSize]
+        items = []
         for row in rows:
-            item_id = row['id']
-            if item_id not in items_dict:
-                # Convert row to dict and handle arrays
-                item_data = dict(row)
-                # Clean up None values for image fields
-                if item_data.get('image_tags') is None:
-                    item_data['image_tags'] = []
-                # Convert created_at to string
-                item_data['created_at'] = item_data['created_at'].isoformat() if item_data['created_at'] else ""
-                if item_data.get('image_created_at'):
-                    item_data['image_created_at'] = item_data['image_created_at'].isoformat()
-                items_dict[item_id] = item_data
-            else:
-                # If this is another image for the same item, you could handle multiple images here
-                # For now, we'll just keep the first image data
-                existing = items_dict[item_id]
-                if existing.get('image_caption') is None and row.get('image_caption'):
-                    existing['image_caption'] = row['image_caption']
-                    existing['image_tags'] = row.get('image_tags') or []
-                    existing['image_url'] = row.get('image_url')
-                    existing['image_created_at'] = row.get('image_created_at').isoformat() if row.get('image_created_at') else ""
-        
-        return {"items": list(items_dict.values())}
-    
+            item_data = dict(row)
+            item_data['created_at'] = item_data['created_at'].isoformat() if item_data['created_at'] else ""
+            # Flat fields for the first image, kept for older clients
+            first = item_data['images'][0] if item_data['images'] else {}
+            item_data['image_caption'] = first.get('caption')
+            item_data['image_tags'] = first.get('tags') or []
+            item_data['image_url'] = first.get('url')
+            item_data['image_created_at'] = first.get('created_at')
+            items.append(item_data)
+
+        next_cursor = None
+        if has_more and not by_relevance:
+            last = rows[-1]
+            next_cursor = _encode_cursor(last["created_at"], last["id"])
+        return {"items": items, "next_cursor": next_cursor}
+
     except Exception as e:
         print(f"Error in list_items: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to load items")
 
+_EXPORT_COLUMNS = ["id", "title", "content", "platform", "tone", "mode", "words", "model",
+                   "tags", "pinned", "created_at", "images", "cursor"]
+
+@app.get("/api/items/export")
+def export_items(format: Literal["ndjson", "csv"] = "ndjson",
+                 q: Optional[str] = None,
+                 platform: Optional[str] = None,
+                 tone: Optional[str] = None,
+                 cursor: Optional[str] = None,
+                 user: dict = Depends(get_current_user)):
+    """
+    Stream the whole Library (same filters as /api/items, newest first,
+    images included) as NDJSON or CSV. Rows come from a server-side
+    cursor EXPORT_BATCH_SIZE at a time, so memory stays flat whatever the
+    library size. Every row carries a `cursor`; to resume an interrupted
+    export, pass the last one received as `cursor`.
+    """
+    where, params = _item_filters(user["user_id"], q, platform, tone)
+    if cursor:
+        c_ts, c_id = _decode_cursor(cursor)
+        where.append("(i.created_at, i.id) < (:c_ts, CAST(:c_id AS UUID))")
+        params.update({"c_ts": c_ts, "c_id": c_id})
+    sql = (
+        _ITEM_SELECT.format(search_cols="")
+        + " WHERE " + " AND ".join(where)
+        + " ORDER BY i.created_at DESC, i.id DESC"
+    )
+
+    def records():
+        with ENGINE.connect() as c:
+            result = c.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE).execute(text(sql), params)
+            for row in result.mappings():
+                item = dict(row)
+                item["user_id"] = str(item["user_id"])
+                item["cursor"] = _encode_cursor(item["created_at"], item["id"])
+                item["created_at"] = item["created_at"].isoformat()
+                yield item
+
+    def ndjson():
+        buf = []
+        for item in records():
+            buf.append(json.dumps(item, ensure_ascii=False, default=str))
+            if len(buf) >= EXPORT_BATCH_SIZE:
+                yield "\n".join(buf) + "\n"
+                buf = []
+        if buf:
+            yield "\n".join(buf) + "\n"
+
+    def csv_rows():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        writer.writerow(_EXPORT_COLUMNS)
+        for n, item in enumerate(records(), 1):
+            item["tags"] = json.dumps(item["tags"] or [], ensure_ascii=False)
+            item["images"] = json.dumps(item["images"], ensure_ascii=False, default=str)
+            writer.writerow([item[col] for col in _EXPORT_COLUMNS])
+            if n % EXPORT_BATCH_SIZE == 0:
+                yield out.getvalue()
+                out.seek(0)
+                out.truncate()
+        yield out.getvalue()
+
+    media_type = "application/x-ndjson" if format == "ndjson" else "text/csv"
+    return StreamingResponse(
+        ndjson() if format == "ndjson" else csv_rows(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="library.{format}"'},
+    )
+
+@app.post("/api/items/import")
+def import_items(file: UploadFile = File(...),
+                 format: Optional[Literal["ndjson", "csv"]] = None,
+                 idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+                 user: dict = Depends(get_current_user)):
+    """
+    Bulk-load items from an NDJSON or CSV upload (same fields as POST
+    /api/items; CSV tags may be JSON or a single tag) via COPY, in one
+    transaction. Invalid rows are skipped and reported by row number.
+    Send an Idempotency-Key header to make retries safe. See importer.py.
+    """
+    fmt = format or ("csv" if (file.filename or "").lower().endswith(".csv") else "ndjson")
+    if file.size is not None:
+        metrics.UPLOAD_BYTES.labels("import").observe(file.size)
+    return importer.import_items(file.file, fmt, user["user_id"], idempotency_key)
+
 
 @app.get("/api/agent/debug")
 def agent_debug():
@@ -306,27 +674,37 @@ def agent_debug():
 
 @app.post("/api/items", response_model=Item)
 @app.post("/api/items/", response_model=Item)
-def create_item(body: ItemIn, user: dict = Depends(get_current_user)):
+def create_item(
+    body: ItemIn,
+    response: Response,
+    dedupe: bool = False,
+    user: dict = Depends(get_current_user),
+):
+    """
+    Save an item. With ?dedupe=true a near-copy of an existing item (see
+    fingerprint.py) is not inserted; the existing item is returned instead
+    and its id is sent in the X-Duplicate-Of header.
+    """
     if hasattr(body, "model_dump"):
         payload = body.model_dump()
     else:
         payload = body.dict()
-    tags_val = payload.get("tags") or []
-    if isinstance(tags_val, str):
-        try:
-            tags_val = json.loads(tags_val)
-        except Exception:
-            tags_val = [tags_val]
-    if not isinstance(tags_val, (list, tuple)):
-        tags_val = [str(tags_val)]
-    payload["tags"] = tags_val  # Pass as a Python list, NOT a string!
+    payload["tags"] = normalize_tags(payload.get("tags"))  # Pass as a Python list, NOT a string!
     payload["user_id"] = user["user_id"]
+    fp = fingerprint.fingerprint(payload.get("title"), payload["content"])
     with ENGINE.begin() as c:
-        row = c.execute(text("""
-          INSERT INTO items (title, content, platform, tone, mode, words, model, tags, pinned, user_id)
-          VALUES (:title, :content, :platform, :tone, :mode, :words, :model, :tags, :pinned, :user_id)
-          RETURNING id::text AS id, title, content, platform, tone, mode, words, model, tags, pinned, user_id, created_at
-        """), payload).mappings().first()
+        similar = fingerprint.find_similar(c, user["user_id"], fp, limit=1) if dedupe else []
+        if similar:
+            row = similar[0]
+            response.headers["X-Duplicate-Of"] = row["id"]
+        else:
+            row = c.execute(text("""
+              INSERT INTO items (title, content, platform, tone, mode, words, model, tags, pinned, user_id,
+                                 simhash, simhash_bands)
+              VALUES (:title, :content, :platform, :tone, :mode, :words, :model, :tags, :pinned, :user_id,
+                      :simhash, :simhash_bands)
+              RETURNING id::text AS id, title, content, platform, tone, mode, words, model, tags, pinned, user_id, created_at
+            """), {**payload, **fp}).mappings().first()
     if row:
         rt = row.get("tags")
         if isinstance(rt, str):
@@ -337,6 +715,8 @@ def create_item(body: ItemIn, user: dict = Depends(get_current_user)):
         user_id_val = row.get("user_id")
         # Ensure tags is always a list and user_id is always a string for the response schema
         row = {**row, "tags": rt or [], "user_id": str(user_id_val) if user_id_val is not None else None}
+        if not similar:
+            retrieval.on_item_saved(row)
     return row
 
 @app.patch("/api/items/{id}", response_model=Item)
@@ -351,31 +731,167 @@ def update_item(id: str, body: Dict[str, Any]):
           WHERE id = :id
           RETURNING id::text AS id, title, content, platform, tone, mode, words, model, tags, pinned, user_id, created_at
         """), {**allowed, "id": id}).mappings().first()
+        if row and ("title" in allowed or "content" in allowed):
+            c.execute(
+                text("UPDATE items SET simhash = :simhash, simhash_bands = :simhash_bands WHERE id = :id"),
+                {"id": id, **fingerprint.fingerprint(row["title"], row["content"])},
+            )
     if not row:
         raise HTTPException(404, "Not found")
+    retrieval.on_item_saved(dict(row))
     return row
 
 @app.delete("/api/items/{id}")
 def delete_item(id: str):
     with ENGINE.begin() as c:
-        res = c.execute(text("DELETE FROM items WHERE id = :id"), {"id": id})
-    if res.rowcount == 0:
+        row = c.execute(text("DELETE FROM items WHERE id = :id RETURNING user_id::text AS user_id"), {"id": id}).first()
+    if not row:
         raise HTTPException(404, "Not found")
+    retrieval.on_item_deleted(row.user_id, id)
     return {"ok": True}
 
 @app.post("/api/items/{id}/duplicate", response_model=Item)
 def duplicate_item(id: str):
     with ENGINE.begin() as c:
         row = c.execute(text("""
-          INSERT INTO items (title, content, platform, tone, mode, words, model, tags, pinned, user_id)
-          SELECT title, content, platform, tone, mode, words, model, tags, FALSE, user_id
+          INSERT INTO items (title, content, platform, tone, mode, words, model, tags, pinned, user_id,
+                             simhash, simhash_bands)
+          SELECT title, content, platform, tone, mode, words, model, tags, FALSE, user_id,
+                 simhash, simhash_bands
           FROM items WHERE id = :id
           RETURNING id::text AS id, title, content, platform, tone, mode, words, model, tags, pinned, user_id, created_at
         """), {"id": id}).mappings().first()
     if not row:
         raise HTTPException(404, "Not found")
+    retrieval.on_item_saved(dict(row))
     return row
 
+@app.get("/api/items/{id}/similar")
+def similar_items(id: str, limit: int = 10, user: dict = Depends(get_current_user)):
+    """The user's near-duplicates of an item, closest first, with their bit distance."""
+    with ENGINE.begin() as c:
+        row = c.execute(text("""
+          SELECT title, content, simhash, simhash_bands FROM items
+          WHERE id = CAST(:id AS UUID) AND user_id = CAST(:uid AS UUID)
+        """), {"id": id, "uid": user["user_id"]}).mappings().first()
+        if not row:
+            raise HTTPException(404, "Not found")
+        fp = (
+            {"simhash": row["simhash"], "simhash_bands": row["simhash_bands"]}
+            if row["simhash"] is not None
+            else fingerprint.fingerprint(row["title"], row["content"])  # not backfilled yet
+        )
+        items = fingerprint.find_similar(c, user["user_id"], fp, exclude_id=id, limit=max(1, min(limit, 50)))
+    return {"items": items}
+
+# One set-based statement per bulk action; each takes :ids (UUID[]) and :uid
+# and returns the ids it touched (duplicate: source_id -> new id).
+_BULK_SQL = {
+    "delete": """
+        DELETE FROM items WHERE id = ANY(CAST(:ids AS UUID[])) AND user_id = CAST(:uid AS UUID)
+        RETURNING id::text AS id
+    """,
+    "pin": """
+        UPDATE items SET pinned = TRUE WHERE id = ANY(CAST(:ids AS UUID[])) AND user_id = CAST(:uid AS UUID)
+        RETURNING id::text AS id
+    """,
+    "unpin": """
+        UPDATE items SET pinned = FALSE WHERE id = ANY(CAST(:ids AS UUID[])) AND user_id = CAST(:uid AS UUID)
+        RETURNING id::text AS id
+    """,
+    # append tags not already present, keeping the existing order
+    "tag": """
+        UPDATE items SET tags = ARRAY(
+            SELECT t FROM unnest(tags || CAST(:tags AS TEXT[])) WITH ORDINALITY AS u(t, n)
+            GROUP BY t ORDER BY min(n)
+        )
+        WHERE id = ANY(CAST(:ids AS UUID[])) AND user_id = CAST(:uid AS UUID)
+        RETURNING id::text AS id
+    """,
+    "untag": """
+        UPDATE items SET tags = ARRAY(SELECT t FROM unnest(tags) AS t WHERE t <> ALL(CAST(:tags AS TEXT[])))
+        WHERE id = ANY(CAST(:ids AS UUID[])) AND user_id = CAST(:uid AS UUID)
+        RETURNING id::text AS id
+    """,
+    # new ids are drawn up front so each copy can be reported against its source
+    "duplicate": """
+        WITH src AS (
+            SELECT gen_random_uuid() AS new_id, i.* FROM items i
+            WHERE i.id = ANY(CAST(:ids AS UUID[])) AND i.user_id = CAST(:uid AS UUID)
+        ), ins AS (
+            INSERT INTO items (id, title, content, platform, tone, mode, words, model, tags, pinned, user_id,
+                               simhash, simhash_bands)
+            SELECT new_id, title, content, platform, tone, mode, words, model, tags, FALSE, user_id,
+                   simhash, simhash_bands
+            FROM src
+        )
+        SELECT id::text AS id, new_id::text AS new_id FROM src
+    """,
+}
+
+def _canonical_uuid(value: str) -> Optional[str]:
+    """The lowercase hyphenated form Postgres returns, or None if not a plain UUID."""
+    try:
+        if value.lower().startswith("urn:"):
+            return None  # Python accepts urn:uuid:..., Postgres does not
+        return str(uuid.UUID(value))
+    except (ValueError, AttributeError, TypeError):
+        return None
+
+@app.post("/api/items/bulk")
+def bulk_items(body: BulkItemsIn, user: dict = Depends(get_current_user)):
+    """
+    Apply one action to many items in a single transaction and round-trip.
+    Targets are `ids`, or every item matching `filter`; only the caller's
+    items are touched. Results come back per id, in request order:
+    {"id", "ok", "error"?, "new_id"? (duplicate)}.
+    """
+    if (body.ids is None) == (body.filter is None):
+        raise HTTPException(400, "Pass either ids or filter")
+    tags = normalize_tags(body.tags)
+    if body.action in ("tag", "untag") and not tags:
+        raise HTTPException(400, "tags is required for tag/untag")
+    user_id = user["user_id"]
+
+    with ENGINE.begin() as c:
+        if body.filter is not None:
+            where, params = _item_filters(user_id, body.filter.q, body.filter.platform, body.filter.tone)
+            targets = c.execute(text(f"""
+                SELECT i.id::text AS id FROM items i
+                WHERE {' AND '.join(where)}
+                ORDER BY i.created_at DESC, i.id DESC
+                LIMIT :bulk_limit
+            """), {**params, "bulk_limit": BULK_MAX_ITEMS + 1}).scalars().all()
+        else:
+            targets = list(dict.fromkeys(body.ids))  # drop repeats, keep order
+        if len(targets) > BULK_MAX_ITEMS:
+            raise HTTPException(400, f"At most {BULK_MAX_ITEMS} items per bulk request")
+
+        # results are reported under the id as sent, matched on the canonical form
+        canonical = {i: _canonical_uuid(i) for i in targets}
+        valid = list(dict.fromkeys(c for c in canonical.values() if c))
+        done: Dict[str, Dict[str, Any]] = {}
+        if valid:
+            rows = c.execute(
+                text(_BULK_SQL[body.action]),
+                {"ids": valid, "uid": user_id, "tags": tags},
+            ).mappings().all()
+            done = {r["id"]: dict(r) for r in rows}
+
+    if done:
+        # many items changed at once; rebuild the user's index on next use
+        retrieval.invalidate(user_id)
+
+    results = []
+    for item_id in targets:
+        key = canonical[item_id]
+        if key in done:
+            results.append({**done[key], "id": item_id, "ok": True})
+        else:
+            results.append({"id": item_id, "ok": False,
+                            "error": "Not found" if key else "Invalid id"})
+    return {"action": body.action, "affected": len(done), "results": results}
+
 @app.post("/api/auth/google")
 def google_login(id_token: str = Body(..., embed=True), db: Session = Depends(get_db)):
     # 1. Verify Google ID token
@@ -0,0 +1,190 @@
+# backend/app/metrics.py
+"""
+Prometheus metrics, served at GET /metrics.
+
+- HTTP: latency histogram and request counter per method, route template
+  (e.g. /api/items/{id}) and status. Recorded by MetricsMiddleware, a
+  plain ASGI middleware, so streamed responses are timed to their last byte.
+- LLM: per provider/model latency, time to first token (streams), prompt
+  and completion tokens from the `usage` fields, errors and timeouts.
+  Call sites wrap each call in `async with track_llm(provider, model) as call`.
+- DB: ENGINE pool size / checked out / overflow gauges, read at scrape
+  time, plus how long checkouts wait for a connection (see db.TimedQueuePool).
+- Uploads: size histogram per kind.
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Optional
+
+import httpx
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Match
+
+from . import profiling
+
+HTTP_LATENCY = Histogram(
+    "inspireai_http_request_duration_seconds", "HTTP request latency",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+HTTP_REQUESTS = Counter(
+    "inspireai_http_requests_total", "HTTP requests", ["method", "route", "status"],
+)
+
+LLM_LATENCY = Histogram(
+    "inspireai_llm_request_duration_seconds", "LLM call latency (whole response)",
+    ["provider", "model"],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 4, 8, 15, 30, 60),
+)
+LLM_TTFT = Histogram(
+    "inspireai_llm_time_to_first_token_seconds", "Time to the first streamed token",
+    ["provider", "model"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 4, 8),
+)
+LLM_TOKENS = Counter(
+    "inspireai_llm_tokens_total", "Tokens reported by the provider's usage field",
+    ["provider", "model", "kind"],
+)
+LLM_ERRORS = Counter(
+    "inspireai_llm_errors_total", "Failed LLM calls", ["provider", "model", "kind"],
+)
+
+DB_POOL_WAIT = Histogram(
+    "inspireai_db_pool_wait_seconds", "Time spent waiting for a pooled DB connection",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30),
+)
+
+UPLOAD_BYTES = Histogram(
+    "inspireai_upload_size_bytes", "Uploaded file sizes", ["kind"],
+    buckets=(16e3, 64e3, 256e3, 1e6, 2e6, 4e6, 8e6, 12e6, 50e6),
+)
+
+
+class _PoolCollector:
+    """Reads the pool counters at scrape time instead of tracking them."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    def collect(self):
+        pool = self.engine.pool
+        for name, doc, fn in (
+            ("size", "Configured pool size", "size"),
+            ("checked_out", "Connections currently checked out", "checkedout"),
+            ("checked_in", "Idle connections in the pool", "checkedin"),
+            ("overflow", "Connections open beyond the pool size", "overflow"),
+        ):
+            if hasattr(pool, fn):
+                g = GaugeMetricFamily(f"inspireai_db_pool_{name}", doc)
+                g.add_metric([], getattr(pool, fn)())
+                yield g
+
+
+def register_pool(engine) -> None:
+    REGISTRY.register(_PoolCollector(engine))
+
+
+# ---------- LLM calls ----------
+
+class LLMCall:
+    def __init__(self, provider: str, model: str):
+        self.provider = provider
+        self.model = model
+        self.start = time.perf_counter()
+        self._first = False
+
+    def first_token(self) -> None:
+        """Call on each streamed chunk; only the first one is recorded."""
+        if not self._first:
+            self._first = True
+            LLM_TTFT.labels(self.provider, self.model).observe(time.perf_counter() - self.start)
+
+    def usage(self, usage: Any) -> None:
+        """Record tokens from a usage object (Groq SDK) or dict (OpenRouter JSON)."""
+        if usage is None:
+            return
+        get = usage.get if isinstance(usage, dict) else (lambda k: getattr(usage, k, None))
+        for kind in ("prompt", "completion"):
+            n = get(f"{kind}_tokens")
+            if n:
+                LLM_TOKENS.labels(self.provider, self.model, kind).inc(n)
+
+    def stream_chunk(self, chunk: Any) -> None:
+        """Per streamed Groq chunk: TTFT on the first content, usage from the final chunk."""
+        if chunk.choices and chunk.choices[0].delta.content:
+            self.first_token()
+        x_groq = getattr(chunk, "x_groq", None)
+        self.usage(getattr(chunk, "usage", None) or getattr(x_groq, "usage", None))
+
+    def error(self, kind: str = "error") -> None:
+        """For failures that do not raise (e.g. a non-200 response)."""
+        LLM_ERRORS.labels(self.provider, self.model, kind).inc()
+
+
+def _is_timeout(exc: BaseException) -> bool:
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TimeoutException)):
+        return True
+    # groq.APITimeoutError, without importing the SDK here
+    return type(exc).__name__ == "APITimeoutError"
+
+
+@asynccontextmanager
+async def track_llm(provider: str, model: Optional[str]):
+    call = LLMCall(provider, model or "unknown")
+    try:
+        with profiling.span("llm"):
+            yield call
+    except asyncio.CancelledError:
+        # the client went away; not an upstream failure
+        raise
+    except Exception as e:
+        call.error("timeout" if _is_timeout(e) else "error")
+        raise
+    finally:
+        LLM_LATENCY.labels(call.provider, call.model).observe(time.perf_counter() - call.start)
+
+
+# ---------- HTTP ----------
+
+def _route_template(app, scope) -> str:
+    route = scope.get("route")
+    if route is not None and hasattr(route, "path"):
+        return route.path
+    # raw paths would blow up label cardinality; unmatched ones share a label
+    for r in app.router.routes:
+        match, _ = r.matches(scope)
+        if match == Match.FULL:
+            return getattr(r, "path", "<unmatched>")
+    return "<unmatched>"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            labels = (scope["method"], _route_template(scope["app"], scope), str(status["code"]))
+            HTTP_LATENCY.labels(*labels).observe(time.perf_counter() - start)
+            HTTP_REQUESTS.labels(*labels).inc()
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
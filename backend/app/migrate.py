@@ -0,0 +1,123 @@
+# backend/app/migrate.py
+"""
+Versioned schema migrations.
+
+Migrations are the ordered SQL files in app/migrations/ named
+NNNN_description.sql. Applied versions are recorded in schema_version.
+A PostgreSQL advisory lock makes sure only one process migrates at a
+time; the others wait and then find nothing left to do.
+
+Run out of band (from the repo root):
+    python -m backend.app.migrate            # apply pending migrations
+    python -m backend.app.migrate status     # show current / latest version
+
+At startup the API only checks the version (one query), unless
+DB_AUTO_MIGRATE=1 is set, in which case it applies pending migrations.
+"""
+
+import argparse
+import os
+import re
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+# arbitrary app-wide key for pg_advisory_lock
+ADVISORY_LOCK_KEY = 7_421_900_013
+
+_FILE_RE = re.compile(r"^(\d{4})_([\w-]+)\.sql$")
+
+
+def discover() -> List[Tuple[int, str, str]]:
+    """(version, name, path) for every migration file, in order."""
+    found = []
+    for fname in os.listdir(MIGRATIONS_DIR):
+        m = _FILE_RE.match(fname)
+        if m:
+            found.append((int(m.group(1)), m.group(2), os.path.join(MIGRATIONS_DIR, fname)))
+    found.sort()
+    versions = [v for v, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Duplicate migration versions in {MIGRATIONS_DIR}")
+    return found
+
+
+def latest_version() -> int:
+    found = discover()
+    return found[-1][0] if found else 0
+
+
+def current_version(engine: Engine) -> int:
+    """Highest applied version, 0 for a database that was never migrated."""
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT to_regclass('schema_version')")).scalar() is None:
+            return 0
+        return conn.execute(text("SELECT COALESCE(MAX(version), 0) FROM schema_version")).scalar()
+
+
+def migrate(engine: Engine) -> List[int]:
+    """Apply pending migrations, each in its own transaction. Returns applied versions."""
+    applied_now = []
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:k)"), {"k": ADVISORY_LOCK_KEY})
+        conn.commit()
+        try:
+            with conn.begin():
+                conn.execute(text("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INT PRIMARY KEY,
+                        name TEXT NOT NULL,
+                        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+                    )
+                """))
+            done = set(conn.execute(text("SELECT version FROM schema_version")).scalars())
+            conn.commit()
+            for version, name, path in discover():
+                if version in done:
+                    continue
+                with open(path, encoding="utf-8") as f:
+                    sql = f.read()
+                with conn.begin():
+                    # no_parameters: the file is sent as-is (no % escaping by the driver)
+                    conn.execution_options(no_parameters=True).exec_driver_sql(sql)
+                    conn.execute(
+                        text("INSERT INTO schema_version (version, name) VALUES (:v, :n)"),
+                        {"v": version, "n": name},
+                    )
+                applied_now.append(version)
+                print(f"applied migration {version:04d}_{name}")
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:k)"), {"k": ADVISORY_LOCK_KEY})
+            conn.commit()
+    return applied_now
+
+
+def check(engine: Engine) -> None:
+    """Fast startup check: fail if the database is behind the code."""
+    current, latest = current_version(engine), latest_version()
+    if current < latest:
+        raise RuntimeError(
+            f"Database schema is at version {current}, code expects {latest}. "
+            "Run `python -m backend.app.migrate` (or set DB_AUTO_MIGRATE=1)."
+        )
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="InspireAI schema migrations")
+    ap.add_argument("command", nargs="?", default="up", choices=["up", "status"])
+    args = ap.parse_args()
+
+    from .db import ENGINE
+
+    if args.command == "status":
+        print(f"current: {current_version(ENGINE)}  latest: {latest_version()}")
+        return
+    applied = migrate(ENGINE)
+    if not applied:
+        print(f"schema up to date (version {current_version(ENGINE)})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+-- Base schema: users, Library items, image analyses attached to items
+
+-- PostgreSQL UUID support
+CREATE EXTENSION IF NOT EXISTS pgcrypto;
+
+-- Users table for JWT auth
+CREATE TABLE IF NOT EXISTS users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    username TEXT UNIQUE NOT NULL,
+    hashed_password TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Items table for Library page
+CREATE TABLE IF NOT EXISTS items (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    title TEXT,
+    content TEXT NOT NULL,
+    platform TEXT NOT NULL,
+    tone TEXT NOT NULL,
+    mode TEXT NOT NULL,
+    words INT NOT NULL,
+    model TEXT,
+    tags TEXT[] NOT NULL DEFAULT '{}',
+    pinned BOOLEAN NOT NULL DEFAULT FALSE,
+    user_id UUID NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+-- Images table for vision analysis attached to posts
+CREATE TABLE IF NOT EXISTS images (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    item_id UUID NOT NULL,
+    url TEXT,
+    caption TEXT NOT NULL,
+    tags TEXT[] NOT NULL DEFAULT '{}',
+    model TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    FOREIGN KEY (item_id) REFERENCES items(id) ON DELETE CASCADE
+);
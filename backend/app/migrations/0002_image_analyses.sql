@@ -0,0 +1,10 @@
+-- Vision results keyed by image content hash, so re-uploads skip OpenRouter
+CREATE TABLE IF NOT EXISTS image_analyses (
+    sha256 TEXT NOT NULL,
+    model TEXT NOT NULL,
+    caption TEXT NOT NULL,
+    tags TEXT[] NOT NULL DEFAULT '{}',
+    url TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (sha256, model)
+);
@@ -0,0 +1,5 @@
+-- Library listing: WHERE user_id = ... ORDER BY created_at DESC, id DESC (keyset pagination)
+CREATE INDEX IF NOT EXISTS items_user_created_idx
+    ON items (user_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS images_item_id_idx ON images (item_id);
@@ -0,0 +1,13 @@
+-- Library search: ranked word search (tsvector) + substring/typo matching (pg_trgm)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE items ADD COLUMN IF NOT EXISTS search_tsv tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', content), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS items_search_tsv_idx ON items USING GIN (search_tsv);
+
+CREATE INDEX IF NOT EXISTS items_search_trgm_idx
+    ON items USING GIN ((coalesce(title, '') || ' ' || content) gin_trgm_ops);
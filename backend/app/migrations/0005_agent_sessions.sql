@@ -0,0 +1,25 @@
+-- Server-side agent conversations: turns + running summary of compacted turns
+CREATE TABLE IF NOT EXISTS agent_sessions (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL,
+    summary TEXT NOT NULL DEFAULT '',
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS agent_sessions_user_idx ON agent_sessions (user_id, updated_at DESC);
+
+CREATE TABLE IF NOT EXISTS agent_turns (
+    id BIGSERIAL PRIMARY KEY,
+    session_id UUID NOT NULL,
+    role TEXT NOT NULL,            -- 'user' | 'assistant'
+    content TEXT NOT NULL,
+    tokens INT NOT NULL,
+    compacted BOOLEAN NOT NULL DEFAULT FALSE,  -- folded into agent_sessions.summary
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    FOREIGN KEY (session_id) REFERENCES agent_sessions(id) ON DELETE CASCADE
+);
+
+-- live (not yet compacted) turns of a session, in order
+CREATE INDEX IF NOT EXISTS agent_turns_live_idx ON agent_turns (session_id, id) WHERE NOT compacted;
@@ -0,0 +1,7 @@
+-- Near-duplicate detection: 64-bit SimHash of title + content, and its
+-- eight 8-bit bands (band_no << 16 | band_bits) for LSH lookup.
+-- Existing rows stay NULL until `python -m backend.app.fingerprint backfill`.
+ALTER TABLE items ADD COLUMN IF NOT EXISTS simhash BIGINT;
+ALTER TABLE items ADD COLUMN IF NOT EXISTS simhash_bands INT[];
+
+CREATE INDEX IF NOT EXISTS items_simhash_bands_idx ON items USING GIN (simhash_bands);
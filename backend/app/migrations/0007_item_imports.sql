@@ -0,0 +1,9 @@
+-- Bulk imports, keyed by the client's idempotency key: a retried import
+-- with the same key gets the recorded result instead of inserting again.
+CREATE TABLE IF NOT EXISTS item_imports (
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    idempotency_key TEXT NOT NULL,
+    result JSONB,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, idempotency_key)
+);
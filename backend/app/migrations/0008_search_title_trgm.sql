@@ -0,0 +1,5 @@
+-- Library search matches typos on the title only; substrings still match
+-- title + content through items_search_trgm_idx (0004).
+-- expression must match _SEARCH_TITLE in main.py
+CREATE INDEX IF NOT EXISTS items_title_trgm_idx
+    ON items USING GIN ((coalesce(title, '')) gin_trgm_ops);
@@ -0,0 +1,113 @@
+# backend/app/passwords.py
+"""
+Password hashing off the request threads.
+
+bcrypt is deliberately slow, so it runs in a dedicated, size-limited
+process pool instead of FastAPI's shared threadpool: a burst of logins
+can only saturate these workers, never the threads that serve the rest
+of the API. Work beyond PASSWORD_QUEUE_MAX pending jobs is rejected
+with 503 + Retry-After (backpressure) instead of queueing unboundedly.
+
+Hashes made with an outdated cost are transparently re-hashed on the
+next successful login (verify_password returns the new hash).
+
+Env (optional):
+  BCRYPT_ROUNDS=12
+  PASSWORD_WORKERS=2
+  PASSWORD_QUEUE_MAX=64
+"""
+
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+from passlib.context import CryptContext
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_WORKERS = int(os.getenv("PASSWORD_WORKERS", "2"))
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "64"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+
+# --- run inside the worker processes ---
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def _verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    # new hash is returned when `hashed` uses an outdated scheme/cost
+    return pwd_context.verify_and_update(password, hashed)
+
+
+# --- pool + metrics (event loop side) ---
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+_stats = {"completed": 0, "rejected": 0, "rehashed": 0, "errors": 0}
+_latencies: "deque[float]" = deque(maxlen=1024)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: never fork a process that already runs threads/event loops
+        _pool = ProcessPoolExecutor(max_workers=PASSWORD_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+async def _submit(fn, *args) -> Any:
+    global _pending
+    if _pending >= PASSWORD_QUEUE_MAX:
+        _stats["rejected"] += 1
+        raise HTTPException(status_code=503, detail="Too many login attempts, retry shortly", headers={"Retry-After": "1"})
+    _pending += 1
+    t0 = time.perf_counter()
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(_get_pool(), fn, *args)
+        _stats["completed"] += 1
+        return result
+    except Exception:
+        _stats["errors"] += 1
+        raise
+    finally:
+        _pending -= 1
+        _latencies.append(time.perf_counter() - t0)
+
+
+async def hash_password(password: str) -> str:
+    return await _submit(_hash, password)
+
+
+async def verify_password(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """(ok, new_hash). new_hash is set when the stored hash should be replaced."""
+    ok, new_hash = await _submit(_verify_and_update, password, hashed)
+    if new_hash:
+        _stats["rehashed"] += 1
+    return ok, new_hash
+
+
+def stats() -> Dict[str, Any]:
+    lat = sorted(_latencies)
+
+    def pct(p: float) -> Optional[float]:
+        return round(lat[min(len(lat) - 1, int(p * len(lat)))] * 1000, 2) if lat else None
+
+    return {
+        "workers": PASSWORD_WORKERS,
+        "queue_max": PASSWORD_QUEUE_MAX,
+        "queue_depth": _pending,
+        "bcrypt_rounds": BCRYPT_ROUNDS,
+        **_stats,
+        "latency_ms": {"p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99), "max": pct(1.0)},
+    }
+
+
+def shutdown() -> None:
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
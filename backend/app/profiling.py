@@ -0,0 +1,341 @@
+# backend/app/profiling.py
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries `X-Profile: <ADMIN_TOKEN>`, or at
+random with probability PROFILE_SAMPLE_RATE. A profiled request gets:
+  - a sampling profile: pyinstrument (async-aware) when it is installed,
+    otherwise a built-in sampler that reads sys._current_frames() every
+    PROFILE_INTERVAL seconds for the threads working on the request: the
+    event loop plus any threadpool worker running one of its sync
+    endpoints (see ProfiledRoute) or recording one of its spans. pyinstrument
+    only samples the event-loop thread. The built-in sampler also sees
+    other requests sharing the event loop.
+  - a span breakdown: time and count for db (cursor executes), llm
+    (metrics.track_llm), pil (image work), serialize (JSON rendering) and
+    threadpool_wait (a sync endpoint waiting for a worker).
+The result goes into an in-memory ring of the last PROFILE_MAX_RESULTS,
+kept per worker process. The response carries an X-Profile-Id header.
+
+  GET /api/admin/profiles        summaries, newest first
+  GET /api/admin/profiles/{id}   one profile with its stacks
+Both require `X-Admin-Token: <ADMIN_TOKEN>`.
+
+When a request is not profiled, the cost is one header lookup (plus one
+random() call if sampling is on) and a ContextVar read per span.
+
+Env (optional):
+  ADMIN_TOKEN=            # unset: header trigger and admin endpoints disabled
+  PROFILE_SAMPLE_RATE=0   # e.g. 0.001 to profile 1 request in 1000
+  PROFILE_MAX_RESULTS=50
+  PROFILE_INTERVAL=0.005
+"""
+
+import asyncio
+import functools
+import hmac
+import inspect
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import JSONResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+try:
+    from pyinstrument import Profiler as _Pyinstrument
+except ImportError:
+    _Pyinstrument = None
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_MAX_RESULTS = int(os.getenv("PROFILE_MAX_RESULTS", "50"))
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.005"))
+
+_MAX_STACKS = 200
+
+
+class RequestProfile:
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = datetime.now(timezone.utc)
+        self.start = time.perf_counter()
+        self.status: Optional[int] = None
+        self.duration = 0.0
+        self.spans: Dict[str, Dict[str, float]] = {}
+        self.threads = {threading.get_ident()}
+        self.dispatched = self.start
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, seconds: float) -> None:
+        with self._lock:
+            s = self.spans.setdefault(kind, {"ms": 0.0, "count": 0})
+            s["ms"] += seconds * 1000
+            s["count"] += 1
+            self.threads.add(threading.get_ident())
+
+    def enter_thread(self) -> int:
+        tid = threading.get_ident()
+        with self._lock:
+            self.threads.add(tid)
+        return tid
+
+    def leave_thread(self, tid: int) -> None:
+        with self._lock:
+            self.threads.discard(tid)
+
+
+_current: ContextVar[Optional[RequestProfile]] = ContextVar("request_profile", default=None)
+_results: deque = deque(maxlen=PROFILE_MAX_RESULTS)
+_results_lock = threading.Lock()
+
+
+@contextmanager
+def span(kind: str):
+    """Attribute the enclosed time to `kind` if the current request is profiled."""
+    prof = _current.get()
+    if prof is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        prof.add(kind, time.perf_counter() - start)
+
+
+# ---------- DB spans ----------
+
+def instrument_engine(engine) -> None:
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profile_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        prof = _current.get()
+        starts = conn.info.get("profile_start")
+        if prof is not None and starts:
+            prof.add("db", time.perf_counter() - starts.pop())
+
+
+# ---------- threadpool workers ----------
+
+def _tracked(func):
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # runs on the threadpool worker; the contextvar came along with the call
+        prof = _current.get()
+        if prof is None:
+            return func(*args, **kwargs)
+        prof.add("threadpool_wait", time.perf_counter() - prof.dispatched)
+        tid = prof.enter_thread()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            prof.leave_thread(tid)
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """
+    Route class for the app and its routers. A sync endpoint is wrapped so
+    that, on a profiled request, the worker thread running it registers
+    with the profile as soon as the call starts (the sampler sees it before,
+    or without, its first span), and the time from the route taking the
+    request to the endpoint running on a worker (dependencies included) is
+    recorded as the threadpool_wait span.
+    """
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        self.tracks_thread = inspect.isfunction(endpoint) and not asyncio.iscoroutinefunction(endpoint)
+        if self.tracks_thread:
+            endpoint = _tracked(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        if not self.tracks_thread:
+            return handler
+
+        async def route_handler(request):
+            prof = _current.get()
+            if prof is not None:
+                prof.dispatched = time.perf_counter()
+            return await handler(request)
+        return route_handler
+
+
+# ---------- serialization spans ----------
+
+class ProfiledJSONResponse(JSONResponse):
+    """Default response class; times JSON rendering for profiled requests."""
+
+    def render(self, content: Any) -> bytes:
+        with span("serialize"):
+            return super().render(content)
+
+
+# ---------- samplers ----------
+
+class _StackSampler:
+    """Fallback sampler: folded stacks of the request's threads, no dependencies."""
+
+    def __init__(self, prof: RequestProfile):
+        self.prof = prof
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(PROFILE_INTERVAL):
+            frames = sys._current_frames()
+            with self.prof._lock:
+                tids = list(self.prof.threads)
+            for tid in tids:
+                frame = frames.get(tid)
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> Dict[str, Any]:
+        self._stop.set()
+        self._thread.join()
+        return {
+            "profiler": "sampler",
+            "interval": PROFILE_INTERVAL,
+            "samples": sum(self.stacks.values()),
+            # folded format (flamegraph.pl / speedscope): "a;b;c count"
+            "stacks": [f"{s} {n}" for s, n in self.stacks.most_common(_MAX_STACKS)],
+        }
+
+
+class _PyinstrumentSampler:
+    def __init__(self, prof: RequestProfile):
+        self.profiler = _Pyinstrument(interval=PROFILE_INTERVAL, async_mode="enabled")
+
+    def start(self) -> None:
+        self.profiler.start()
+
+    def stop(self) -> Dict[str, Any]:
+        self.profiler.stop()
+        return {
+            "profiler": "pyinstrument",
+            "interval": PROFILE_INTERVAL,
+            "text": self.profiler.output_text(unicode=True, show_all=False),
+        }
+
+
+# ---------- middleware ----------
+
+def _trigger(scope) -> Optional[str]:
+    if ADMIN_TOKEN:
+        for name, value in scope["headers"]:
+            if name == b"x-profile":
+                if hmac.compare_digest(value, ADMIN_TOKEN.encode()):
+                    return "header"
+                break
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return "sample"
+    return None
+
+
+class ProfilingMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        trigger = _trigger(scope) if scope["type"] == "http" else None
+        if trigger is None:
+            return await self.app(scope, receive, send)
+
+        prof = RequestProfile(scope["method"], scope["path"], trigger)
+        sampler = (_PyinstrumentSampler if _Pyinstrument else _StackSampler)(prof)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                prof.status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", prof.id.encode()),
+                ]
+            await send(message)
+
+        token = _current.set(prof)
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sample = sampler.stop()
+            _current.reset(token)
+            _store(prof, sample)
+
+
+def _summary(prof: RequestProfile) -> Dict[str, Any]:
+    return {
+        "id": prof.id,
+        "method": prof.method,
+        "path": prof.path,
+        "status": prof.status,
+        "trigger": prof.trigger,
+        "started_at": prof.started_at.isoformat(),
+        "duration_ms": round(prof.duration * 1000, 2),
+        "spans": {k: {"ms": round(v["ms"], 2), "count": int(v["count"])} for k, v in prof.spans.items()},
+    }
+
+
+def _store(prof: RequestProfile, sample: Dict[str, Any]) -> None:
+    prof.duration = time.perf_counter() - prof.start
+    with _results_lock:
+        _results.append({**_summary(prof), "profile": sample})
+
+
+# ---------- admin endpoints ----------
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    # bytes, as in _trigger: compare_digest raises TypeError on non-ASCII str
+    if not ADMIN_TOKEN or not x_admin_token or not hmac.compare_digest(
+        x_admin_token.encode(), ADMIN_TOKEN.encode()
+    ):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+router = APIRouter(
+    prefix="/admin/profiles", tags=["admin"], dependencies=[Depends(require_admin)], route_class=ProfiledRoute,
+)
+
+
+@router.get("")
+def list_profiles() -> Dict[str, List[Dict[str, Any]]]:
+    with _results_lock:
+        items = list(_results)
+    return {"profiles": [{k: v for k, v in p.items() if k != "profile"} for p in reversed(items)]}
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str) -> Dict[str, Any]:
+    with _results_lock:
+        for p in _results:
+            if p["id"] == profile_id:
+                return p
+    raise HTTPException(status_code=404, detail="Profile not found")
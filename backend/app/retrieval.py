@@ -0,0 +1,257 @@
+# backend/app/retrieval.py
+"""
+Per-user retrieval index over Library items, used to give the agent
+context that is relevant to the question instead of the 5 latest posts.
+
+Offline and dependency-light: items are turned into hashed TF features
+(signed feature hashing into RETRIEVAL_DIM buckets, sublinear tf) stored
+sparsely per user (see UserIndex), IDF-weighted (per-bucket document
+frequencies at build time) and normalized once, so a query is one pass
+over the stored features and an argpartition for the top-k. The index
+holds ids only; the k hits are read back from the DB.
+
+An index is built from the DB on first use, kept up to date by
+create/update/delete/duplicate hooks in main.py, evicted LRU beyond
+RETRIEVAL_MAX_USERS, and rebuilt after RETRIEVAL_TTL seconds (each worker
+process keeps its own copy, so this bounds staleness across workers).
+
+Env (optional):
+  RETRIEVAL_DIM=1024
+  RETRIEVAL_MAX_USERS=256
+  RETRIEVAL_TTL=600
+"""
+
+import math
+import os
+import re
+import threading
+import time
+import zlib
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import text
+
+from .db import ENGINE
+
+RETRIEVAL_DIM = int(os.getenv("RETRIEVAL_DIM", "1024"))
+RETRIEVAL_MAX_USERS = int(os.getenv("RETRIEVAL_MAX_USERS", "256"))
+RETRIEVAL_TTL = float(os.getenv("RETRIEVAL_TTL", "600"))
+
+_TOKEN_RE = re.compile(r"[a-z0-9]{2,}")
+_STOPWORDS = frozenset("""
+a an and are as at be but by for from has have how i in is it its me my of on or our so that the
+their them they this to was we were what when where which who why will with you your about did do
+does show tell give can could would should any all
+""".split())
+
+
+def _tokens(value: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall(value.lower()) if t not in _STOPWORDS]
+
+
+def vectorize(value: str) -> np.ndarray:
+    """Signed hashed sublinear-TF vector for a piece of text."""
+    vec = np.zeros(RETRIEVAL_DIM, dtype=np.float32)
+    for tok, tf in Counter(_tokens(value)).items():
+        h = zlib.crc32(tok.encode("utf-8"))
+        sign = 1.0 if h & 0x80000000 else -1.0
+        vec[h % RETRIEVAL_DIM] += sign * (1.0 + math.log(tf))
+    return vec
+
+
+def _doc_text(item: Dict[str, Any]) -> str:
+    # title counts twice: it is short and usually the best summary
+    title = item.get("title") or ""
+    return f"{title} {title} {item.get('content') or ''}"
+
+
+def _sparse(vec: np.ndarray):
+    cols = np.flatnonzero(vec)
+    return cols, vec[cols]
+
+
+class UserIndex:
+    """
+    Sparse rows: every nonzero feature of every item is one (row, col, val)
+    entry in flat arrays, so an item costs ~10 bytes per distinct token
+    instead of a dense RETRIEVAL_DIM row. Values are IDF-weighted and each
+    row L2-normalized when stored; a query sums val * query[col] per row
+    (np.bincount) without copying or re-normalizing anything.
+
+    The IDF weights are fixed when the index is built; items saved later are
+    weighted with them until the next rebuild. Removed rows are only marked
+    dead and dropped in a compaction once they make up half the index.
+    Only ids are kept: the top-k items are read back from the DB.
+    """
+
+    def __init__(self, idf: Optional[np.ndarray] = None):
+        self.ids: List[Optional[str]] = []  # row -> id, None once removed
+        self.pos: Dict[str, int] = {}
+        self.alive = np.zeros(16, dtype=bool)
+        self.rows = np.zeros(256, dtype=np.int32)
+        self.cols = np.zeros(256, dtype=np.uint16 if RETRIEVAL_DIM <= 65536 else np.int32)
+        self.vals = np.zeros(256, dtype=np.float32)
+        self.nnz = 0
+        self.idf = np.ones(RETRIEVAL_DIM, dtype=np.float32) if idf is None else idf
+        self.built_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_items(cls, items: Iterable[Dict[str, Any]]) -> "UserIndex":
+        idx = cls()
+        for item in items:
+            idx._append(str(item["id"]), *_sparse(vectorize(_doc_text(item))))
+        n, nnz = len(idx.ids), idx.nnz
+        if n:
+            df = np.bincount(idx.cols[:nnz], minlength=RETRIEVAL_DIM)
+            idx.idf = (np.log((1.0 + n) / (1.0 + df)) + 1.0).astype(np.float32)
+            vals = idx.vals[:nnz]
+            vals *= idx.idf[idx.cols[:nnz]]
+            norms = np.sqrt(np.bincount(idx.rows[:nnz], weights=vals * vals, minlength=n))
+            vals /= np.maximum(norms, 1e-9)[idx.rows[:nnz]].astype(np.float32)
+        return idx
+
+    def _weigh(self, cols: np.ndarray, vals: np.ndarray) -> np.ndarray:
+        vals = vals * self.idf[cols]
+        return vals / max(float(np.linalg.norm(vals)), 1e-9)
+
+    def _append(self, item_id: str, cols: np.ndarray, vals: np.ndarray) -> None:
+        row, end = len(self.ids), self.nnz + len(cols)
+        if row == len(self.alive):
+            self.alive = np.resize(self.alive, 2 * row)
+        if end > len(self.vals):
+            size = max(2 * len(self.vals), end)
+            self.rows, self.cols, self.vals = (np.resize(a, size) for a in (self.rows, self.cols, self.vals))
+        self.rows[self.nnz:end] = row
+        self.cols[self.nnz:end] = cols
+        self.vals[self.nnz:end] = vals
+        self.nnz = end
+        self.alive[row] = True
+        self.ids.append(item_id)
+        self.pos[item_id] = row
+
+    def _remove_locked(self, item_id: str) -> None:
+        row = self.pos.pop(item_id, None)
+        if row is None:
+            return
+        self.alive[row] = False
+        self.ids[row] = None
+        if 2 * len(self.pos) < len(self.ids):
+            self._compact()
+
+    def _compact(self) -> None:
+        n = len(self.ids)
+        keep = self.alive[self.rows[:self.nnz]]
+        renumber = np.cumsum(self.alive[:n], dtype=np.int32) - 1
+        self.rows = renumber[self.rows[:self.nnz][keep]]
+        self.cols = self.cols[:self.nnz][keep]
+        self.vals = self.vals[:self.nnz][keep]
+        self.nnz = len(self.vals)
+        self.ids = [i for i in self.ids if i is not None]
+        self.pos = {item_id: row for row, item_id in enumerate(self.ids)}
+        self.alive = np.ones(max(16, len(self.ids)), dtype=bool)
+        self.alive[len(self.ids):] = False
+
+    def upsert(self, item: Dict[str, Any]) -> None:
+        item_id = str(item["id"])
+        cols, vals = _sparse(vectorize(_doc_text(item)))
+        with self.lock:
+            vals = self._weigh(cols, vals)
+            self._remove_locked(item_id)
+            self._append(item_id, cols, vals)
+
+    def remove(self, item_id: str) -> None:
+        with self.lock:
+            self._remove_locked(str(item_id))
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """Top-k (id, cosine score) pairs, best first."""
+        qv = vectorize(query)
+        if not qv.any():
+            return []
+        with self.lock:
+            n = len(self.ids)
+            if not self.pos:
+                return []
+            q = np.zeros(RETRIEVAL_DIM, dtype=np.float32)
+            cols, vals = _sparse(qv)
+            q[cols] = self._weigh(cols, vals)
+            nnz = self.nnz
+            scores = np.bincount(self.rows[:nnz], weights=self.vals[:nnz] * q[self.cols[:nnz]], minlength=n)
+            scores[~self.alive[:n]] = 0
+            k = min(k, n)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [(self.ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+
+_indexes: "OrderedDict[str, UserIndex]" = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def _build(user_id: str) -> UserIndex:
+    with ENGINE.connect() as c:
+        rows = c.execute(text("""
+            SELECT id::text AS id, title, content
+            FROM items WHERE user_id = CAST(:uid AS UUID)
+        """), {"uid": user_id}).mappings()
+        return UserIndex.from_items(rows)
+
+
+def get_index(user_id: str) -> UserIndex:
+    """Blocking (may hit the DB); call through run_in_threadpool from async code."""
+    with _indexes_lock:
+        idx = _indexes.get(user_id)
+        if idx is not None and time.monotonic() - idx.built_at < RETRIEVAL_TTL:
+            _indexes.move_to_end(user_id)
+            return idx
+    idx = _build(user_id)
+    with _indexes_lock:
+        _indexes[user_id] = idx
+        _indexes.move_to_end(user_id)
+        while len(_indexes) > RETRIEVAL_MAX_USERS:
+            _indexes.popitem(last=False)
+    return idx
+
+
+def search(user_id: str, query: str, k: int = 5) -> List[Dict[str, Any]]:
+    """The k items most similar to query, best first, with their `score`."""
+    hits = get_index(user_id).search(query, k)
+    if not hits:
+        return []
+    with ENGINE.connect() as c:
+        rows = c.execute(text("""
+            SELECT id::text AS id, title, content, created_at, mode
+            FROM items WHERE id = ANY(CAST(:ids AS UUID[])) AND user_id = CAST(:uid AS UUID)
+        """), {"ids": [i for i, _ in hits], "uid": user_id}).mappings()
+        by_id = {r["id"]: dict(r) for r in rows}
+    # an item deleted since it was indexed just drops out
+    return [{**by_id[i], "score": score} for i, score in hits if i in by_id]
+
+
+# --- hooks for write paths (no-ops when the user's index isn't loaded) ---
+
+def _loaded(user_id: Optional[str]) -> Optional[UserIndex]:
+    if not user_id:
+        return None
+    with _indexes_lock:
+        return _indexes.get(str(user_id))
+
+
+def on_item_saved(item: Dict[str, Any]) -> None:
+    idx = _loaded(item.get("user_id"))
+    if idx is not None:
+        idx.upsert(item)
+
+
+def on_item_deleted(user_id: Optional[str], item_id: str) -> None:
+    idx = _loaded(user_id)
+    if idx is not None:
+        idx.remove(item_id)
+
+
+def invalidate(user_id: str) -> None:
+    with _indexes_lock:
+        _indexes.pop(str(user_id), None)
@@ -1,3 +1,7 @@
+import json
+from datetime import datetime
+from typing import Any, List, Literal, Optional
+
 from pydantic import BaseModel
 
 class UserLogin(BaseModel):
@@ -7,3 +11,34 @@ class UserLogin(BaseModel):
 class Token(BaseModel):
     access_token: str
     token_type: str
+
+class ItemIn(BaseModel):
+    title: Optional[str] = None
+    content: str
+    platform: Literal["linkedin", "instagram", "facebook", "blog"]
+    tone: Literal["professional", "friendly", "witty", "persuasive"]
+    mode: Literal["social", "blog"]
+    words: int
+    model: Optional[str] = None
+    tags: List[str] = []
+    pinned: bool = False
+
+class Item(ItemIn):
+    id: str
+    user_id: str
+    created_at: datetime
+
+def normalize_tags(value: Any) -> List[str]:
+    """
+    Tags as a list of trimmed, non-empty, distinct strings (first occurrence
+    wins); accepts a list, a JSON-encoded list or a single tag.
+    """
+    value = value or []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except Exception:
+            value = [value]
+    if not isinstance(value, (list, tuple)):
+        value = [str(value)]
+    return list(dict.fromkeys(t for t in (str(t).strip() for t in value) if t))
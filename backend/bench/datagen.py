@@ -0,0 +1,184 @@
+# backend/bench/datagen.py
+"""
+Seeded data generators for benchmarks: large Libraries and image sets.
+
+The same --seed always gives the same posts and images, so load-test
+numbers from different runs (and machines) are comparable.
+
+Libraries are loaded through the app's own COPY importer (with
+fingerprints), so a 100k-item library takes seconds, not minutes.
+Images are JPEGs with seeded shapes and noise; every image has
+different bytes. The vision analysis cache is global and keyed by the
+image hash, so a run that must not hit it passes a nonce, which goes
+into a JPEG comment: same pixels, new bytes.
+
+Needs DATABASE_URL pointing at a migrated scratch Postgres for `library`.
+
+    python -m backend.bench.datagen library --items 100000 --user bench-lib --seed 1
+    python -m backend.bench.datagen images --n 50 --out /tmp/bench-images --seed 1
+"""
+
+import argparse
+import io
+import json
+import os
+import random
+import tempfile
+import time
+import uuid
+from typing import Iterator, List, Optional, Tuple
+
+from sqlalchemy import text
+
+PLATFORMS = ["linkedin", "instagram", "facebook", "blog"]
+TONES = ["professional", "friendly", "witty", "persuasive"]
+TOPICS = [
+    "remote work", "product launch", "customer success", "brand storytelling", "hiring",
+    "pricing", "growth marketing", "sustainability", "leadership", "onboarding",
+    "community building", "data privacy", "design systems", "fundraising", "retention",
+]
+_WORDS = (
+    "team growth brand story hook audience value insight lesson customer journey launch feature "
+    "strategy content engagement trust results data experiment feedback culture mission impact "
+    "week today tips share learn build scale market message simple clear bold honest results"
+).split()
+# search terms the load test queries for; each appears in a good share of posts
+SEARCH_TERMS = ["launch", "customer", "strategy", "remote", "pricing", "leadership"]
+
+
+def post(rng: random.Random, i: int) -> dict:
+    """One plausible Library item."""
+    platform = rng.choice(PLATFORMS)
+    topic = rng.choice(TOPICS)
+    n_words = rng.randint(300, 900) if platform == "blog" else rng.randint(40, 160)
+    body = " ".join(rng.choice(_WORDS) for _ in range(n_words))
+    return {
+        "title": f"{topic.title()} #{i}",
+        "content": f"{topic.capitalize()}: {body}.",
+        "platform": platform,
+        "tone": rng.choice(TONES),
+        "mode": "blog" if platform == "blog" else "social",
+        "words": n_words,
+        "model": "bench",
+        "tags": rng.sample(_WORDS, rng.randint(0, 4)),
+        "pinned": rng.random() < 0.02,
+    }
+
+
+def posts(n: int, seed: int = 1) -> Iterator[dict]:
+    rng = random.Random(seed)
+    for i in range(n):
+        yield post(rng, i)
+
+
+def create_user(engine, username: str = None, hashed_password: str = "x") -> str:
+    with engine.begin() as c:
+        return c.execute(text("""
+            INSERT INTO users (username, hashed_password) VALUES (:u, :h) RETURNING id::text
+        """), {"u": username or f"bench-{uuid.uuid4().hex[:8]}", "h": hashed_password}).scalar_one()
+
+
+def seed_library(engine, user_id: str, n: int, seed: int = 1, spread_days: int = 730) -> dict:
+    """
+    Load n seeded posts for user_id through the COPY importer, then spread
+    their created_at over the last spread_days (COPY stamps them all now()).
+    """
+    from backend.app import importer
+
+    with tempfile.TemporaryFile() as f:
+        for item in posts(n, seed):
+            f.write(json.dumps(item).encode("utf-8") + b"\n")
+        f.seek(0)
+        result = importer.import_items(f, "ndjson", user_id)
+    with engine.begin() as c:
+        c.execute(text("""
+            UPDATE items
+            SET created_at = now() - make_interval(secs => (abs(hashtext(id::text)) % :span))
+            WHERE user_id = CAST(:uid AS UUID)
+        """), {"uid": user_id, "span": spread_days * 86400})
+        c.execute(text("ANALYZE items"))
+    return result
+
+
+def image(rng: random.Random, size: Tuple[int, int] = (1280, 960), quality: int = 85) -> bytes:
+    """A seeded JPEG: gradient background, random shapes, a little noise."""
+    from PIL import Image, ImageDraw
+
+    w, h = size
+    top, bottom = [tuple(rng.randint(0, 255) for _ in range(3)) for _ in range(2)]
+    mask = Image.linear_gradient("L").resize(size)
+    img = Image.composite(Image.new("RGB", size, top), Image.new("RGB", size, bottom), mask)
+    draw = ImageDraw.Draw(img)
+    for _ in range(rng.randint(5, 25)):
+        x0, y0 = rng.randrange(w), rng.randrange(h)
+        x1, y1 = x0 + rng.randint(20, w // 3), y0 + rng.randint(20, h // 3)
+        fill = tuple(rng.randint(0, 255) for _ in range(3))
+        (draw.ellipse if rng.random() < 0.5 else draw.rectangle)([x0, y0, x1, y1], fill=fill)
+    noise = Image.frombytes("L", size, rng.randbytes(w * h))
+    img = Image.blend(img, Image.merge("RGB", (noise, noise, noise)), 0.08)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def _with_comment(jpeg: bytes, comment: str) -> bytes:
+    """Insert a COM segment after SOI (and the JFIF APP0 segment, which must come first)."""
+    pos = 2
+    if jpeg[2:4] == b"\xff\xe0":
+        pos = 4 + int.from_bytes(jpeg[4:6], "big")
+    payload = comment.encode()
+    return jpeg[:pos] + b"\xff\xfe" + (len(payload) + 2).to_bytes(2, "big") + payload + jpeg[pos:]
+
+
+def images(
+    n: int, seed: int = 1, size: Tuple[int, int] = (1280, 960), nonce: Optional[str] = None,
+) -> List[Tuple[str, bytes]]:
+    """n distinct (filename, jpeg bytes) pairs; a nonce makes them distinct from other runs too."""
+    rng = random.Random(seed)
+    out = []
+    for i in range(n):
+        data = image(rng, size)
+        if nonce:
+            data = _with_comment(data, f"bench {nonce} {i}")
+        out.append((f"bench-{seed}-{i}.jpg", data))
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Seeded benchmark data")
+    sub = ap.add_subparsers(dest="command", required=True)
+    lib = sub.add_parser("library", help="seed a Library for a (new) user")
+    lib.add_argument("--items", type=int, default=100_000)
+    lib.add_argument("--user", help="username (created if missing)")
+    lib.add_argument("--seed", type=int, default=1)
+    img = sub.add_parser("images", help="write seeded JPEGs to a directory")
+    img.add_argument("--n", type=int, default=50)
+    img.add_argument("--out", required=True)
+    img.add_argument("--seed", type=int, default=1)
+    img.add_argument("--size", default="1280x960")
+    args = ap.parse_args()
+
+    if args.command == "images":
+        os.makedirs(args.out, exist_ok=True)
+        w, h = (int(v) for v in args.size.lower().split("x"))
+        for name, data in images(args.n, args.seed, (w, h)):
+            with open(os.path.join(args.out, name), "wb") as f:
+                f.write(data)
+        print(f"wrote {args.n} images to {args.out}")
+        return
+
+    from backend.app.db import ENGINE
+
+    user_id = None
+    if args.user:
+        with ENGINE.begin() as c:
+            user_id = c.execute(text("SELECT id::text FROM users WHERE username = :u"), {"u": args.user}).scalar()
+    user_id = user_id or create_user(ENGINE, args.user)
+    t0 = time.perf_counter()
+    result = seed_library(ENGINE, user_id, args.items, args.seed)
+    took = time.perf_counter() - t0
+    print(f"user {user_id}: {result['imported']} items in {took:.1f}s ({result['imported'] / took:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# backend/bench/library_pagination.py
+"""
+Library listing latency vs page depth: OFFSET paging vs keyset cursor.
+
+Seeds --items rows for a throwaway bench user (generate_series, one
+statement), then times list_items at increasing depths. The cursor for a
+given depth is computed once up front and not timed. Offset latency grows
+with depth; cursor latency should stay flat. The bench user is deleted at
+the end (ON DELETE CASCADE removes its items).
+
+Needs DATABASE_URL pointing at a scratch Postgres.
+
+    python -m backend.bench.library_pagination --items 100000
+"""
+
+import argparse
+import statistics
+import time
+import uuid
+
+from sqlalchemy import text
+
+
+def _seed(engine, n: int) -> str:
+    with engine.begin() as c:
+        user_id = c.execute(text("""
+            INSERT INTO users (username, hashed_password) VALUES (:u, 'x') RETURNING id::text
+        """), {"u": f"bench-{uuid.uuid4().hex[:8]}"}).scalar_one()
+        c.execute(text("""
+            INSERT INTO items (title, content, platform, tone, mode, words, user_id, created_at)
+            SELECT 'Post ' || g,
+                   repeat('lorem ipsum dolor sit amet ', 20) || g,
+                   (ARRAY['linkedin','instagram','facebook','blog'])[1 + g % 4],
+                   (ARRAY['professional','friendly','witty','persuasive'])[1 + g % 4],
+                   CASE WHEN g % 4 = 3 THEN 'blog' ELSE 'social' END,
+                   120,
+                   CAST(:uid AS UUID),
+                   now() - make_interval(secs => g)
+            FROM generate_series(1, :n) AS g
+        """), {"uid": user_id, "n": n})
+        c.execute(text("ANALYZE items"))
+    return user_id
+
+
+def _time(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100_000)
+    ap.add_argument("--page-size", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    from backend.app.db import ENGINE, init_db
+    from backend.app.main import list_items, _encode_cursor
+
+    init_db()
+    user_id = _seed(ENGINE, args.items)
+    user = {"user_id": user_id}
+    ps = args.page_size
+    try:
+        last_page = args.items // ps
+        depths = sorted({1, 10, 100, 1000, last_page // 2, last_page} & set(range(1, last_page + 1)))
+        print(f"{args.items} items, pageSize {ps}, median of {args.repeat}")
+        print(f"{'page':>8} {'offset ms':>10} {'cursor ms':>10}")
+        for page in depths:
+            cursor = None
+            if page > 1:
+                with ENGINE.begin() as c:
+                    row = c.execute(text("""
+                        SELECT id::text AS id, created_at FROM items WHERE user_id = CAST(:uid AS UUID)
+                        ORDER BY created_at DESC, id DESC OFFSET :off LIMIT 1
+                    """), {"uid": user_id, "off": (page - 1) * ps - 1}).mappings().first()
+                cursor = _encode_cursor(row["created_at"], row["id"])
+            t_off = _time(lambda: list_items(q=None, platform=None, tone=None, page=page, pageSize=ps,
+                                             cursor=None, user=user), args.repeat)
+            t_cur = _time(lambda: list_items(q=None, platform=None, tone=None, page=1, pageSize=ps,
+                                             cursor=cursor, user=user), args.repeat)
+            print(f"{page:>8} {t_off * 1000:>10.2f} {t_cur * 1000:>10.2f}")
+    finally:
+        with ENGINE.begin() as c:
+            c.execute(text("DELETE FROM users WHERE id = CAST(:uid AS UUID)"), {"uid": user_id})
+
+
+if __name__ == "__main__":
+    main()
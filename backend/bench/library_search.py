@@ -0,0 +1,129 @@
+# backend/bench/library_search.py
+"""
+Library search latency and plans at scale.
+
+Seeds --items posts (datagen, 100k by default) for a throwaway bench user,
+then runs list_items for a few searches: a term with no matches, a common
+term (newest first and sort=relevance), a title typo, a title substring
+and a content substring. For each, the exact statement list_items sent
+is re-run under EXPLAIN (ANALYZE, FORMAT JSON), and the bench reports
+the median latency and the indexes the plan used.
+
+The check fails (exit 1) when a search does not go through the GIN
+indexes (items_search_tsv_idx / items_search_trgm_idx /
+items_title_trgm_idx) or walks items_user_created_idx row by row
+instead. The bench user is deleted at the end.
+
+Needs DATABASE_URL pointing at a migrated scratch Postgres.
+
+    python -m backend.bench.library_search --items 100000
+"""
+
+import argparse
+import json
+import statistics
+import time
+from typing import Any, Dict, List, Set
+
+from sqlalchemy import event, text
+
+from . import datagen
+
+GIN_INDEXES = {"items_search_tsv_idx", "items_search_trgm_idx", "items_title_trgm_idx"}
+
+CASES = [
+    ("no match", {"q": "zzzqqq"}),
+    ("common term", {"q": "launch"}),
+    ("common term, relevance", {"q": "launch", "sort": "relevance"}),
+    ("title typo", {"q": "sustainabilty"}),
+    ("title substring", {"q": "Launch #12"}),
+    ("content substring", {"q": "ngagemen"}),
+]
+
+
+def _plan_nodes(node: Dict[str, Any]) -> List[Dict[str, Any]]:
+    nodes = [node]
+    for child in node.get("Plans", []):
+        nodes.extend(_plan_nodes(child))
+    return nodes
+
+
+def _explain(engine, statement: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    raw = engine.raw_connection()
+    try:
+        cur = raw.cursor()
+        cur.execute("EXPLAIN (ANALYZE, FORMAT JSON) " + statement, parameters)
+        plan = cur.fetchone()[0]
+        raw.rollback()
+    finally:
+        raw.close()
+    return (plan if isinstance(plan, list) else json.loads(plan))[0]
+
+
+def _problems(plan: Dict[str, Any]) -> List[str]:
+    nodes = _plan_nodes(plan["Plan"])
+    used: Set[str] = {n["Index Name"] for n in nodes if "Index Name" in n}
+    problems = []
+    if not used & GIN_INDEXES:
+        problems.append(f"no GIN index used (indexes: {sorted(used) or 'none'})")
+    for n in nodes:
+        if n.get("Index Name") == "items_user_created_idx" and n["Node Type"] != "Bitmap Index Scan":
+            problems.append("walks items_user_created_idx row by row")
+        if n["Node Type"] == "Seq Scan" and n.get("Relation Name") == "items":
+            problems.append("sequential scan on items")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--items", type=int, default=100_000)
+    ap.add_argument("--page-size", type=int, default=20)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=1)
+    args = ap.parse_args()
+
+    from backend.app.db import ENGINE, init_db
+    from backend.app.main import list_items
+
+    init_db()
+    user_id = datagen.create_user(ENGINE)
+    captured: List[tuple] = []
+
+    @event.listens_for(ENGINE, "before_cursor_execute")
+    def _capture(conn, cursor, statement, parameters, context, executemany):
+        if "FROM items i" in statement:
+            captured.append((statement, parameters))
+
+    failed = False
+    try:
+        t0 = time.perf_counter()
+        datagen.seed_library(ENGINE, user_id, args.items, args.seed)
+        print(f"seeded {args.items} items in {time.perf_counter() - t0:.1f}s")
+        print(f"{'case':<24} {'median ms':>10} {'rows':>5}  indexes")
+        for name, kwargs in CASES:
+            call = dict(q=None, platform=None, tone=None, page=1, pageSize=args.page_size,
+                        cursor=None, sort="recent", user={"user_id": user_id})
+            call.update(kwargs)
+            samples, rows = [], 0
+            for _ in range(args.repeat):
+                captured.clear()
+                t0 = time.perf_counter()
+                rows = len(list_items(**call)["items"])
+                samples.append(time.perf_counter() - t0)
+            statement, parameters = captured[-1]
+            plan = _explain(ENGINE, statement, parameters)
+            used = sorted({n["Index Name"] for n in _plan_nodes(plan["Plan"]) if "Index Name" in n})
+            print(f"{name:<24} {statistics.median(samples) * 1000:>10.2f} {rows:>5}  {', '.join(used)}")
+            for p in _problems(plan):
+                failed = True
+                print(f"  FAIL: {p}")
+    finally:
+        event.remove(ENGINE, "before_cursor_execute", _capture)
+        with ENGINE.begin() as c:
+            c.execute(text("DELETE FROM users WHERE id = CAST(:uid AS UUID)"), {"uid": user_id})
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+# backend/bench/loadtest.py
+"""
+End-to-end load test: throughput and p50/p95/p99 per endpoint.
+
+Runs the API against local Groq/OpenRouter stubs (see stubs.py for the
+latency / streaming / error knobs) and a scratch Postgres. A throwaway
+user is registered, a seeded Library is loaded for it (datagen.py), and
+each scenario then runs on its own for --requests calls at --concurrency:
+
+  login            POST /api/login
+  items_list       GET  /api/items                   (first page)
+  items_search     GET  /api/items?q=...             (seeded search terms)
+  items_paginate   GET  /api/items?cursor=...        (pages up to --depth deep)
+  generate         POST /api/generate                (cache=bypass, hits the stub)
+  generate_stream  POST /api/generate/stream         (full SSE body)
+  agent_chat       POST /api/agent/chat              (LLM path, not the intent router)
+  images_analyze   POST /api/images/analyze          (seeded JPEGs, a new one per call)
+
+Results can be saved as a baseline JSON and compared against one.
+Differences beyond --tolerance are flagged, so regressions show up in
+review:
+
+    python -m backend.bench.loadtest --save backend/bench/baselines/loadtest.json
+    python -m backend.bench.loadtest --compare backend/bench/baselines/loadtest.json
+
+By default the API is served in-process on a background thread, which
+makes the numbers comparable to each other but not to production. For
+multi-worker numbers, start the API yourself, with GROQ_BASE_URL /
+OPENROUTER_BASE_URL pointing at `python -m backend.bench.stubs`, and
+pass --target http://127.0.0.1:8000.
+
+images_analyze measures the uncached path (upload, PIL, vision stub):
+each call, warmup included, sends an image no earlier call or run has
+sent, since image_analyses is shared by all users. The images' cache
+rows and uploads/ files are removed on teardown (unless --keep).
+
+Needs DATABASE_URL pointing at a migrated scratch Postgres; run it from
+the repo root (the API serves uploads/ from the current directory).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from sqlalchemy import text
+
+from . import datagen
+from .stubs import run_stub
+
+SCENARIOS = [
+    "login", "items_list", "items_search", "items_paginate",
+    "generate", "generate_stream", "agent_chat", "images_analyze",
+]
+
+Scenario = Callable[[httpx.AsyncClient, int], Awaitable[None]]
+
+
+def _check(r: httpx.Response) -> None:
+    if r.status_code >= 400:
+        raise RuntimeError(f"{r.request.method} {r.request.url.path}: HTTP {r.status_code}")
+
+
+def _scenarios(ctx: Dict) -> Dict[str, Scenario]:
+    auth = {"Authorization": f"Bearer {ctx['token']}"}
+
+    async def login(c, i):
+        _check(await c.post("/api/login", json={"username": ctx["username"], "password": ctx["password"]}))
+
+    async def items_list(c, i):
+        _check(await c.get("/api/items", params={"pageSize": 20}, headers=auth))
+
+    async def items_search(c, i):
+        q = datagen.SEARCH_TERMS[i % len(datagen.SEARCH_TERMS)]
+        _check(await c.get("/api/items", params={"q": q, "pageSize": 20}, headers=auth))
+
+    async def items_paginate(c, i):
+        cursor = ctx["cursors"][i % len(ctx["cursors"])]
+        _check(await c.get("/api/items", params={"pageSize": 20, "cursor": cursor}, headers=auth))
+
+    async def generate(c, i):
+        _check(await c.post("/api/generate", json={"prompt": f"load test idea {i}", "cache": "bypass"}))
+
+    async def generate_stream(c, i):
+        async with c.stream("POST", "/api/generate/stream",
+                            json={"prompt": f"load test stream {i}", "cache": "bypass"}) as r:
+            _check(r)
+            body = b"".join([chunk async for chunk in r.aiter_bytes()])
+        if b"event: done" not in body:
+            raise RuntimeError("stream ended without a done event")
+
+    async def agent_chat(c, i):
+        topic = datagen.TOPICS[i % len(datagen.TOPICS)]
+        _check(await c.post("/api/agent/chat", headers=auth,
+                            json={"message": f"Suggest a hook for a post about {topic} ({i})"}))
+
+    async def images_analyze(c, i):
+        # warmup calls get the indexes after the timed ones
+        name, data = ctx["images"][i if i >= 0 else ctx["requests"] - 1 - i]
+        _check(await c.post("/api/images/analyze", files={"file": (name, data, "image/jpeg")}))
+
+    return {
+        "login": login,
+        "items_list": items_list,
+        "items_search": items_search,
+        "items_paginate": items_paginate,
+        "generate": generate,
+        "generate_stream": generate_stream,
+        "agent_chat": agent_chat,
+        "images_analyze": images_analyze,
+    }
+
+
+def _stats(latencies: List[float], errors: int, elapsed: float) -> Dict:
+    ms = sorted(x * 1000 for x in latencies)
+    if len(ms) > 1:
+        qs = statistics.quantiles(ms, n=100, method="inclusive")
+        p50, p95, p99 = qs[49], qs[94], qs[98]
+    else:
+        p50 = p95 = p99 = ms[0] if ms else 0.0
+    return {
+        "requests": len(ms) + errors,
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(p50, 2),
+        "p95_ms": round(p95, 2),
+        "p99_ms": round(p99, 2),
+        "mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+        "max_ms": round(ms[-1], 2) if ms else 0.0,
+    }
+
+
+async def _drive(c: httpx.AsyncClient, fn: Scenario, total: int, concurrency: int, warmup: int) -> Dict:
+    for i in range(warmup):
+        try:
+            await fn(c, -1 - i)
+        except Exception:
+            pass
+
+    latencies: List[float] = []
+    errors = 0
+    next_i = 0
+
+    async def worker():
+        nonlocal next_i, errors
+        while next_i < total:
+            i, next_i = next_i, next_i + 1
+            t0 = time.perf_counter()
+            try:
+                await fn(c, i)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(min(concurrency, total))])
+    return _stats(latencies, errors, time.perf_counter() - t0)
+
+
+async def _setup(c: httpx.AsyncClient, engine, args) -> Dict:
+    ctx = {"username": f"bench-{uuid.uuid4().hex[:8]}", "password": "bench-password"}
+    r = await c.post("/api/register", json={"username": ctx["username"], "password": ctx["password"]})
+    _check(r)
+    ctx["user_id"] = str(r.json()["id"])
+    r = await c.post("/api/login", json={"username": ctx["username"], "password": ctx["password"]})
+    _check(r)
+    ctx["token"] = r.json()["access_token"]
+
+    t0 = time.perf_counter()
+    await asyncio.to_thread(datagen.seed_library, engine, ctx["user_id"], args.items, args.seed)
+    print(f"seeded {args.items} items in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+    # cursors for pages 1..depth, collected untimed
+    ctx["cursors"], cursor = [], None
+    for _ in range(args.depth):
+        r = await c.get("/api/items", params={"pageSize": 20, **({"cursor": cursor} if cursor else {})},
+                        headers={"Authorization": f"Bearer {ctx['token']}"})
+        _check(r)
+        cursor = r.json()["next_cursor"]
+        if not cursor:
+            break
+        ctx["cursors"].append(cursor)
+
+    ctx["requests"] = args.requests
+    if "images_analyze" in args.scenarios:
+        # one image per call, unique to this run, so none is a vision cache hit
+        ctx["images"] = await asyncio.to_thread(datagen.images, args.requests + args.warmup, args.seed,
+                                                (1024, 768), uuid.uuid4().hex)
+    else:
+        ctx["images"] = []
+    return ctx
+
+
+def _cleanup_images(engine, images) -> None:
+    """Drop the cached analyses and stored uploads of this run's images."""
+    shas = [hashlib.sha256(data).hexdigest() for _, data in images]
+    if not shas:
+        return
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM image_analyses WHERE sha256 = ANY(:shas)"), {"shas": shas})
+    for sha in shas:
+        path = os.path.join("uploads", f"{sha}.jpg")
+        if os.path.exists(path):
+            os.remove(path)
+
+
+async def _run(args, base_url: str) -> Dict[str, Dict]:
+    from backend.app.db import ENGINE
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as c:
+        ctx = await _setup(c, ENGINE, args)
+        try:
+            fns = _scenarios(ctx)
+            results = {}
+            for name in args.scenarios:
+                results[name] = await _drive(c, fns[name], args.requests, args.concurrency, args.warmup)
+                print(_row(name, results[name]), file=sys.stderr)
+            return results
+        finally:
+            if not args.keep:
+                with ENGINE.begin() as conn:
+                    conn.execute(text("DELETE FROM users WHERE id = CAST(:uid AS UUID)"), {"uid": ctx["user_id"]})
+                _cleanup_images(ENGINE, ctx["images"])
+
+
+def _row(name: str, s: Dict) -> str:
+    return (f"{name:<16} {s['throughput_rps']:>9.1f} rps  p50 {s['p50_ms']:>8.1f}  p95 {s['p95_ms']:>8.1f}"
+            f"  p99 {s['p99_ms']:>8.1f} ms  errors {s['errors']}/{s['requests']}")
+
+
+def _git_rev() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(base: Dict, current: Dict, tolerance: float) -> List[str]:
+    """Regressions of current vs base results (p95/p99 up, throughput down, more errors)."""
+    problems = []
+    for name, now in current.items():
+        was = base.get(name)
+        if not was:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if was[key] and now[key] > was[key] * (1 + tolerance):
+                problems.append(f"{name}: {key} {was[key]:.1f} -> {now[key]:.1f} (+{now[key] / was[key] - 1:.0%})")
+        if was["throughput_rps"] and now["throughput_rps"] < was["throughput_rps"] * (1 - tolerance):
+            problems.append(f"{name}: throughput {was['throughput_rps']:.1f} -> {now['throughput_rps']:.1f} rps")
+        if now["errors"] > was["errors"]:
+            problems.append(f"{name}: errors {was['errors']} -> {now['errors']}")
+    return problems
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="InspireAI end-to-end load test")
+    ap.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    ap.add_argument("--requests", type=int, default=200, help="timed requests per scenario")
+    ap.add_argument("--concurrency", type=int, default=20)
+    ap.add_argument("--warmup", type=int, default=5)
+    ap.add_argument("--items", type=int, default=20_000, help="seeded Library size")
+    ap.add_argument("--depth", type=int, default=50, help="deepest page for items_paginate")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--llm-latency", type=float, default=0.5)
+    ap.add_argument("--vision-latency", type=float, default=1.0)
+    ap.add_argument("--ttft", type=float, default=0.1)
+    ap.add_argument("--jitter", type=float, default=0.2)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--target", help="base URL of an already running API (default: serve in-process)")
+    ap.add_argument("--save", help="write results as a baseline JSON")
+    ap.add_argument("--compare", help="baseline JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.2, help="allowed relative change (0.2 = 20%%)")
+    ap.add_argument("--keep", action="store_true", help="keep the bench user and its data")
+    ap.add_argument("--notes", default="", help="free-form machine/setup notes stored in a saved baseline")
+    args = ap.parse_args()
+
+    if args.target:
+        results = asyncio.run(_run(args, args.target))
+    else:
+        stub_kwargs = dict(latency=args.llm_latency, vision_latency=args.vision_latency, ttft=args.ttft,
+                           jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+        with run_stub(**stub_kwargs) as stub_url:
+            # must be set before the app (and its shared LLM clients) is imported
+            os.environ["GROQ_BASE_URL"] = stub_url
+            os.environ.setdefault("GROQ_API_KEY", "stub")
+            os.environ["OPENROUTER_BASE_URL"] = stub_url + "/api/v1"
+            os.environ.setdefault("OPENROUTER_API_KEY", "stub")
+            from backend.app.main import app
+
+            with run_stub(app=app) as api_url:
+                results = asyncio.run(_run(args, api_url))
+
+    print()
+    for name, s in results.items():
+        print(_row(name, s))
+
+    config = {k: v for k, v in vars(args).items() if k not in ("save", "compare", "keep", "notes")}
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    "git_rev": _git_rev(),
+                    "python": platform.python_version(),
+                    "machine": {
+                        "arch": platform.machine(),
+                        "platform": platform.platform(),
+                        "cpus": os.cpu_count(),
+                        "notes": args.notes,
+                    },
+                    # stub latencies/jitter/error rate are part of the config
+                    "config": config,
+                },
+                "results": results,
+            }, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nbaseline written to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            base = json.load(f)
+        if base["meta"].get("config") != config:
+            print("\nwarning: baseline was recorded with a different configuration", file=sys.stderr)
+        problems = compare(base["results"], results, args.tolerance)
+        if problems:
+            print(f"\nregressions vs {args.compare} (tolerance {args.tolerance:.0%}):")
+            for p in problems:
+                print(f"  {p}")
+            raise SystemExit(1)
+        print(f"\nno regressions vs {args.compare} (tolerance {args.tolerance:.0%})")
+
+
+if __name__ == "__main__":
+    main()
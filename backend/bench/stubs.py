@@ -0,0 +1,153 @@
+# backend/bench/stubs.py
+"""
+Local stand-ins for the external LLM providers, for benchmarks.
+
+Groq stub:       POST /openai/v1/chat/completions  (plain JSON or SSE when "stream": true)
+OpenRouter stub: POST /api/v1/chat/completions     (vision-style JSON caption/tags)
+
+Knobs: `latency` (Groq, whole response; spread over the chunks when
+streaming), `vision_latency` (OpenRouter, defaults to `latency`),
+`jitter` (latency is scaled by a random factor in [1 - jitter, 1 + jitter]),
+`ttft` (streaming: delay before the first chunk, included in `latency`),
+and `error_rate` (share of calls answered with 500, or 429 with
+Retry-After for OpenRouter). `seed` makes the jitter/errors reproducible.
+
+Usage:
+    with run_stub(latency=1.0) as base_url:
+        os.environ["GROQ_BASE_URL"] = base_url
+        ...
+
+or standalone, for an API started separately:
+    python -m backend.bench.stubs --port 9100 --latency 0.5 --error-rate 0.01
+    # GROQ_BASE_URL=http://127.0.0.1:9100  OPENROUTER_BASE_URL=http://127.0.0.1:9100/api/v1
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import random
+import socket
+import threading
+import time
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+def make_stub_app(
+    latency: float = 0.5,
+    text: str = "🤔 thinking\n✅ Final Answer: stub reply",
+    vision_latency: float = None,
+    jitter: float = 0.0,
+    ttft: float = 0.0,
+    error_rate: float = 0.0,
+    seed: int = None,
+) -> FastAPI:
+    app = FastAPI()
+    rng = random.Random(seed)
+    vision_latency = latency if vision_latency is None else vision_latency
+
+    def _delay(base: float) -> float:
+        return max(0.0, base * (1 + rng.uniform(-jitter, jitter))) if jitter else base
+
+    def _fail() -> bool:
+        return error_rate > 0 and rng.random() < error_rate
+
+    @app.post("/openai/v1/chat/completions")
+    async def groq_chat(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub-model")
+        if _fail():
+            await asyncio.sleep(_delay(ttft or latency / 4))
+            return JSONResponse({"error": {"message": "stub failure", "type": "internal_error"}}, status_code=500)
+        words = text.split(" ")
+        usage = {"prompt_tokens": 10, "completion_tokens": len(words), "total_tokens": 10 + len(words)}
+        total = _delay(latency)
+        if body.get("stream"):
+            async def chunks():
+                first = min(ttft, total)
+                per_chunk = (total - first) / max(len(words), 1)
+                await asyncio.sleep(first)
+                for i, w in enumerate(words):
+                    await asyncio.sleep(per_chunk)
+                    piece = w if i == 0 else " " + w
+                    last = i == len(words) - 1
+                    payload = {
+                        "id": "stub", "object": "chat.completion.chunk", "created": int(time.time()),
+                        "model": model,
+                        "choices": [{"index": 0, "delta": {"content": piece},
+                                     "finish_reason": "stop" if last else None}],
+                    }
+                    if last:
+                        payload["x_groq"] = {"usage": usage}  # where Groq reports usage on streams
+                    yield f"data: {json.dumps(payload)}\n\n"
+                yield "data: [DONE]\n\n"
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+
+        await asyncio.sleep(total)
+        return JSONResponse({
+            "id": "stub", "object": "chat.completion", "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    @app.post("/api/v1/chat/completions")
+    async def openrouter_chat(request: Request):
+        body = await request.body()  # read the full payload like the real provider would
+        if _fail():
+            return JSONResponse({"error": {"message": "rate limited"}}, status_code=429, headers={"Retry-After": "1"})
+        await asyncio.sleep(_delay(vision_latency))
+        content = json.dumps({"caption": "a stub image caption", "tags": ["stub", "image", "test"]})
+        return JSONResponse({
+            "id": "stub",
+            "model": "stub-vision",
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+            "usage": {"prompt_tokens": len(body) // 4, "completion_tokens": 20, "total_tokens": len(body) // 4 + 20},
+        })
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@contextlib.contextmanager
+def run_stub(app: FastAPI = None, **kwargs):
+    """Serve a stub app on a background thread; yields its base URL."""
+    app = app or make_stub_app(**kwargs)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Local Groq/OpenRouter stub server")
+    ap.add_argument("--port", type=int, default=9100)
+    ap.add_argument("--latency", type=float, default=0.5)
+    ap.add_argument("--vision-latency", type=float)
+    ap.add_argument("--ttft", type=float, default=0.0)
+    ap.add_argument("--jitter", type=float, default=0.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args()
+    app = make_stub_app(latency=args.latency, vision_latency=args.vision_latency, ttft=args.ttft,
+                        jitter=args.jitter, error_rate=args.error_rate, seed=args.seed)
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
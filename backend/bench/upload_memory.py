@@ -0,0 +1,166 @@
+# backend/bench/upload_memory.py
+"""
+Peak memory of the analyze upload pipeline, per request.
+
+"before" mimics the old path (read whole file, base64 it, build the data URL);
+"after" runs the current path: chunked copy + hash into a stored file,
+then file-based validate/preprocess.
+
+Each (image, case) runs in its own subprocess, after a warm-up on a small
+image of the same format (imports, PIL plugin and codec setup), and
+reports two numbers:
+  - tracemalloc peak: bytes/str copies made by Python code
+  - peak RSS growth: everything, including PIL's C-side decode/encode
+    buffers that tracemalloc cannot see. On Linux the RSS high-water mark
+    is reset after the warm-up (/proc/self/clear_refs); elsewhere it is
+    the growth of ru_maxrss over the warm-up peak.
+
+    python -m backend.bench.upload_memory [images...]   (defaults to uploads/*)
+"""
+
+import argparse
+import asyncio
+import base64
+import glob
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+
+from PIL import Image
+from starlette.datastructures import UploadFile
+
+from backend.app.images import (
+    _discard, _prepare_for_vision, _store_upload, _to_data_url, _validate_and_open_image, _with_file,
+)
+
+
+def _upload(src) -> UploadFile:
+    # same shape as what starlette hands the route: a spooled temp file
+    spooled = tempfile.SpooledTemporaryFile(max_size=1024 * 1024)
+    size = 0
+    while chunk := src.read(256 * 1024):
+        spooled.write(chunk)
+        size += len(chunk)
+    spooled.seek(0)
+    return UploadFile(spooled, size=size, filename=getattr(src, "name", "warmup"))
+
+
+async def _before(file: UploadFile) -> None:
+    raw = await file.read()
+    data_url = "data:image/png;base64," + base64.b64encode(raw).decode("utf-8")
+    assert data_url
+
+
+async def _after(file: UploadFile) -> None:
+    _, path = _store_upload(file.file, file.size, tempfile.gettempdir())
+    try:
+        _with_file(_validate_and_open_image, path)
+        data_url = _to_data_url(*_with_file(_prepare_for_vision, path))
+    finally:
+        _discard(path)
+    assert data_url
+
+
+CASES = {"before": _before, "after": _after}
+
+
+def _warmup_image(path: str) -> io.BytesIO:
+    with Image.open(path) as img:
+        fmt = img.format
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(buf, format=fmt)
+    buf.seek(0)
+    return buf
+
+
+def _run(fn, src) -> None:
+    file = _upload(src)
+    try:
+        asyncio.run(fn(file))
+    finally:
+        file.file.close()
+
+
+def _reset_rss_peak() -> bool:
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _rss_peak() -> int:
+    """Peak RSS in bytes: VmHWM where available, else ru_maxrss."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _measure(case: str, path: str) -> dict:
+    """Runs in the child process."""
+    fn = CASES[case]
+    _run(fn, _warmup_image(path))
+
+    # RSS first, untraced: tracemalloc's bookkeeping would inflate it, and a
+    # second run would reuse memory the first one already mapped
+    _reset_rss_peak()
+    rss_before = _rss_peak()
+    with open(path, "rb") as f:
+        _run(fn, f)
+    rss = max(0, _rss_peak() - rss_before)
+
+    tracemalloc.start()
+    try:
+        with open(path, "rb") as f:
+            _run(fn, f)
+        return {"traced": tracemalloc.get_traced_memory()[1], "rss": rss}
+    finally:
+        tracemalloc.stop()
+
+
+def _child(case: str, path: str) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "backend.bench.upload_memory", "--child", case, path],
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("images", nargs="*")
+    ap.add_argument("--child", choices=sorted(CASES), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.child, args.images[0])))
+        return
+
+    paths = args.images or sorted(glob.glob("uploads/*"))
+    if not paths:
+        raise SystemExit("no images given and uploads/ is empty")
+
+    print(f"{'file':<28} {'size KiB':>9}  {'before heap/RSS KiB':>21}  {'after heap/RSS KiB':>20}")
+    for path in paths:
+        size = os.path.getsize(path)
+        cols = []
+        for case in ("before", "after"):
+            r = _child(case, path)
+            cols.append(f"{r['traced'] / 1024:9.1f} /{r['rss'] / 1024:9.1f}")
+        print(f"{os.path.basename(path):<28} {size / 1024:9.1f}  {cols[0]:>21}  {cols[1]:>20}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# backend/bench/vision_payload.py
+"""
+Vision request payload size and latency, before vs after preprocessing.
+
+"before" sends the original bytes as the data URL (old behaviour),
+"after" runs _prepare_for_vision first. Latency covers local encoding
+plus the POST of the JSON body to a local OpenRouter stub.
+
+    python -m backend.bench.vision_payload [images...]   (defaults to uploads/*)
+"""
+
+import argparse
+import base64
+import glob
+import io
+import json
+import statistics
+import time
+
+import httpx
+
+from .stubs import run_stub
+
+
+def _body(data_url: str) -> bytes:
+    return json.dumps({
+        "model": "stub-vision",
+        "messages": [{"role": "user", "content": [{"type": "image_url", "image_url": {"url": data_url}}]}],
+    }).encode("utf-8")
+
+
+def _before(raw: bytes) -> bytes:
+    return _body("data:image/png;base64," + base64.b64encode(raw).decode("utf-8"))
+
+
+def _after(raw: bytes) -> bytes:
+    from backend.app.images import _prepare_for_vision, _to_data_url
+    # _prepare_for_vision reads from a file object, like the spooled upload
+    return _body(_to_data_url(*_prepare_for_vision(io.BytesIO(raw))))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("images", nargs="*")
+    ap.add_argument("--latency", type=float, default=0.0, help="stub provider latency (s)")
+    args = ap.parse_args()
+    paths = args.images or sorted(glob.glob("uploads/*"))
+    if not paths:
+        raise SystemExit("no images given and uploads/ is empty")
+
+    results = {"before": {"bytes": [], "secs": []}, "after": {"bytes": [], "secs": []}}
+    with run_stub(latency=args.latency) as base_url, httpx.Client(base_url=base_url, timeout=120) as c:
+        for path in paths:
+            with open(path, "rb") as f:
+                raw = f.read()
+            for name, build in (("before", _before), ("after", _after)):
+                t0 = time.perf_counter()
+                body = build(raw)
+                c.post("/api/v1/chat/completions", content=body, headers={"Content-Type": "application/json"})
+                results[name]["secs"].append(time.perf_counter() - t0)
+                results[name]["bytes"].append(len(body))
+
+    print(f"{len(paths)} image(s)")
+    for name, r in results.items():
+        print(f"{name:>6}: payload mean {statistics.mean(r['bytes']) / 1024:9.1f} KiB  "
+              f"max {max(r['bytes']) / 1024:9.1f} KiB  "
+              f"latency mean {statistics.mean(r['secs']) * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
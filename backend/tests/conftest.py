@@ -0,0 +1,20 @@
+# backend/tests/conftest.py
+"""
+Run from the repo root:
+
+    python -m pytest backend/tests
+
+No database is needed: the app module only builds its engine at import
+(nothing connects), and tests stub every route dependency that would.
+"""
+
+import os
+
+os.environ.setdefault("DATABASE_URL", "postgresql://test@localhost/test")
+
+import pytest
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,76 @@
+# backend/tests/test_agent_concurrency.py
+"""
+N concurrent /api/agent/chat calls against a local stub LLM with fixed
+latency finish in about one LLM latency, not N of them.
+
+The session/history/context lookups are replaced by blocking fakes that
+sleep like a DB round trip, so a call made on the event loop instead of
+the threadpool would serialize the requests and fail the bound too.
+"""
+
+import asyncio
+import time
+
+import httpx
+import pytest
+from groq import AsyncGroq
+
+from backend.app import agent, conversations, intents
+from backend.app.auth import get_current_user
+from backend.app.main import app
+from backend.bench.stubs import run_stub
+
+N = 20
+LLM_LATENCY = 0.5
+DB_LATENCY = 0.02
+
+
+def _db(result):
+    def call(*args, **kwargs):
+        time.sleep(DB_LATENCY)
+        return result
+    return call
+
+
+@pytest.fixture
+async def stub_llm(monkeypatch):
+    with run_stub(latency=LLM_LATENCY) as base_url:
+        async with AsyncGroq(api_key="stub", base_url=base_url) as client:
+            monkeypatch.setattr(agent, "client", client)
+            yield client
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    monkeypatch.setattr(conversations, "open_session", _db({"id": "s1", "summary": None}))
+    monkeypatch.setattr(conversations, "load_history", _db([]))
+    monkeypatch.setattr(conversations, "append_turns", _db(None))
+    monkeypatch.setattr(intents, "route", _db(None))
+    monkeypatch.setattr(agent, "_select_context_items", _db(([], False)))
+
+    async def no_compaction(session_id):
+        pass
+
+    monkeypatch.setattr(conversations, "compact_if_needed", no_compaction)
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+    yield
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+@pytest.mark.anyio
+async def test_concurrent_chats_take_about_one_llm_latency(stub_llm, fake_db):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=30) as c:
+        # warm up the connection pool and imports outside the timed run
+        r = await c.post("/api/agent/chat", json={"message": "warm up"})
+        assert r.status_code == 200
+
+        t0 = time.perf_counter()
+        resps = await asyncio.gather(*[
+            c.post("/api/agent/chat", json={"message": f"summarize my posts #{i}"}) for i in range(N)
+        ])
+        elapsed = time.perf_counter() - t0
+
+    assert [r.status_code for r in resps] == [200] * N
+    assert resps[0].json()["final_answer"] == "stub reply"
+    assert elapsed < 2 * LLM_LATENCY, f"{N} chats took {elapsed:.2f}s"
@@ -0,0 +1,87 @@
+# backend/tests/test_bulk_items.py
+"""
+Id and tag handling of POST /api/items/bulk, against a fake connection
+that answers like Postgres (RETURNING id::text: lowercase, hyphenated).
+"""
+
+import uuid
+from contextlib import contextmanager
+
+import httpx
+import pytest
+
+from backend.app import main
+from backend.app.auth import get_current_user
+from backend.app.main import app
+
+ITEM = uuid.uuid4()
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def mappings(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class _Conn:
+    def __init__(self, calls):
+        self.calls = calls
+
+    def execute(self, statement, params):
+        self.calls.append(params)
+        ids = [str(uuid.UUID(i)) for i in params["ids"]]  # Postgres would raise on a bad one
+        return _Result([{"id": i} for i in ids if i == str(ITEM)])
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    calls = []
+
+    class Engine:
+        @contextmanager
+        def begin(self):
+            yield _Conn(calls)
+
+    monkeypatch.setattr(main, "ENGINE", Engine())
+    monkeypatch.setattr(main.retrieval, "invalidate", lambda user_id: None)
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1"}
+    yield calls
+    app.dependency_overrides.pop(get_current_user, None)
+
+
+async def _bulk(body):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app") as c:
+        r = await c.post("/api/items/bulk", json=body)
+    assert r.status_code == 200
+    return r.json()
+
+
+@pytest.mark.anyio
+async def test_uppercase_id_is_matched_and_reported_as_sent(calls):
+    sent = str(ITEM).upper()
+    out = await _bulk({"action": "pin", "ids": [sent]})
+    assert calls[0]["ids"] == [str(ITEM)]
+    assert out["affected"] == 1
+    assert out["results"] == [{"id": sent, "ok": True}]
+
+
+@pytest.mark.anyio
+async def test_urn_id_is_invalid_and_not_sent_to_the_database(calls):
+    urn = ITEM.urn
+    out = await _bulk({"action": "delete", "ids": [urn, str(ITEM)]})
+    assert calls[0]["ids"] == [str(ITEM)]
+    assert out["results"] == [
+        {"id": urn, "ok": False, "error": "Invalid id"},
+        {"id": str(ITEM), "ok": True},
+    ]
+
+
+@pytest.mark.anyio
+async def test_bulk_tags_are_normalized(calls):
+    await _bulk({"action": "tag", "ids": [str(ITEM)], "tags": [" launch", "launch ", "", "news"]})
+    assert calls[0]["tags"] == ["launch", "news"]
@@ -0,0 +1,87 @@
+# backend/tests/test_login_storm.py
+"""
+A login storm neither starves the rest of the API nor queues without
+bound.
+
+More concurrent logins than FastAPI's threadpool has threads hit
+/api/login while a sync endpoint (/api/diag) is polled. bcrypt runs in
+the password process pool, so the probes stay fast; logins beyond
+PASSWORD_QUEUE_MAX are turned away with 503 + Retry-After.
+"""
+
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from passlib.hash import bcrypt
+
+from backend.app import main, passwords
+from backend.app.main import app
+
+LOGINS = 60  # more than the threadpool's 40 threads
+ROUNDS = 10  # cheaper than the default cost, still a real bcrypt
+PROBE_BOUND = 0.25
+
+
+@pytest.fixture
+def user(monkeypatch):
+    # fresh pool for each test; its workers pick up BCRYPT_ROUNDS when spawned
+    monkeypatch.setenv("BCRYPT_ROUNDS", str(ROUNDS))
+    monkeypatch.setattr(passwords, "_pool", None)
+    hashed = bcrypt.using(rounds=ROUNDS).hash("pw")
+    row = SimpleNamespace(id=uuid.uuid4(), username="storm", hashed_password=hashed)
+    monkeypatch.setattr(main, "_get_user_by_username", lambda username: row)
+    monkeypatch.setattr(main, "_update_password_hash", lambda user_id, hashed: None)
+    yield row
+    passwords.shutdown()
+
+
+async def _storm(c: httpx.AsyncClient):
+    """Fire LOGINS concurrent logins, polling /api/diag until they finish."""
+    # start the worker processes outside the measured run
+    r = await c.post("/api/login", json={"username": "storm", "password": "pw"})
+    assert r.status_code == 200
+
+    t0 = time.perf_counter()
+    storm = asyncio.ensure_future(asyncio.gather(*[
+        c.post("/api/login", json={"username": "storm", "password": "pw"}) for _ in range(LOGINS)
+    ]))
+    probes = []
+    while not storm.done():
+        p0 = time.perf_counter()
+        r = await c.get("/api/diag")
+        probes.append(time.perf_counter() - p0)
+        assert r.status_code == 200
+        await asyncio.sleep(0.01)
+    return await storm, probes, time.perf_counter() - t0
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app", timeout=60)
+
+
+@pytest.mark.anyio
+async def test_login_storm_does_not_starve_other_requests(user, monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_QUEUE_MAX", LOGINS)
+    async with _client() as c:
+        resps, probes, elapsed = await _storm(c)
+
+    assert [r.status_code for r in resps] == [200] * LOGINS
+    # the storm lasts many hashes; no probe waits for one
+    assert elapsed > 5 * PROBE_BOUND
+    assert max(probes) < PROBE_BOUND, f"slowest probe {max(probes) * 1000:.0f} ms"
+
+
+@pytest.mark.anyio
+async def test_login_storm_is_shed_with_503_and_retry_after(user, monkeypatch):
+    monkeypatch.setattr(passwords, "PASSWORD_QUEUE_MAX", 8)
+    async with _client() as c:
+        resps, _, _ = await _storm(c)
+
+    statuses = [r.status_code for r in resps]
+    assert statuses.count(200) >= 8
+    assert statuses.count(503) == LOGINS - statuses.count(200)
+    assert all(r.headers["retry-after"] == "1" for r in resps if r.status_code == 503)
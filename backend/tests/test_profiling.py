@@ -0,0 +1,49 @@
+# backend/tests/test_profiling.py
+"""Profiled sync endpoints, without rebinding FastAPI's own run_in_threadpool."""
+
+import fastapi.dependencies.utils
+import fastapi.routing
+import httpx
+import pytest
+import starlette.concurrency
+
+from backend.app import profiling
+from backend.app.main import app
+
+TOKEN = "test-admin-token"
+
+
+@pytest.fixture
+def admin(monkeypatch):
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", TOKEN)
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app")
+
+
+def test_fastapi_threadpool_is_not_patched():
+    assert fastapi.routing.run_in_threadpool is starlette.concurrency.run_in_threadpool
+    assert fastapi.dependencies.utils.run_in_threadpool is starlette.concurrency.run_in_threadpool
+
+
+@pytest.mark.anyio
+async def test_sync_endpoint_records_threadpool_wait(admin):
+    async with _client() as c:
+        r = await c.get("/api/diag", headers={"X-Profile": TOKEN})
+        assert r.status_code == 200
+        profile_id = r.headers["x-profile-id"]
+        r = await c.get(f"/api/admin/profiles/{profile_id}", headers={"X-Admin-Token": TOKEN})
+
+    assert r.status_code == 200
+    spans = r.json()["spans"]
+    assert spans["threadpool_wait"]["count"] == 1
+    assert spans["threadpool_wait"]["ms"] >= 0
+
+
+@pytest.mark.anyio
+async def test_unprofiled_request_has_no_profile(admin):
+    async with _client() as c:
+        r = await c.get("/api/diag")
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
@@ -0,0 +1,56 @@
+# backend/tests/test_retrieval.py
+"""Per-user retrieval index: ranking, write hooks and memory per item."""
+
+import random
+
+import numpy as np
+
+from backend.app.retrieval import RETRIEVAL_DIM, UserIndex, _doc_text, vectorize
+from backend.bench import datagen
+
+
+def _items(n: int, seed: int = 1):
+    return [{"id": f"id-{i}", **p} for i, p in enumerate(datagen.posts(n, seed))]
+
+
+def _dense_ranking(idx: UserIndex, items, query: str, k: int):
+    """Reference: dense cosine with the index's IDF weights."""
+    docs = np.stack([vectorize(_doc_text(it)) for it in items]) * idx.idf
+    q = vectorize(query) * idx.idf
+    scores = docs @ q / np.maximum(np.linalg.norm(docs, axis=1) * np.linalg.norm(q), 1e-9)
+    order = np.argsort(-scores)[:k]
+    return [items[i]["id"] for i in order if scores[i] > 0]
+
+
+def test_search_matches_dense_cosine():
+    items = _items(500)
+    idx = UserIndex.from_items(items)
+    for query in ("launch", "customer feedback culture", "growth strategy results"):
+        assert [i for i, _ in idx.search(query, 5)] == _dense_ranking(idx, items, query, 5)
+
+
+def test_upsert_and_remove_survive_compaction():
+    items = _items(300)
+    idx = UserIndex.from_items(items)
+    rng = random.Random(3)
+    live = {it["id"]: it for it in items}
+    for it in rng.sample(items, 200):  # past half: compacts
+        idx.remove(it["id"])
+        del live[it["id"]]
+    edited = {**next(iter(live.values())), "title": "zebra migration"}
+    idx.upsert(edited)
+    live[edited["id"]] = edited
+    new = {"id": "new", "title": "zebra stripes", "content": "zebra"}
+    idx.upsert(new)
+    live["new"] = new
+
+    assert set(idx.pos) == set(live)
+    assert [i for i, _ in idx.search("zebra", 2)] == _dense_ranking(idx, list(live.values()), "zebra", 2)
+    assert all(i in live for i, _ in idx.search("launch customer", 20))
+
+
+def test_index_is_far_smaller_than_dense_rows():
+    n = 5000
+    idx = UserIndex.from_items(_items(n))
+    stored = idx.rows[:idx.nnz].nbytes + idx.cols[:idx.nnz].nbytes + idx.vals[:idx.nnz].nbytes
+    assert stored < n * RETRIEVAL_DIM * 4 / 4
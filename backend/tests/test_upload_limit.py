@@ -0,0 +1,81 @@
+# backend/tests/test_upload_limit.py
+"""Upload size limit responses and the stored-upload path of /api/images/analyze."""
+
+import io
+import os
+
+import httpx
+import pytest
+from PIL import Image
+from prometheus_client import REGISTRY
+
+from backend.app import images
+from backend.app.main import app
+
+ORIGIN = "http://localhost:5173"
+
+
+def _client() -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://app")
+
+
+def _count_413() -> float:
+    return REGISTRY.get_sample_value(
+        "inspireai_http_requests_total",
+        {"method": "POST", "route": "/api/images/analyze", "status": "413"},
+    ) or 0.0
+
+
+@pytest.mark.anyio
+async def test_declared_length_413_has_cors_headers_and_is_counted():
+    before = _count_413()
+    async with _client() as c:
+        r = await c.post(
+            "/api/images/analyze",
+            content=b"x",
+            headers={"Origin": ORIGIN, "Content-Length": str(images.UPLOAD_MAX_BYTES * 2)},
+        )
+    assert r.status_code == 413
+    assert r.headers["access-control-allow-origin"] == ORIGIN
+    assert _count_413() == before + 1
+
+
+@pytest.mark.anyio
+async def test_streamed_body_413_has_cors_headers():
+    async def body():
+        # a file part that never ends, sent without a Content-Length
+        yield b'--x\r\nContent-Disposition: form-data; name="file"; filename="a.png"\r\n\r\n'
+        chunk = b"\0" * images.UPLOAD_CHUNK_SIZE
+        for _ in range(images.UPLOAD_MAX_BYTES // len(chunk) + 2):
+            yield chunk
+
+    async with _client() as c:
+        r = await c.post(
+            "/api/images/analyze",
+            content=body(),
+            headers={"Origin": ORIGIN, "Content-Type": "multipart/form-data; boundary=x"},
+        )
+    assert r.status_code == 413
+    assert r.headers["access-control-allow-origin"] == ORIGIN
+
+
+@pytest.mark.anyio
+async def test_analyze_keeps_upload_under_its_hash(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("uploads")
+    stored = {}
+
+    async def fake_vision(data_url):
+        return {"caption": "a square", "tags": ["square"], "model": "stub"}
+
+    monkeypatch.setattr(images, "_get_cached_analysis", lambda sha, model: None)
+    monkeypatch.setattr(images, "_store_analysis", lambda sha, result, url: stored.update(sha=sha, url=url))
+    monkeypatch.setattr(images, "_call_openrouter_vision", fake_vision)
+
+    buf = io.BytesIO()
+    Image.new("RGB", (64, 64), (200, 120, 40)).save(buf, format="PNG")
+    async with _client() as c:
+        r = await c.post("/api/images/analyze", files={"file": ("a.png", buf.getvalue(), "image/png")})
+    assert r.status_code == 200
+    assert r.json()["url"] == f"{stored['sha']}.png"
+    assert os.listdir("uploads") == [r.json()["url"]]
@@ -0,0 +1,37 @@
+# backend/tests/test_upload_memory.py
+"""
+Peak memory of one /api/images/analyze upload, measured with the same
+subprocess harness as bench/upload_memory.py.
+"""
+
+import pytest
+from PIL import Image
+
+from backend.app.images import UPLOAD_CHUNK_SIZE, VISION_MAX_EDGE
+from backend.bench.upload_memory import _child
+
+
+@pytest.fixture(scope="module")
+def large_jpeg(tmp_path_factory):
+    # 48 MP photo-like JPEG, ~10 MB on disk (close to the 12 MB limit)
+    noise = Image.effect_noise((8000, 6000), 20)
+    grad = Image.linear_gradient("L").resize((8000, 6000))
+    img = Image.merge("RGB", (noise, grad, grad.transpose(Image.FLIP_LEFT_RIGHT)))
+    path = tmp_path_factory.mktemp("upload") / "photo.jpg"
+    img.save(path, quality=85)
+    return str(path)
+
+
+def test_upload_peak_memory_is_bounded(large_jpeg):
+    after = _child("after", large_jpeg)
+    before = _child("before", large_jpeg)
+
+    # Python-side copies: a few chunks plus the small encoded copy, never
+    # the upload itself
+    assert after["traced"] < 16 * UPLOAD_CHUNK_SIZE
+    # Everything else is the JPEG decoded at reduced size (draft keeps
+    # both edges under 2 * VISION_MAX_EDGE, 4 bytes per pixel) plus one
+    # buffer of the same size for the resize
+    assert after["rss"] < 2 * 4 * (2 * VISION_MAX_EDGE) ** 2
+    # the old read/base64/data-URL path held ~3x the upload
+    assert after["rss"] < before["rss"]
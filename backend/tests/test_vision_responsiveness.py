@@ -0,0 +1,70 @@
+# backend/tests/test_vision_responsiveness.py
+"""
+Other endpoints stay responsive while slow vision calls are in flight.
+
+Concurrent /api/images/analyze uploads go to a local OpenRouter stub
+with a long latency; meanwhile /api/diag is polled. Every probe has to
+come back well within the vision latency: neither the OpenRouter calls
+nor the PIL work may hold the event loop.
+"""
+
+import asyncio
+import io
+import os
+import time
+
+import httpx
+import pytest
+from PIL import Image
+
+from backend.app import images, llm
+from backend.app.main import app
+from backend.bench.stubs import run_stub
+
+N = 8
+VISION_LATENCY = 2.0
+PROBE_BOUND = 0.25
+
+
+def _png(seed: int) -> bytes:
+    # distinct noisy images, so every upload does real PIL work
+    img = Image.effect_noise((1200, 900), 30 + seed).convert("RGB")
+    out = io.BytesIO()
+    img.save(out, format="PNG")
+    return out.getvalue()
+
+
+@pytest.fixture
+def stub_vision(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.mkdir("uploads")
+    monkeypatch.setenv("OPENROUTER_API_KEY", "stub")
+    monkeypatch.setattr(images, "_get_cached_analysis", lambda sha, model: None)
+    monkeypatch.setattr(images, "_store_analysis", lambda sha, result, url: None)
+    with run_stub(vision_latency=VISION_LATENCY) as base_url:
+        monkeypatch.setattr(llm, "openrouter_client", httpx.AsyncClient(base_url=base_url + "/api/v1"))
+        yield
+
+
+@pytest.mark.anyio
+async def test_probes_stay_fast_during_slow_vision_calls(stub_vision):
+    pngs = [_png(i) for i in range(N)]
+    transport = httpx.ASGITransport(app=app)
+    probes = []
+    async with httpx.AsyncClient(transport=transport, base_url="http://app", timeout=60) as c:
+        uploads = asyncio.ensure_future(asyncio.gather(*[
+            c.post("/api/images/analyze", files={"file": (f"{i}.png", png, "image/png")})
+            for i, png in enumerate(pngs)
+        ]))
+        while not uploads.done():
+            t0 = time.perf_counter()
+            r = await c.get("/api/diag")
+            probes.append(time.perf_counter() - t0)
+            assert r.status_code == 200
+            await asyncio.sleep(0.05)
+        resps = await uploads
+    await llm.openrouter_client.aclose()
+
+    assert [r.status_code for r in resps] == [200] * N
+    assert len(probes) >= VISION_LATENCY / 0.1
+    assert max(probes) < PROBE_BOUND, f"slowest probe {max(probes) * 1000:.0f} ms"
@@ -47,6 +47,8 @@ const ChatWindow: React.FC = () => {
   const [messages, setMessages] = useState<Message[]>(([]));
   const [input, setInput] = useState('');
   const [isLoading, setIsLoading] = useState(false);
+  // server-side conversation; only the id and the new message are sent
+  const [sessionId, setSessionId] = useState<string | null>(null);
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   const scrollToBottom = () => {
@@ -75,27 +77,53 @@ const ChatWindow: React.FC = () => {
     setInput('');
     setIsLoading(true);
 
+    // Append a streamed piece to the current thinking/final bubble, or start one
+    const appendChunk = (type: 'thinking' | 'final', text: string) => {
+      setMessages(prev => {
+        const last = prev[prev.length - 1];
+        if (last && last.role === 'assistant' && last.type === type) {
+          return [...prev.slice(0, -1), { ...last, content: last.content + text }];
+        }
+        return [...prev, { role: 'assistant', content: text, type }];
+      });
+    };
+
     try {
-      const response = await fetch('http://localhost:8000/api/agent/chat', {
+      const response = await fetch('http://localhost:8000/api/agent/chat/stream', {
         method: 'POST',
         headers: {
           'Content-Type': 'application/json',
           'Authorization': `Bearer ${token}`,
         },
-        body: JSON.stringify({ message: trimmedInput }),
+        body: JSON.stringify({ message: trimmedInput, session_id: sessionId }),
       });
 
-      const data = await response.json();
+      if (!response.ok || !response.body) {
+        const data = await response.json().catch(() => ({}));
+        throw new Error(data.detail || 'Failed to get response from agent');
+      }
 
-      if (response.ok) {
-        if (data.thinking) {
-          setMessages(prev => [...prev, { role: 'assistant', content: data.thinking, type: 'thinking' }]);
-        }
-        if (data.final_answer) {
-          setMessages(prev => [...prev, { role: 'assistant', content: data.final_answer, type: 'final' }]);
+      // SSE frames: "event: <name>\ndata: <json>\n\n"
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      for (;;) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        let sep;
+        while ((sep = buffer.indexOf('\n\n')) >= 0) {
+          const frame = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+          const event = /^event: (.*)$/m.exec(frame)?.[1];
+          const payload = /^data: (.*)$/m.exec(frame)?.[1];
+          if (!event || !payload) continue;
+          const data = JSON.parse(payload);
+          if (event === 'thinking') appendChunk('thinking', data.text);
+          else if (event === 'final_answer') appendChunk('final', data.text);
+          else if (event === 'done' && data.session_id) setSessionId(data.session_id);
+          else if (event === 'error') throw new Error(data.detail || 'Agent failed');
         }
-      } else {
-        throw new Error(data.detail || 'Failed to get response from agent');
       }
     } catch (err) {
       console.error('Agent chat error:', err);
@@ -1,5 +1,5 @@
 import React, { useState } from "react";
-import { analyzeImage } from "../../lib/api";
+import { analyzeImages } from "../../lib/api";
 import "./ImageUploader.css";
 
 type Props = {
@@ -37,10 +37,14 @@ export default function ImageUploader({ onResult, className = "" }: Props) {
     setBusy(true);
 
     try {
-      // Call your existing /api/images/analyze for each file in parallel
-      const results = await Promise.all(arr.map(analyzeImage));
+      // One multipart request for the whole set; the server fans out the vision calls
+      const { results } = await analyzeImages(arr);
       // Emit each result upward (keeps your current onResult signature)
-      for (const r of results) onResult(r);
+      for (const r of results) if (r.result) onResult(r.result);
+      const failed = results.filter(r => r.error);
+      if (failed.length) {
+        setError(failed.map(r => `"${r.filename}": ${r.error}`).join("; "));
+      }
     } catch (e: any) {
       setError(e.message || "Failed to analyze one or more images");
     } finally {
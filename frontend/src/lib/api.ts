@@ -33,7 +33,7 @@ export async function generateContent(body: any) {
   return json.result as string;
 }
 
-export async function getItems(params: { q?: string; platform?: string; tone?: string; page?: number; pageSize?: number }) {
+export async function getItems(params: { q?: string; platform?: string; tone?: string; page?: number; pageSize?: number; cursor?: string }) {
   const qs = new URLSearchParams(
     Object.entries(params).filter(([, v]) => v !== undefined && v !== "all") as any
   );
@@ -63,6 +63,28 @@ export async function duplicateItem(id: string) {
   return res.json();
 }
 
+export type BulkAction = "delete" | "pin" | "unpin" | "tag" | "untag" | "duplicate";
+
+// One request/transaction for a multi-select action; results are per id
+export async function bulkItems(body: {
+  action: BulkAction;
+  ids?: string[];
+  filter?: { q?: string; platform?: string; tone?: string };
+  tags?: string[];
+}): Promise<{
+  action: BulkAction;
+  affected: number;
+  results: { id: string; ok: boolean; error?: string; new_id?: string }[];
+}> {
+  const res: Response = await fetch(`/api/items/bulk`, {
+    method: "POST",
+    headers: { ...getAuthHeader(), "Content-Type": "application/json" },
+    body: JSON.stringify(body),
+  });
+  if (!res.ok) throw new Error("Bulk action failed");
+  return res.json();
+}
+
 export async function updateItem(id: string, body: any) {
   const res: Response = await fetch(`/api/items/${id}`, {
     method: "PATCH",
@@ -107,6 +129,27 @@ export async function analyzeImage(file: File) {
   return (await res.json()) as { caption: string; tags: string[]; model: string; url: string };
 }
 
+export type ImageAnalysis = { caption: string; tags: string[]; model: string; url: string };
+
+export async function analyzeImages(files: File[]) {
+  const fd = new FormData();
+  for (const f of files) fd.append("files", f);
+  const res = await fetch("/api/images/analyze-batch", {
+    method: "POST",
+    body: fd,
+  });
+  if (!res.ok) {
+    const text = await res.text();
+    throw new Error(text || "Image analysis failed");
+  }
+  return (await res.json()) as {
+    results: { index: number; filename: string; result?: ImageAnalysis; error?: string; status: number }[];
+    image_captions: string[];
+    image_tags: string[][];
+    merged_tags: string[];
+  };
+}
+
 export async function addImageForItem(
   itemId: string,
   data: { url?: string; caption: string; tags: string[]; model?: string }  // ← Add model field
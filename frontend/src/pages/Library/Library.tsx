@@ -2,6 +2,15 @@ import { useEffect, useMemo, useState } from "react";
 import { getItems, deleteItem, duplicateItem, updateItem } from "../../lib/api";
 import "./Library.css";
 
+type ItemImage = {
+  id: string;
+  url?: string;
+  caption: string;
+  tags: string[];
+  model?: string;
+  created_at: string;
+};
+
 // Add image type to Item interface
 type Item = {
   id: string;
@@ -15,7 +24,9 @@ type Item = {
   tags: string[];
   pinned: boolean;
   created_at: string; // ISO
-  // Add image fields from the backend
+  // All images attached to the item (aggregated server-side)
+  images?: ItemImage[];
+  // Flat fields for the first image (older API shape)
   image_caption?: string;
   image_tags?: string[];
   image_model?: string;
@@ -41,33 +52,36 @@ export default function Library() {
   const [platform, setPlatform] = useState<string>("all");
   const [tone, setTone] = useState<string>("all");
   const [items, setItems] = useState<Item[]>([]);
-  const [page, setPage] = useState(1);
+  // keyset pagination: undefined = first page, otherwise the server's next_cursor
+  const [cursor, setCursor] = useState<string | undefined>(undefined);
+  const [nextCursor, setNextCursor] = useState<string | undefined>(undefined);
   const [loading, setLoading] = useState(false);
   const [hasMore, setHasMore] = useState(true);
 
   const user_id = userIdRaw && userIdRaw !== "undefined" && userIdRaw !== "null" ? userIdRaw : undefined;
 
   const filters = useMemo(() => {
-    const f: Record<string, any> = { q, platform, tone, page, pageSize: 20 };
+    const f: Record<string, any> = { q, platform, tone, cursor, pageSize: 20 };
     if (user_id) f.user_id = user_id;
     return f;
-  }, [q, platform, tone, page, user_id]);
+  }, [q, platform, tone, cursor, user_id]);
 
   useEffect(() => {
     let alive = true;
     setLoading(true);
     getItems(filters).then((res) => {
       if (!alive) return;
-      setItems((prev) => (page === 1 ? res.items : [...prev, ...res.items]));
-      setHasMore(res.items.length === 20);
+      setItems((prev) => (cursor === undefined ? res.items : [...prev, ...res.items]));
+      setNextCursor(res.next_cursor ?? undefined);
+      setHasMore(Boolean(res.next_cursor));
       setLoading(false);
     });
     return () => {
       alive = false;
     };
-  }, [filters, page]);
+  }, [filters, cursor]);
 
-  const resetAndSearch = () => setPage(1);
+  const resetAndSearch = () => setCursor(undefined);
 
   async function onDelete(id: string) {
     await deleteItem(id);
@@ -163,7 +177,7 @@ export default function Library() {
           <button
             className="lib-btn primary"
             disabled={loading}
-            onClick={() => setPage((p) => p + 1)}
+            onClick={() => setCursor(nextCursor)}
           >
             {loading ? "Loading…" : "Load more"}
           </button>
@@ -187,8 +201,12 @@ function Card({
   const cleanedTitle = cleanMarkdown(item.title || "(Untitled)");
   const cleanedContent = cleanMarkdown(item.content);
 
-  // Extract image info if available
-  const hasImage = item.image_caption || item.image_tags?.length;
+  // Every image attached to the post comes inline with the listing
+  const images: ItemImage[] = item.images ?? (
+    item.image_caption || item.image_tags?.length
+      ? [{ id: item.id, url: item.image_url, caption: item.image_caption || "", tags: item.image_tags || [], created_at: item.created_at }]
+      : []
+  );
 
   return (
     <article className="lib-card">
@@ -206,32 +224,36 @@ function Card({
         <p>{cleanedContent}</p>
       </div>
 
-      {/* Show actual image if available */}
-      {hasImage && item.image_url && (
-        <div className="lib-image-container">
-          <img 
-            src={`/uploads/${item.image_url}`} 
-            alt="Uploaded image" 
-            className="lib-uploaded-image"
-          />
-        </div>
-      )}
-
-      {/* Show image analysis if available */}
-      {(item.image_caption || item.image_tags?.length) && (
-        <div className="lib-image-analysis">
-          {item.image_caption && (
-            <div className="lib-image-caption">
-              <strong>Image:</strong> {item.image_caption}
+      {images.map((img) => (
+        <div key={img.id}>
+          {/* Show actual image if available */}
+          {img.url && (
+            <div className="lib-image-container">
+              <img
+                src={`/uploads/${img.url}`}
+                alt="Uploaded image"
+                className="lib-uploaded-image"
+              />
             </div>
           )}
-          {item.image_tags && item.image_tags.length > 0 && (
-            <div className="lib-image-tags">
-              <strong>Tags:</strong> {item.image_tags.map(tag => `#${tag}`).join(', ')}
+
+          {/* Show image analysis if available */}
+          {(img.caption || img.tags.length > 0) && (
+            <div className="lib-image-analysis">
+              {img.caption && (
+                <div className="lib-image-caption">
+                  <strong>Image:</strong> {img.caption}
+                </div>
+              )}
+              {img.tags.length > 0 && (
+                <div className="lib-image-tags">
+                  <strong>Tags:</strong> {img.tags.map(tag => `#${tag}`).join(', ')}
+                </div>
+              )}
             </div>
           )}
         </div>
-      )}
+      ))}
 
       {item.tags.length > 0 && (
         <div className="lib-tags">